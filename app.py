@@ -1,11 +1,49 @@
-from flask import Flask
-from flask import render_template, request
+import argparse
+import json
+import threading
 
+from flask import Flask, Response
+from flask import render_template, request, stream_with_context
+
+from src import service
+from src.cache import ResultCache, TOKENS, PARSE, MAX_BYTES
 from src.lexical import MyLex
 from src.syntactic import syntactic as syn
 
 
 app = Flask(__name__)
+# The JSON of a request: the source, the input and some room for the rest
+app.config['MAX_CONTENT_LENGTH'] = 2 * (service.MAX_SOURCE + service.MAX_STDIN)
+
+# Shared by every request, each call to tokenize works on its own copy.
+mylex = MyLex()
+
+# The results of the sources submitted again (the JSON API too)
+cache = ResultCache()
+
+# The workers of the JSON API, started by the first request (None is
+# one per CPU)
+WORKERS = None
+TIMEOUT = service.TIMEOUT
+pool = None
+pool_lock = threading.Lock()
+
+
+def get_pool():
+    global pool
+    with pool_lock:
+        if pool is None:
+            pool = service.WorkerPool(WORKERS, TIMEOUT)
+    return pool
+
+
+def stream_template(template_name, **context):
+    """ Renders the template little by little, as the context is read. """
+    app.update_template_context(context)
+    template = app.jinja_env.get_template(template_name)
+    stream = template.stream(context)
+    stream.enable_buffering(5)
+    return Response(stream_with_context(stream))
 
 
 @app.route("/")
@@ -16,19 +54,33 @@ def index():
 @app.route("/lexico", methods=['GET', 'POST'])
 def lexico():
     llex = ()
-    lerror = ()
+    lerror = []
     code = ''
 
     if request.method == 'POST':
         code = request.form['code']
-        l = MyLex()
-        llex, lerror = l.tokenize(code)
+        cached = cache.get(TOKENS, code)
+        if cached is not None:
+            llex, lerror = cached
+        else:
+            # The tokens are read while the page is rendered, errors are
+            # added to lerror on the way, so they are shown after the tokens.
+            llex = recorded(code, mylex.iter_tokens(code, lerror), lerror)
 
-    return render_template(
+    return stream_template(
         'lexico.html', llex=llex, lerror=lerror, code=code
     )
 
 
+def recorded(code, tokens, lerror):
+    """ Yields tokens, and keeps them in the cache once all are read. """
+    found = []
+    for token in tokens:
+        found.append(token)
+        yield token
+    cache.put(TOKENS, (code,), (tuple(found), tuple(lerror)))
+
+
 @app.route("/sintatico", methods=['GET', 'POST'])
 def syntactic():
     code = ''
@@ -37,11 +89,100 @@ def syntactic():
 
     if request.method == 'POST':
         code = request.form['code']
-        result, serror = syn(code)
+        result, serror = cache.memoize(PARSE, (code,), lambda: syn(code))
 
     return render_template(
         'syntactic.html', result=result, serror=serror, code=code
     )
 
+
+@app.route("/api/<kind>", methods=['POST'])
+def api(kind):
+    """
+        Lexes, parses, checks or runs a source: kind is lex, parse, check
+        or run. The request is a JSON object with the code, and the input
+        of the program (stdin) for run.
+    """
+    data = request.get_json(force=True, silent=True)
+    if not isinstance(data, dict) or \
+            not isinstance(data.get('code'), basestring) or \
+            not isinstance(data.get('stdin', ''), basestring):
+        return error(400, 'A JSON object with a code string is required')
+
+    code = data['code'].encode('utf-8')
+    stdin = data.get('stdin', '').encode('utf-8')
+    # A Cool program does the same with the same input, runs are kept too
+    phase = 'api/' + kind
+    answer = cache.get(phase, code, stdin)
+    if answer is None:
+        try:
+            answer = get_pool().submit(kind, code, stdin)
+        except service.ServiceError as e:
+            return error(e.status, str(e))
+        cache.put(phase, (code, stdin), answer)
+    return json_response(answer)
+
+
+@app.route("/api/cache")
+def cache_stats():
+    """ The hits and misses of the cache of results. """
+    return json_response(cache.stats())
+
+
+@app.errorhandler(413)
+def too_large(e):
+    return error(413, 'The request is too large')
+
+
+def json_response(data, status=200):
+    return Response(
+        json.dumps(data), status=status, mimetype='application/json'
+    )
+
+
+def error(status, message):
+    return json_response({'error': message}, status)
+
+
 if __name__ == "__main__":
-    app.run(debug=True)
+    argparser = argparse.ArgumentParser(description='Cool web app.')
+    argparser.add_argument(
+        '--serve', action='store_true',
+        help='serve many requests at once, without the debugger, with '
+             'the development server of werkzeug'
+    )
+    argparser.add_argument('--host', default='127.0.0.1')
+    argparser.add_argument('--port', type=int, default=5000)
+    argparser.add_argument(
+        '-j', '--workers', type=int, default=WORKERS,
+        help='processes that answer the JSON API (default: one per CPU)'
+    )
+    argparser.add_argument(
+        '--timeout', type=float, default=service.TIMEOUT,
+        help='seconds a request of the JSON API can take '
+             '(default: %(default)s)'
+    )
+    argparser.add_argument(
+        '--cache-size', type=int, default=MAX_BYTES // (1024 * 1024),
+        help='megabytes of results kept in memory (default: %(default)s)'
+    )
+    argparser.add_argument(
+        '--cache-dir',
+        help='keep the results on disk too, in this directory'
+    )
+    args = argparser.parse_args()
+
+    WORKERS = args.workers
+    TIMEOUT = args.timeout
+    cache = ResultCache(args.cache_size * 1024 * 1024, args.cache_dir)
+    if args.serve:
+        # The workers are ready before the first request. The server of
+        # werkzeug starts a thread per connection, for heavier loads the
+        # app is run by a WSGI server (see README.md).
+        get_pool()
+        try:
+            app.run(host=args.host, port=args.port, threaded=True)
+        finally:
+            pool.close()
+    else:
+        app.run(host=args.host, port=args.port, debug=True)
@@ -0,0 +1,104 @@
+"""
+    Memory used by the AST, compared with the namedtuple representation
+    that was used before (plain tuples for formals and case branches, no
+    positions and one string object per identifier in the source).
+
+    "nodes only" is the AST with one string object per identifier, as
+    before: the difference with "before" is the layout of the nodes,
+    the rest is the interning of the names. None, the bools and the
+    small ints are not counted, Python keeps only one of each.
+
+    Usage: python2 -m benchmarks.ast_memory
+"""
+import sys
+from collections import namedtuple
+
+from src.syntactic import ast
+from src.syntactic.syntactic import parser
+
+from common import examples, quiet
+from generators import long_block
+
+NAMEDTUPLES = dict(
+    (name, namedtuple(name, cls._fields))
+    for name, cls in vars(ast).items()
+    if isinstance(cls, type) and issubclass(cls, ast.Node) and cls._fields
+)
+
+
+def as_namedtuples(value):
+    """ Converts the AST to the old representation. """
+    if isinstance(value, (ast.Formal, ast.CaseBranch)):
+        return tuple(as_namedtuples(v) for v in value)
+    if isinstance(value, ast.Node):
+        old = NAMEDTUPLES[type(value).__name__]
+        return old(*[as_namedtuples(v) for v in value])
+    if isinstance(value, list):
+        return [as_namedtuples(v) for v in value]
+    if isinstance(value, str) and len(value) > 1:
+        # Identifiers were not interned, each one was a new string
+        return value[:1] + value[1:]
+    return value
+
+
+def is_shared(value):
+    """ True for the objects that Python keeps only one of. """
+    if value is None or isinstance(value, bool):
+        return True
+    return type(value) is int and -5 <= value <= 256
+
+
+def deep_size(value, seen=None, intern=True):
+    """
+        Size in bytes of value and everything it references, once each.
+        If intern is false, strings are counted for each reference, as
+        as_namedtuples makes them.
+    """
+    if seen is None:
+        seen = set()
+    if id(value) in seen or is_shared(value):
+        return 0
+    if intern or not isinstance(value, str) or len(value) <= 1:
+        seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, ast.Node):
+        children = [value.line, value.column] + list(value)
+    elif isinstance(value, (list, tuple)):
+        children = value
+    else:
+        children = ()
+
+    for child in children:
+        size += deep_size(child, seen, intern)
+    return size
+
+
+def main():
+    rows = []
+    for name, code in examples() + [('block 20000', long_block(20000, 'counter'))]:
+        with quiet():
+            result, serror = parser.parse(code)
+        if result is not None:
+            rows.append((
+                name, deep_size(as_namedtuples(result)),
+                deep_size(result, intern=False), deep_size(result)
+            ))
+
+    print('%-24s %14s %16s %14s %8s' % (
+        'program', 'before (KiB)', 'nodes only (KiB)', 'after (KiB)', 'saved'
+    ))
+    for name, before, nodes, after in rows + [(
+        'all examples',
+        sum(row[1] for row in rows[:-1]),
+        sum(row[2] for row in rows[:-1]),
+        sum(row[3] for row in rows[:-1])
+    )]:
+        print('%-24s %14.1f %16.1f %14.1f %7.0f%%' % (
+            name, before / 1024.0, nodes / 1024.0, after / 1024.0,
+            100.0 * (before - after) / before
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+    Compilation of many files: one compiler.py process per file, against
+    one batch run, serial and with a process pool.
+
+    Usage: python2 -m benchmarks.batch [copies]
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing import cpu_count
+
+from src.batch import compile_files
+
+from common import ROOT, examples
+
+
+def elapsed(func):
+    start = time.time()
+    func()
+    return time.time() - start
+
+
+def main(copies=10):
+    directory = tempfile.mkdtemp()
+    try:
+        paths = []
+        for i in range(copies):
+            for name, code in examples():
+                path = os.path.join(directory, '%d-%s' % (i, name))
+                with open(path, 'w') as file:
+                    file.write(code)
+                paths.append(path)
+
+        compiler = os.path.join(ROOT, 'compiler.py')
+
+        def one_process_per_file():
+            with open(os.devnull, 'w') as devnull:
+                for path in paths:
+                    subprocess.call(
+                        [sys.executable, compiler, path], stdout=devnull
+                    )
+
+        print('%d files, %d CPUs\n' % (len(paths), cpu_count()))
+        print('%-28s %10s %14s' % ('run', 'time (s)', 'files/s'))
+        runs = [
+            ('one process per file', one_process_per_file),
+            ('batch, 1 job', lambda: compile_files(paths, jobs=1)),
+            ('batch, %d jobs' % cpu_count(), lambda: compile_files(paths)),
+            ('batch, merged', lambda: compile_files(paths, merge=True)),
+        ]
+        for name, func in runs:
+            seconds = elapsed(func)
+            print('%-28s %10.2f %14.1f' % (name, seconds, len(paths) / seconds))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
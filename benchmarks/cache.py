@@ -0,0 +1,56 @@
+"""
+    Time of the lexer, the parser and the checker on each example, and
+    of the same results taken from the cache of results, as a source
+    submitted again gets them.
+
+    Usage: python2 -m benchmarks.cache
+"""
+from src import Semant
+from src.cache import ResultCache, TOKENS, PARSE, CHECK
+from src.lexical import MyLex
+from src.syntactic.syntactic import parser
+
+from common import best_time, examples
+
+mylex = MyLex()
+
+
+def phases(code, cache=None):
+    """ Lexes, parses and checks code, with the results of cache. """
+    if cache is not None and cache.get(CHECK, code) is not None:
+        # Nothing else is needed
+        return
+
+    def cached(phase, compute):
+        if cache is None:
+            return compute()
+        return cache.memoize(phase, (code,), compute)
+
+    llex, lerror = cached(TOKENS, lambda: mylex.tokenize(code))
+    if lerror:
+        return
+    ast, serror = cached(PARSE, lambda: parser.parse(code, echo=False))
+    if ast is None:
+        return
+    cached(CHECK, lambda: Semant(ast).build())
+
+
+def main():
+    cache = ResultCache()
+    print('%-22s %12s %12s %10s' % (
+        'program', 'compile (ms)', 'cached (ms)', 'speedup'
+    ))
+    for name, code in examples():
+        compile_time = best_time(lambda: phases(code))
+        phases(code, cache)
+        cached_time = best_time(lambda: phases(code, cache))
+        print('%-22s %12.2f %12.3f %9.0fx' % (
+            name, compile_time * 1000, cached_time * 1000,
+            compile_time / cached_time
+        ))
+    print('')
+    print('\n'.join(cache.report()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+    Column computation on sources with very long lines.
+
+    "before" searches back to the previous newline for every token
+    (find_column), "after" counts the columns from the offset of the
+    last newline, that the lexer keeps while it reads the source.
+
+    Usage: python2 -m benchmarks.column_lookup
+"""
+from src.lexical import MyLex, read_source
+from src.lexical.commom import find_column
+
+from common import best_time
+from generators import long_lines
+
+
+def tokenize_with_rfind(mylex, source):
+    with read_source(source) as data:
+        # The PLY lexer, without the columns of MyLex.clone
+        lexer = mylex.lexer.clone()
+        lexer.lineno = 1
+        lexer.input(data)
+        return [(tok.type, find_column(data, tok)) for tok in lexer]
+
+
+def tokenize_with_offset(mylex, source):
+    with read_source(source) as data:
+        lexer = mylex.clone()
+        lexer.input(data)
+        return [(tok.type, tok.column) for tok in lexer]
+
+
+def main():
+    mylex = MyLex()
+
+    print('%6s %10s %8s %12s %12s %8s' % (
+        'lines', 'stmts', 'tokens', 'before (s)', 'after (s)', 'speedup'
+    ))
+    for lines, statements in [(1000, 10), (100, 100), (10, 1000), (1, 10000)]:
+        source = long_lines(lines, statements)
+        before_result = tokenize_with_rfind(mylex, source)
+        assert before_result == tokenize_with_offset(mylex, source)
+
+        before = best_time(lambda: tokenize_with_rfind(mylex, source), repeat=1)
+        after = best_time(lambda: tokenize_with_offset(mylex, source), repeat=1)
+        print('%6d %10d %8d %12.3f %12.3f %7.1fx' % (
+            lines, statements, len(before_result), before, after, before / after
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import glob
+import os
+import sys
+import timeit
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLES = os.path.join(ROOT, 'examples')
+
+
+def examples():
+    """ Returns a list of (name, source) for every file in examples/. """
+    sources = []
+    for path in sorted(glob.glob(os.path.join(EXAMPLES, '*.cl'))):
+        with open(path) as file:
+            sources.append((os.path.basename(path), file.read()))
+    return sources
+
+
+@contextmanager
+def quiet():
+    """ Hides what the compiler prints (parser errors, for example). """
+    stdout = sys.stdout
+    with open(os.devnull, 'w') as devnull:
+        sys.stdout = devnull
+        try:
+            yield
+        finally:
+            sys.stdout = stdout
+
+
+def best_time(func, number=1, repeat=3):
+    """ Returns the best time of a call to func, in seconds. """
+    with quiet():
+        times = timeit.repeat(func, number=number, repeat=repeat)
+    return min(times) / number
+
+
+def percentile(times, p):
+    """ The p-th percentile of times. """
+    times = sorted(times)
+    return times[min(len(times) - 1, int(len(times) * p / 100.0))]
+
+
+# What the examples that read the input get
+INPUTS = {
+    'arith.cl': 'a\n7\nd\ng\nh\nb\nc\n3\nj\nq\n',
+    'sort-list.cl': '100\n',
+}
+
+# hello.cl does not parse, while_example.cl never ends
+NOT_RUNNABLE = ('hello.cl', 'while_example.cl')
+
+
+def runnable_examples():
+    """ Returns a list of (name, source, input) of the examples that run. """
+    return [
+        (name, code, INPUTS.get(name, ''))
+        for name, code in examples() if name not in NOT_RUNNABLE
+    ]
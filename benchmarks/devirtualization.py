@@ -0,0 +1,65 @@
+"""
+    Reports the dispatches of each example that the class hierarchy
+    analysis devirtualizes, their share of all the dispatches, and the
+    time of the virtual machine with and without the direct calls.
+
+    Usage: python2 -m benchmarks.devirtualization
+"""
+from StringIO import StringIO
+
+from src.codegen import generate, VM
+from src.codegen.runtime import CoolRuntimeError
+from src.interpreter.differential import analyze
+from src.optimizer import devirtualize
+
+from common import best_time, examples, quiet, INPUTS, NOT_RUNNABLE
+
+
+def run_time(s, stdin, direct_calls):
+    program = generate(s, direct_calls)
+
+    def run():
+        try:
+            VM(program, StringIO(stdin), StringIO()).run()
+        except CoolRuntimeError:
+            # primes.cl stops with abort
+            pass
+    return best_time(run)
+
+
+def main():
+    print('%-22s %8s %8s %7s %14s %14s' % (
+        'program', 'sites', 'direct', 'share', 'vtable (ms)', 'direct (ms)'
+    ))
+    total_sites = total_direct = 0
+    for name, code in examples():
+        try:
+            with quiet():
+                s = analyze(code)
+        except SyntaxError:
+            continue
+        result = devirtualize(s)
+        direct = len(result.targets)
+        total_sites += result.sites
+        total_direct += direct
+
+        line = '%-22s %8d %8d %6.1f%%' % (
+            name, result.sites, direct,
+            100.0 * direct / result.sites if result.sites else 0
+        )
+        if name not in NOT_RUNNABLE:
+            stdin = INPUTS.get(name, '')
+            line += ' %14.2f %14.2f' % (
+                run_time(s, stdin, False) * 1000,
+                run_time(s, stdin, True) * 1000
+            )
+        print(line)
+
+    print('%-22s %8d %8d %6.1f%%' % (
+        'total', total_sites, total_direct,
+        100.0 * total_direct / total_sites if total_sites else 0
+    ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+    Runs the examples with the interpreter and with every backend,
+    checks that they print the same, and reports the time of each run.
+
+    Usage: python2 -m benchmarks.differential [--save directory]
+
+    --save writes what each example printed, in <example>.out.
+"""
+import argparse
+import os
+import sys
+
+from src.interpreter.differential import BACKENDS, agree, compare, conclusive
+
+from common import runnable_examples
+from generators import fibonacci
+
+
+def main(save=None):
+    programs = runnable_examples() + [('fibonacci 15', fibonacci(15), '')]
+    backends = sorted(BACKENDS)
+
+    print('%-22s %16s %s' % (
+        'program', 'interpreter (ms)',
+        ' '.join('%12s' % ('%s (ms)' % name) for name in backends)
+    ))
+    wrong = []
+    unknown = []
+    for name, code, stdin in programs:
+        expected, outcomes = compare(code, stdin, backends)
+        line = '%-22s %16.1f' % (name, expected.time * 1000)
+        for backend in backends:
+            outcome = outcomes[backend]
+            if agree(expected, outcome):
+                mark = ' '
+            elif not conclusive(expected):
+                mark = '?'
+                unknown.append((name, backend))
+            else:
+                mark = '!'
+                wrong.append((name, backend))
+            line += ' %11.1f%s' % (outcome.time * 1000, mark)
+        print(line)
+
+        if save is not None:
+            with open(os.path.join(save, name + '.out'), 'w') as file:
+                file.write(expected.output)
+                if expected.error:
+                    file.write('\n[%s]\n' % expected.error)
+
+    for name, backend in unknown:
+        print('? %s: the interpreter ran out of stack, %s is not compared' % (
+            name, backend
+        ))
+    for name, backend in wrong:
+        print('! %s: %s does not print what the interpreter prints' % (
+            name, backend
+        ))
+    return not wrong
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('--save', metavar='directory')
+    args = argparser.parse_args()
+    if args.save and not os.path.isdir(args.save):
+        os.makedirs(args.save)
+    sys.exit(0 if main(args.save) else 1)
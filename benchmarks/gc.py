@@ -0,0 +1,84 @@
+"""
+    Runs programs that allocate a lot compiled to native code, and
+    reports the statistics of the garbage collector: collections, pauses
+    and bytes promoted from the nursery to the old generation. The
+    linked lists are run with nurseries of several sizes.
+
+    Usage: python2 -m benchmarks.gc
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from src import native
+from src.codegen import CompileError
+from src.interpreter.differential import analyze
+
+from common import examples, quiet, INPUTS
+from generators import linked_lists
+
+ALLOCATING = ('list.cl', 'sort-list.cl', 'cells.cl')
+# A longer list than the one of the other benchmarks
+STDIN = {'sort-list.cl': '2000\n'}
+NURSERY_SIZES = (256 * 1024, 2 * 1024 * 1024, 8 * 1024 * 1024)
+
+
+def run(executable, stdin, nursery_size=None):
+    """ The time of a run of executable, and its GCStats. """
+    environ = dict(os.environ)
+    if nursery_size is not None:
+        os.environ['COOL_NURSERY_SIZE'] = str(nursery_size)
+    try:
+        start = time.time()
+        stats = native.execute(executable, stdin, gc_stats=True)
+        return time.time() - start, stats
+    finally:
+        os.environ.clear()
+        os.environ.update(environ)
+
+
+def report(name, nursery, elapsed, stats):
+    print('%-26s %8s %9.1f %6d %6d %12d %10.2f %9.2f %11d' % (
+        name, '%dK' % (nursery // 1024) if nursery else '-', elapsed * 1000,
+        stats.minor, stats.major, stats.promoted, stats.pause * 1000,
+        stats.max_pause * 1000, stats.heap
+    ))
+
+
+def main():
+    if native.cc() is None:
+        print('No C compiler found (cc, gcc or clang)')
+        return
+
+    programs = [
+        (name, code, STDIN.get(name, INPUTS.get(name, '')), (None,))
+        for name, code in examples() if name in ALLOCATING
+    ] + [
+        ('lists 10000 x 50', linked_lists(10000, 50), '', NURSERY_SIZES),
+        ('lists 100000 x 20', linked_lists(100000, 20), '', NURSERY_SIZES),
+    ]
+
+    print('%-26s %8s %9s %6s %6s %12s %10s %9s %11s' % (
+        'program', 'nursery', 'time (ms)', 'minor', 'major', 'promoted (B)',
+        'pause (ms)', 'max (ms)', 'heap (B)'
+    ))
+    directory = tempfile.mkdtemp()
+    try:
+        executable = os.path.join(directory, 'program')
+        for name, code, stdin, nurseries in programs:
+            try:
+                with quiet():
+                    native.build(native.generate(analyze(code)), executable)
+            except CompileError as e:
+                print('%-26s %s' % (name, e))
+                continue
+            for nursery in nurseries:
+                elapsed, stats = run(executable, stdin, nursery)
+                report(name, nursery, elapsed, stats)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
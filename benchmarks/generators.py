@@ -0,0 +1,307 @@
+"""
+    Synthetic Cool programs, used to measure how the compiler scales.
+"""
+
+
+def long_lines(lines, statements, variable='x'):
+    """
+        A program whose method body is written in a few very long lines,
+        as in minified sources.
+    """
+    line = ' '.join(['%s <- %s + 1;' % (variable, variable)] * statements)
+    body = '\n'.join([line] * lines)
+    return (
+        'class Main {\n'
+        '%s : Int <- 0;\n'
+        'main() : Int { {\n%s\n} };\n'
+        '};\n' % (variable, body)
+    )
+
+
+def long_block(expressions, variable='x'):
+    """ A program whose main method is one Block with many expressions. """
+    return long_lines(expressions, 1, variable)
+
+
+def deep_hierarchy(depth, calls):
+    """
+        A chain of depth classes, each one with an attribute and a method,
+        and a Main class at the bottom that calls the methods calls times.
+    """
+    classes = []
+    for i in range(depth):
+        parent = 'C%d' % (i - 1) if i else 'IO'
+        classes.append(
+            'class C%d inherits %s {\n'
+            '    a%d : Int <- %d;\n'
+            '    m%d() : Int { %d };\n'
+            '};\n' % (i, parent, i, i, i, i)
+        )
+
+    body = '\n'.join(
+        '        x <- m%d();' % (i % depth) for i in range(calls)
+    )
+    classes.append(
+        'class Main inherits C%d {\n'
+        '    x : Int <- 0;\n'
+        '    main() : Int { {\n%s\n    } };\n'
+        '};\n' % (depth - 1, body)
+    )
+    return ''.join(classes)
+
+
+def nested_lets(depth, statements):
+    """
+        A method whose body is depth nested lets, with a Block of
+        statements expressions that use the outermost variable inside.
+    """
+    lets = ''.join(
+        'let v%d : Int <- %d in\n' % (i, i) for i in range(depth)
+    )
+    block = '\n'.join(['v0 + v%d;' % (depth - 1)] * statements)
+    return (
+        'class Main {\n'
+        'main() : Int {\n%s{\n%s\n}\n};\n'
+        '};\n' % (lets, block)
+    )
+
+
+def nested_ifs(depth):
+    """ A method whose body is depth nested ifs, in the then branches. """
+    ifs = ''.join(
+        'if x < %d then\n' % i for i in range(depth)
+    )
+    elses = ''.join(
+        'else %d fi\n' % i for i in reversed(range(depth))
+    )
+    return (
+        'class Main {\n'
+        'x : Int <- 0;\n'
+        'main() : Int {\n%sx + 1\n%s};\n'
+        '};\n' % (ifs, elses)
+    )
+
+
+def wide_class(methods):
+    """
+        A class with methods methods, each one calling the one before,
+        and a Main that inherits them.
+    """
+    features = ''.join(
+        '    m%d(a : Int, b : String) : Int { {\n'
+        '        x <- m%d(x, s);\n'
+        '        x;\n'
+        '    } };\n' % (i, i - 1) for i in range(1, methods)
+    )
+    return (
+        'class Wide inherits IO {\n'
+        '    x : Int <- 0;\n'
+        '    s : String <- "wide";\n'
+        '    m0(a : Int, b : String) : Int { { x; } };\n%s'
+        '};\n'
+        'class Main inherits Wide {\n'
+        '    main() : Int { {\n'
+        '        x <- m%d(x, s);\n'
+        '        x;\n'
+        '    } };\n'
+        '};\n' % (features, methods - 1)
+    )
+
+
+def many_dispatches(sites):
+    """
+        A Main that makes sites dispatches, on self, on an object of
+        another class, and static dispatches.
+    """
+    calls = []
+    for i in range(sites):
+        kind = i % 3
+        if kind == 0:
+            calls.append('        x <- inc(x);')
+        elif kind == 1:
+            calls.append('        x <- counter.add(x, %d);' % i)
+        else:
+            calls.append('        x <- counter@Counter.add(x, 1);')
+    return (
+        'class Counter {\n'
+        '    add(a : Int, b : Int) : Int { {\n'
+        '        a <- a + b;\n'
+        '        a;\n'
+        '    } };\n'
+        '};\n'
+        'class Main inherits IO {\n'
+        '    x : Int <- 0;\n'
+        '    counter : Counter <- new Counter;\n'
+        '    inc(a : Int) : Int { {\n'
+        '        a <- a + 1;\n'
+        '        a;\n'
+        '    } };\n'
+        '    main() : Int { {\n%s\n        x;\n    } };\n'
+        '};\n' % '\n'.join(calls)
+    )
+
+
+def huge_strings(count, length):
+    """ count string literals of length characters each, printed. """
+    # With escapes, that the lexer reads one by one
+    chunk = r'text\n\t quoted '
+    literal = '"%s"' % (chunk * (length // len(chunk)))
+    body = '\n'.join(['        out_string(%s);' % literal] * count)
+    return (
+        'class Main inherits IO {\n'
+        '    main() : Object { {\n%s\n    } };\n'
+        '};\n' % body
+    )
+
+
+def huge_comments(count, length):
+    """
+        A small program around count line comments and count block
+        comments, on two lines, of length characters each.
+    """
+    text = ('comment text ' * (length // 13 + 1))[:length]
+    comments = ''.join(
+        '-- %s\n(* %s\n %s *)\n' % (text, text, text)
+        for _ in range(count)
+    )
+    return (
+        '%s'
+        'class Main {\n'
+        '%s'
+        '    main() : Int { 0 };\n'
+        '};\n' % (comments, comments)
+    )
+
+
+def many_classes(classes, methods):
+    """
+        classes classes with methods methods each, in chains of ten
+        (every tenth class inherits from IO), and a Main that calls one
+        method of each class.
+    """
+    sources = []
+    for i in range(classes):
+        parent = 'C%d' % (i - 1) if i % 10 else 'IO'
+        features = ''.join(
+            '    m%d_%d(a : Int) : Int { {\n'
+            '        a <- a + %d;\n'
+            '        a <- a * 2;\n'
+            '        %d;\n'
+            '    } };\n' % (i, j, j, j)
+            for j in range(methods)
+        )
+        sources.append('class C%d inherits %s {\n%s};\n' % (i, parent, features))
+
+    calls = '\n'.join(
+        '        x <- c%d.m%d_0(x);' % (i, i) for i in range(classes)
+    )
+    fields = ''.join(
+        '    c%d : C%d <- new C%d;\n' % (i, i, i) for i in range(classes)
+    )
+    sources.append(
+        'class Main inherits IO {\n%s'
+        '    x : Int <- 0;\n'
+        '    main() : Int { {\n%s\n        x;\n    } };\n'
+        '};\n' % (fields, calls)
+    )
+    return '\n'.join(sources)
+
+
+def fibonacci(n):
+    """ A program that computes the n-th Fibonacci number recursively. """
+    return (
+        'class Main inherits IO {\n'
+        '    fib(n : Int) : Int {\n'
+        '        if n < 2 then n else fib(n - 1) + fib(n - 2) fi\n'
+        '    };\n'
+        '    main() : Object { out_int(fib(%d)) };\n'
+        '};\n' % n
+    )
+
+
+def small_methods(iterations):
+    """
+        A loop that calls small methods of self, with constant arguments
+        and constant expressions: what -O1 and -O2 optimize.
+    """
+    return (
+        'class Main inherits IO {\n'
+        '    total : Int <- 0;\n'
+        '    scale : Int <- 60 * 60 * 24;\n'
+        '    add(x : Int, y : Int) : Int { x + y };\n'
+        '    square(x : Int) : Int { x * x };\n'
+        '    debug() : Bool { 1 = 2 };\n'
+        '    main() : Object {\n'
+        '        let i : Int <- 0, step : Int <- 1 in {\n'
+        '            while i < %d loop {\n'
+        '                total <- add(total, square(3) + scale / 3600);\n'
+        '                if debug() then out_string("debug\\n") else 0 fi;\n'
+        '                i <- add(i, step);\n'
+        '            } pool;\n'
+        '            out_int(total);\n'
+        '        }\n'
+        '    };\n'
+        '};\n' % iterations
+    )
+
+
+def linked_lists(length, rounds):
+    """
+        Builds a linked list of length nodes, that lives until the end,
+        and in each of rounds rounds, a list of length nodes that dies
+        after it is summed, and new labels for the nodes of the first one.
+    """
+    return (
+        'class Node {\n'
+        '    value : Int;\n'
+        '    label : String;\n'
+        '    next : Node;\n'
+        '    init(v : Int, l : String, n : Node) : Node {\n'
+        '        { value <- v; label <- l; next <- n; self; }\n'
+        '    };\n'
+        '    get_value() : Int { value };\n'
+        '    get_label() : String { label };\n'
+        '    get_next() : Node { next };\n'
+        '    set_label(l : String) : String { label <- l };\n'
+        '};\n'
+        'class Main inherits IO {\n'
+        '    kept : Node;\n'
+        '    build(n : Int) : Node {\n'
+        '        let list : Node, i : Int <- 0 in {\n'
+        '            while i < n loop {\n'
+        '                list <- new Node.init(i, "a".concat("b"), list);\n'
+        '                i <- i + 1;\n'
+        '            } pool;\n'
+        '            list;\n'
+        '        }\n'
+        '    };\n'
+        '    sum(list : Node) : Int {\n'
+        '        let total : Int <- 0 in {\n'
+        '            while not isvoid list loop {\n'
+        '                total <- total + list.get_value()\n'
+        '                    + list.get_label().length();\n'
+        '                list <- list.get_next();\n'
+        '            } pool;\n'
+        '            total;\n'
+        '        }\n'
+        '    };\n'
+        '    relabel(list : Node) : Object {\n'
+        '        while not isvoid list loop {\n'
+        '            list.set_label(list.get_label().concat("c").substr(1, 2));\n'
+        '            list <- list.get_next();\n'
+        '        } pool\n'
+        '    };\n'
+        '    main() : Object {\n'
+        '        let round : Int <- 0, total : Int <- 0 in {\n'
+        '            kept <- build(%d);\n'
+        '            while round < %d loop {\n'
+        '                total <- total + sum(build(%d));\n'
+        '                relabel(kept);\n'
+        '                round <- round + 1;\n'
+        '            } pool;\n'
+        '            out_int(total + sum(kept));\n'
+        '            out_string(kept.get_label().concat("\\n"));\n'
+        '        }\n'
+        '    };\n'
+        '};\n' % (length, rounds, length)
+    )
@@ -0,0 +1,73 @@
+"""
+    Incremental compilation of a program with many classes, after one
+    method was edited. "compiler.py" is a compilation without the cache,
+    as compiler.py does it: the lexer, then the parser and the checker.
+
+    Usage: python2 -m benchmarks.incremental [classes]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from src import Semant, lex, syntactic
+from src.incremental import IncrementalCompiler
+
+from generators import many_classes
+
+
+def timed(func):
+    start = time.time()
+    result = func()
+    return result, time.time() - start
+
+
+def main(classes=500, methods=5):
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'program.cl')
+        code = many_classes(classes, methods)
+        with open(path, 'w') as file:
+            file.write(code)
+
+        compiler = IncrementalCompiler(os.path.join(directory, 'cache'))
+
+        print('%-26s %10s %10s %8s' % ('run', 'time (ms)', 'checked', 'errors'))
+
+        def run(name):
+            result, elapsed = timed(lambda: compiler.compile(path))
+            print('%-26s %10.1f %10d %8d' % (
+                name, elapsed * 1000, result.checked, len(result.errors)
+            ))
+
+        def full(tokenize):
+            if tokenize:
+                lex().tokenize(code)
+            ast, _ = syntactic(code)
+            return Semant(ast).build()
+
+        for name, tokenize in [('parse and check', False), ('compiler.py', True)]:
+            errors, elapsed = timed(lambda: full(tokenize))
+            print('%-26s %10.1f %10d %8d' % (
+                name, elapsed * 1000, classes + 1, len(errors)
+            ))
+
+        run('cold cache')
+        run('nothing changed')
+
+        # Edit the first method of the last class, at the end of a chain
+        edited = 'C%d' % (classes - 1)
+        method = 'm%d_0(a : Int) : Int { {\n        a <- a + 0;' % (classes - 1)
+        with open(path, 'w') as file:
+            file.write(code.replace(method, method.replace('+ 0', '+ 1')))
+        run('one method of %s edited' % edited)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
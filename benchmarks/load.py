@@ -0,0 +1,133 @@
+"""
+    Load test of the JSON API of the web app: starts `app.py --serve`,
+    sends requests from many threads at once, and reports the p50 and p99
+    latency of each kind of request.
+
+    Usage: python2 -m benchmarks.load [clients] [requests per client]
+"""
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib2
+from multiprocessing import cpu_count
+
+from common import examples, percentile, runnable_examples, ROOT
+
+WORKERS = cpu_count()
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def post(url, data):
+    """ The HTTP status of a request. """
+    request = urllib2.Request(url, json.dumps(data), {
+        'Content-Type': 'application/json'
+    })
+    try:
+        response = urllib2.urlopen(request)
+        response.read()
+        return response.getcode()
+    except urllib2.HTTPError as e:
+        e.read()
+        return e.code
+
+
+def wait(url, timeout=30):
+    """ Waits until the app answers. """
+    end = time.time() + timeout
+    while time.time() < end:
+        try:
+            post(url + '/api/lex', {'code': ''})
+            return
+        except urllib2.URLError:
+            time.sleep(0.1)
+    raise RuntimeError('The app did not start')
+
+
+def requests():
+    """ The (kind, data) of the requests, in a cycle. """
+    found = []
+    for name, code in examples():
+        found.append(('lex', {'code': code}))
+        found.append(('parse', {'code': code}))
+        found.append(('check', {'code': code}))
+    for name, code, stdin in runnable_examples():
+        found.append(('run', {'code': code, 'stdin': stdin}))
+    return found
+
+
+def client(url, work, times, errors, lock):
+    for kind, data in work:
+        start = time.time()
+        status = post('%s/api/%s' % (url, kind), data)
+        elapsed = time.time() - start
+        with lock:
+            times.setdefault(kind, []).append(elapsed)
+            if status != 200:
+                errors[kind] = errors.get(kind, 0) + 1
+
+
+def main(clients=16, count=50):
+    port = free_port()
+    url = 'http://127.0.0.1:%d' % port
+    with open(os.devnull, 'w') as devnull:
+        app = subprocess.Popen([
+            sys.executable, os.path.join(ROOT, 'app.py'), '--serve',
+            '--port', str(port), '--workers', str(WORKERS)
+        ], cwd=ROOT, stdout=devnull, stderr=devnull)
+        try:
+            wait(url)
+            cycle = itertools.cycle(requests())
+            work = [
+                [next(cycle) for _ in range(count)] for _ in range(clients)
+            ]
+            times = {}
+            errors = {}
+            lock = threading.Lock()
+            threads = [
+                threading.Thread(
+                    target=client, args=(url, part, times, errors, lock)
+                )
+                for part in work
+            ]
+
+            start = time.time()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.time() - start
+        finally:
+            app.terminate()
+            app.wait()
+
+    print('%d clients, %d workers, %d requests in %.2f s (%.0f per second)' % (
+        clients, WORKERS, clients * count, elapsed, clients * count / elapsed
+    ))
+    print('%-8s %9s %8s %10s %10s %10s' % (
+        'request', 'requests', 'errors', 'p50 (ms)', 'p99 (ms)', 'max (ms)'
+    ))
+    for kind in ('lex', 'parse', 'check', 'run'):
+        found = times.get(kind, [])
+        if not found:
+            continue
+        print('%-8s %9d %8d %10.2f %10.2f %10.2f' % (
+            kind, len(found), errors.get(kind, 0),
+            percentile(found, 50) * 1000, percentile(found, 99) * 1000,
+            max(found) * 1000
+        ))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,53 @@
+"""
+    Compiles the examples to MIPS assembly, and reports the size of the
+    code and how many instructions each program executes, next to the
+    instructions the virtual machine executes for the same program.
+
+    The programs run in the simulator of src.mips: spim does not count
+    instructions, and the simulator counts a pseudo instruction as one.
+
+    Usage: python2 -m benchmarks.mips
+"""
+import time
+from StringIO import StringIO
+
+from src import mips
+from src.codegen import generate, VM
+from src.codegen.runtime import CoolRuntimeError
+from src.interpreter.differential import analyze
+
+from common import quiet, runnable_examples
+from generators import fibonacci
+
+
+def vm_instructions(s, stdin):
+    vm = VM(generate(s), StringIO(stdin), StringIO())
+    try:
+        vm.run()
+    except CoolRuntimeError:
+        # primes.cl stops with abort
+        pass
+    return vm.instructions
+
+
+def main():
+    programs = runnable_examples() + [('fibonacci 20', fibonacci(20), '')]
+
+    print('%-20s %8s %8s %14s %14s %10s' % (
+        'program', 'text', 'data', 'instructions', 'vm instr.', 'time (ms)'
+    ))
+    for name, code, stdin in programs:
+        with quiet():
+            s = analyze(code)
+        machine = mips.Machine(mips.generate(s), StringIO(stdin), StringIO())
+        start = time.time()
+        machine.run()
+        elapsed = time.time() - start
+        print('%-20s %8d %8d %14d %14d %10.1f' % (
+            name, machine.text_size, machine.data_size, machine.instructions,
+            vm_instructions(s, stdin), elapsed * 1000
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+    Runs the examples compiled to native code (C, built with cc -O2) and
+    compares the time with the virtual machine and the interpreter. The
+    time of a native run is the time of the process, the build is
+    reported apart.
+
+    Usage: python2 -m benchmarks.native
+"""
+import os
+import shutil
+import tempfile
+import time
+from StringIO import StringIO
+
+from src import native
+from src.codegen import generate, VM
+from src.codegen.runtime import CoolRuntimeError
+from src.interpreter import Interpreter
+from src.interpreter.differential import analyze
+
+from common import quiet, runnable_examples
+from generators import fibonacci
+
+
+def best_run(run, repeat=3):
+    """ The best time of run(), a runtime error (abort) ends a run. """
+    times = []
+    for _ in range(repeat):
+        start = time.time()
+        try:
+            run()
+        except CoolRuntimeError:
+            # primes.cl stops with abort
+            pass
+        times.append(time.time() - start)
+    return min(times)
+
+
+def main():
+    programs = runnable_examples() + [('fibonacci 24', fibonacci(24), '')]
+    directory = tempfile.mkdtemp()
+
+    print('%-22s %10s %12s %10s %16s %8s' % (
+        'program', 'build (ms)', 'native (ms)', 'vm (ms)', 'interpreter (ms)',
+        'vs vm'
+    ))
+    try:
+        for name, code, stdin in programs:
+            with quiet():
+                s = analyze(code)
+            executable = os.path.join(directory, 'program')
+            start = time.time()
+            native.build(native.generate(s), executable)
+            build = time.time() - start
+
+            native_time = best_run(
+                lambda: native.execute(executable, stdin, StringIO())
+            )
+            program = generate(s)
+            vm_time = best_run(
+                lambda: VM(program, StringIO(stdin), StringIO()).run()
+            )
+            interpreter_time = best_run(
+                lambda: Interpreter(s, StringIO(stdin), StringIO()).run(),
+                repeat=1
+            )
+            print('%-22s %10.1f %12.2f %10.2f %16.2f %7.1fx' % (
+                name, build * 1000, native_time * 1000, vm_time * 1000,
+                interpreter_time * 1000, vm_time / native_time
+            ))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+    Optimizes the examples at each level, and reports the time of the
+    passes and the instructions the virtual machine executes.
+
+    Usage: python2 -m benchmarks.optimizer
+"""
+from StringIO import StringIO
+
+from src.codegen import generate, VM
+from src.codegen.runtime import CoolRuntimeError
+from src.interpreter.differential import analyze
+from src.optimizer import optimize, LEVELS
+
+from common import quiet, runnable_examples
+from generators import fibonacci, small_methods
+
+
+def instructions(s, stdin):
+    vm = VM(generate(s), StringIO(stdin), StringIO())
+    try:
+        vm.run()
+    except CoolRuntimeError:
+        # primes.cl stops with abort
+        pass
+    return vm.instructions
+
+
+def main():
+    programs = runnable_examples() + [
+        ('fibonacci 15', fibonacci(15), ''),
+        ('small methods 10000', small_methods(10000), ''),
+    ]
+    levels = sorted(LEVELS)
+
+    print('%-22s %s' % ('program', ' '.join(
+        '%14s %9s' % ('-O%d instr.' % level, 'opt (ms)') for level in levels
+    )))
+    for name, code, stdin in programs:
+        line = '%-22s' % name
+        for level in levels:
+            # Each level optimizes a tree of its own
+            with quiet():
+                s = analyze(code)
+            manager = optimize(s, level)
+            elapsed = sum(stats.time for stats in manager.stats)
+            line += ' %14d %9.2f' % (instructions(s, stdin), elapsed * 1000)
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
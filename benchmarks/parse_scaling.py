@@ -0,0 +1,28 @@
+"""
+    Parse time of a Block with a growing number of expressions.
+
+    The time per expression should stay about the same when the
+    number of expressions grows, i.e. parsing is linear.
+
+    Usage: python2 -m benchmarks.parse_scaling
+"""
+from src.syntactic.syntactic import parser
+
+from common import best_time
+from generators import long_block
+
+
+def main(sizes=(1000, 10000, 100000)):
+    print('%10s %12s %16s' % ('exprs', 'parse (s)', 'per expr (us)'))
+
+    for size in sizes:
+        source = long_block(size)
+        result, serror = parser.parse(source)
+        assert not serror and len(result[0].feature_list[1].body.body) == size
+
+        elapsed = best_time(lambda: parser.parse(source), repeat=1)
+        print('%10d %12.3f %16.2f' % (size, elapsed, elapsed / size * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+"""
+    Per-call latency of the syntactic analysis on examples/*.cl.
+
+    "before" builds a new parser for every call, as syntactic() used to do,
+    "after" uses the parser shared by the module.
+
+    Usage: python2 -m benchmarks.parser_latency [number]
+"""
+import sys
+
+from src.syntactic.syntactic import Parser, parser
+
+from common import examples, best_time
+
+
+def main(number=50):
+    print('%-24s %12s %12s %8s' % ('file', 'before (ms)', 'after (ms)', 'speedup'))
+
+    for name, code in examples():
+        before = best_time(lambda: Parser().parse(code), number)
+        after = best_time(lambda: parser.parse(code), number)
+        print('%-24s %12.3f %12.3f %7.1fx' % (
+            name, before * 1000, after * 1000, before / after
+        ))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,21 @@
+"""
+    Time of the semantic analysis when names are looked up under many
+    nested scopes.
+
+    Usage: python2 -m benchmarks.scope_depth
+"""
+from generators import nested_lets
+from semantic_throughput import check_time
+
+
+def main(depths=(10, 50, 100, 200), statements=2000):
+    print('%6s %8s %12s %16s' % ('depth', 'nodes', 'time (ms)', 'per node (us)'))
+    for depth in depths:
+        nodes, elapsed = check_time(nested_lets(depth, statements))
+        print('%6d %8d %12.3f %16.2f' % (
+            depth, nodes, elapsed * 1000, elapsed / nodes * 1e6
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+"""
+    Time of the semantic analysis on deep class hierarchies with many
+    call sites.
+
+    Usage: python2 -m benchmarks.semantic_scaling
+"""
+from generators import deep_hierarchy
+from semantic_throughput import check_time
+
+
+def main(sizes=((25, 1000), (50, 2000), (100, 4000), (200, 8000))):
+    print('%6s %8s %8s %12s %16s' % (
+        'depth', 'calls', 'nodes', 'time (ms)', 'per node (us)'
+    ))
+    for depth, calls in sizes:
+        nodes, elapsed = check_time(deep_hierarchy(depth, calls), repeat=1)
+        print('%6d %8d %8d %12.3f %16.2f' % (
+            depth, calls, nodes, elapsed * 1000, elapsed / nodes * 1e6
+        ))
+
+
+if __name__ == '__main__':
+    main()
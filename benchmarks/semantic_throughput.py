@@ -0,0 +1,56 @@
+"""
+    Throughput of the semantic analysis, in AST nodes per second.
+
+    Only programs that pass the analysis are measured. Semant changes
+    the AST it checks, so each run gets a freshly parsed one.
+
+    Usage: python2 -m benchmarks.semantic_throughput
+"""
+import time
+
+from src.semantic import Semant
+from src.semantic.myexceptions import SemantError
+from src.syntactic.ast import walk
+from src.syntactic.syntactic import parser
+
+from common import examples, quiet
+from generators import long_block
+
+
+def check_time(code, repeat=3):
+    """ Returns the number of nodes and the best time of Semant.build. """
+    times = []
+    for _ in range(repeat):
+        with quiet():
+            result, serror = parser.parse(code)
+        if serror:
+            raise SyntaxError(serror)
+        nodes = sum(1 for node in walk(result))
+
+        start = time.time()
+        serror = Semant(result).build()
+        times.append(time.time() - start)
+        if serror:
+            raise SemantError(serror[0].message)
+    return nodes, min(times)
+
+
+def main():
+    programs = examples() + [
+        ('block %d' % size, long_block(size)) for size in (1000, 10000)
+    ]
+
+    print('%-24s %8s %12s %14s' % ('program', 'nodes', 'time (ms)', 'nodes/s'))
+    for name, code in programs:
+        try:
+            nodes, elapsed = check_time(code)
+        except (SyntaxError, SemantError):
+            # The analysis does not accept the program
+            continue
+        print('%-24s %8d %12.3f %14.0f' % (
+            name, nodes, elapsed * 1000, nodes / elapsed
+        ))
+
+
+if __name__ == '__main__':
+    main()
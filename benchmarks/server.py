@@ -0,0 +1,140 @@
+"""
+    Latency of the language server, as an editor sees it: the time from
+    a message sent to the answer read, for the opening of each example,
+    for an edit of it and for hovers on its names. A program with many
+    classes is edited too.
+
+    Usage: python2 -m benchmarks.server
+"""
+import re
+import subprocess
+import sys
+import time
+
+from src.server import read_message, write_message
+
+from common import examples, percentile, ROOT
+from generators import many_classes
+
+EDITS = 20
+HOVERS = 50
+
+
+class Client(object):
+    """ Drives a server in another process. """
+
+    def __init__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'src.server'], cwd=ROOT,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE
+        )
+        self.id = 0
+
+    def request(self, method, params):
+        self.id += 1
+        write_message(self.process.stdin, {
+            'jsonrpc': '2.0', 'id': self.id, 'method': method, 'params': params
+        })
+        return read_message(self.process.stdout)
+
+    def notify(self, method, params):
+        write_message(self.process.stdin, {
+            'jsonrpc': '2.0', 'method': method, 'params': params
+        })
+
+    def diagnostics(self, method, params):
+        """ Sends a change of a document, and waits for its diagnostics. """
+        self.notify(method, params)
+        return read_message(self.process.stdout)
+
+    def close(self):
+        self.request('shutdown', None)
+        self.notify('exit', None)
+        self.process.wait()
+
+
+def timed(func):
+    start = time.time()
+    func()
+    return (time.time() - start) * 1000
+
+
+def words(code):
+    """ The positions of the names of code, at most HOVERS. """
+    found = []
+    for line, text in enumerate(code.split('\n')):
+        for match in re.finditer(r'[A-Za-z_]\w*', text):
+            found.append({'line': line, 'character': match.start()})
+    step = max(1, len(found) // HOVERS)
+    return found[::step][:HOVERS]
+
+
+def measure(client, uri, code, edit):
+    """ The times of open, of the edits and of the hovers, in ms. """
+    document = {'uri': uri, 'text': code, 'version': 0}
+    opened = timed(lambda: client.diagnostics(
+        'textDocument/didOpen', {'textDocument': document}
+    ))
+
+    changes = []
+    for version in range(1, EDITS + 1):
+        text = edit(code, version)
+        changes.append(timed(lambda: client.diagnostics(
+            'textDocument/didChange', {
+                'textDocument': {'uri': uri, 'version': version},
+                'contentChanges': [{'text': text}],
+            }
+        )))
+
+    hovers = []
+    for position in words(text):
+        hovers.append(timed(lambda: client.request('textDocument/hover', {
+            'textDocument': {'uri': uri}, 'position': position
+        })))
+
+    client.notify('textDocument/didClose', {'textDocument': {'uri': uri}})
+    read_message(client.process.stdout)
+    return opened, changes, hovers
+
+
+def comment(code, version):
+    """ code, with a comment that changes on each edit at its end. """
+    return code + '\n-- edit %d\n' % version
+
+
+def report(name, opened, changes, hovers):
+    print('%-22s %9.2f %9.2f %9.2f %9.2f %9.2f' % (
+        name, opened, percentile(changes, 50), max(changes),
+        percentile(hovers, 50) if hovers else 0, max(hovers or [0])
+    ))
+
+
+def main():
+    print('%-22s %9s %9s %9s %9s %9s' % (
+        'program', 'open', 'edit p50', 'edit max', 'hover p50', 'hover max'
+    ))
+    print('%-22s %9s %9s %9s %9s %9s' % ('', '(ms)', '', '', '', ''))
+    client = Client()
+    try:
+        client.request('initialize', {})
+        client.notify('initialized', {})
+        for name, code in examples():
+            report(name, *measure(client, 'file:///%s' % name, code, comment))
+
+        # An edit of a method of the last class of 200
+        code = many_classes(200, 5)
+        method = 'm199_0(a : Int) : Int { {\n        a <- a + 0;'
+
+        def edit(code, version):
+            return code.replace(
+                method, method.replace('+ 0', '+ %d' % version)
+            )
+        report('200 classes', *measure(
+            client, 'file:///classes.cl', code, edit
+        ))
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""
+    Benchmark suite: times the lexer (MyLex.tokenize), the parser and
+    the checker (Semant.build) on synthetic programs that grow in one
+    direction each, and compares the times with a saved baseline.
+
+    The results are written as JSON with --output; a saved result is the
+    baseline of the next runs. With --baseline, the suite fails (exit
+    status 1) when a phase is slower than the baseline by more than the
+    threshold.
+
+    Usage: python2 -m benchmarks.suite [--output FILE] [--baseline FILE]
+                                       [--threshold 0.2] [--scale 1.0]
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+from src import __version__
+from src.lexical import MyLex
+from src.semantic import Semant
+from src.syntactic.syntactic import parser
+
+from common import quiet
+import generators
+
+PHASES = ('lex', 'parse', 'semantic')
+
+# Differences below MIN_DIFFERENCE seconds are noise, not regressions
+MIN_DIFFERENCE = 0.002
+
+
+def scaled(size, scale):
+    return max(1, int(size * scale))
+
+
+# Name -> function of the scale that returns the source
+WORKLOADS = [
+    ('deep hierarchy', lambda scale: generators.deep_hierarchy(
+        scaled(100, scale), scaled(2000, scale)
+    )),
+    ('wide class', lambda scale: generators.wide_class(scaled(2000, scale))),
+    ('long block', lambda scale: generators.long_block(scaled(10000, scale))),
+    ('nested lets', lambda scale: generators.nested_lets(
+        scaled(100, scale), scaled(200, scale)
+    )),
+    ('nested ifs', lambda scale: generators.nested_ifs(scaled(100, scale))),
+    ('many dispatches', lambda scale: generators.many_dispatches(
+        scaled(3000, scale)
+    )),
+    ('many classes', lambda scale: generators.many_classes(
+        scaled(200, scale), 5
+    )),
+    ('huge strings', lambda scale: generators.huge_strings(
+        scaled(200, scale), 4000
+    )),
+    ('huge comments', lambda scale: generators.huge_comments(
+        scaled(200, scale), 4000
+    )),
+]
+
+
+def best(func, setup, repeat):
+    """ The best time of func(setup()), setup is not timed. """
+    times = []
+    for _ in range(repeat):
+        argument = setup()
+        start = time.time()
+        func(argument)
+        times.append(time.time() - start)
+    return min(times)
+
+
+def measure(code, repeat):
+    """ The best time of each phase on code, in seconds. """
+    mylex = MyLex()
+
+    def parse():
+        return parser.parse(code, echo=False)[0]
+
+    with quiet():
+        return {
+            'lex': best(mylex.tokenize, lambda: code, repeat),
+            'parse': best(
+                lambda _: parser.parse(code, echo=False), lambda: None,
+                repeat
+            ),
+            # Semant changes the AST, each run gets its own
+            'semantic': best(lambda ast: Semant(ast).build(), parse, repeat),
+        }
+
+
+def run(scale, repeat, only=None):
+    results = {}
+    for name, generate in WORKLOADS:
+        if only and only not in name:
+            continue
+        code = generate(scale)
+        results[name] = dict(measure(code, repeat), bytes=len(code))
+        print('%-18s %9d %10.2f %10.2f %12.2f' % (
+            name, len(code), results[name]['lex'] * 1000,
+            results[name]['parse'] * 1000, results[name]['semantic'] * 1000
+        ))
+        sys.stdout.flush()
+    return {
+        'version': __version__,
+        'python': platform.python_version(),
+        'scale': scale,
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """ Prints the changes from baseline, returns the regressions. """
+    if baseline.get('scale') != current['scale']:
+        print('The baseline was run with --scale %s, not %s' % (
+            baseline.get('scale'), current['scale']
+        ))
+
+    regressions = []
+    print('\n%-18s %-9s %12s %12s %8s' % (
+        'workload', 'phase', 'base (ms)', 'now (ms)', 'change'
+    ))
+    for name in sorted(current['results']):
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        for phase in PHASES:
+            old, new = before[phase], current['results'][name][phase]
+            change = (new - old) / old if old else 0.0
+            regressed = change > threshold and new - old > MIN_DIFFERENCE
+            if regressed:
+                regressions.append((name, phase, change))
+            print('%-18s %-9s %12.2f %12.2f %+7.1f%%%s' % (
+                name, phase, old * 1000, new * 1000, change * 100,
+                '  REGRESSION' if regressed else ''
+            ))
+    return regressions
+
+
+def main():
+    argparser = argparse.ArgumentParser(
+        description='Times the phases of the compiler on synthetic programs.'
+    )
+    argparser.add_argument(
+        '--output', metavar='FILE', help='write the results to FILE, as JSON'
+    )
+    argparser.add_argument(
+        '--baseline', metavar='FILE',
+        help='compare with the results in FILE, and fail on a regression'
+    )
+    argparser.add_argument(
+        '--threshold', type=float, default=0.2,
+        help='a phase slower than the baseline by more than this fraction '
+             'is a regression (default: %(default)s)'
+    )
+    argparser.add_argument(
+        '--scale', type=float, default=1.0,
+        help='multiplies the size of the programs (default: %(default)s)'
+    )
+    argparser.add_argument(
+        '--repeat', type=int, default=3,
+        help='runs of each phase, the best is kept (default: %(default)s)'
+    )
+    argparser.add_argument(
+        '--only', metavar='NAME', help='only the workloads with NAME in their name'
+    )
+    args = argparser.parse_args()
+
+    print('%-18s %9s %10s %10s %12s' % (
+        'workload', 'bytes', 'lex (ms)', 'parse (ms)', 'semantic (ms)'
+    ))
+    current = run(args.scale, args.repeat, args.only)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(current, file, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print('\n%d regressions past %d%%' % (
+                len(regressions), args.threshold * 100
+            ))
+            sys.exit(1)
+        print('\nNo regression past %d%%' % (args.threshold * 100))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+    Runs the examples in the virtual machine, and reports how many
+    instructions it executes per second.
+
+    The checker still rejects some of these valid programs, so they are
+    compiled whatever the errors of Semant are.
+
+    Usage: python2 -m benchmarks.vm
+"""
+import time
+from StringIO import StringIO
+
+from src.codegen import generate, VM
+from src.codegen.runtime import Abort
+from src.semantic import Semant
+from src.syntactic.syntactic import parser
+
+from common import quiet, runnable_examples
+from generators import fibonacci
+
+
+def compile_program(code):
+    with quiet():
+        result, serror = parser.parse(code)
+    s = Semant(result)
+    s.build()
+    return generate(s)
+
+
+def run_time(program, stdin='', repeat=3):
+    """ Returns the output, the instructions and the best time of a run. """
+    times = []
+    for _ in range(repeat):
+        stdout = StringIO()
+        vm = VM(program, StringIO(stdin), stdout)
+        start = time.time()
+        try:
+            vm.run()
+        except Abort:
+            # primes.cl stops this way
+            pass
+        times.append(time.time() - start)
+    return stdout.getvalue(), vm.instructions, min(times)
+
+
+def main():
+    programs = runnable_examples() + [('fibonacci 20', fibonacci(20), '')]
+
+    print('%-20s %8s %12s %12s %14s' % (
+        'program', 'code', 'instructions', 'time (ms)', 'instructions/s'
+    ))
+    for name, code, stdin in programs:
+        program = compile_program(code)
+        output, instructions, elapsed = run_time(program, stdin)
+        print('%-20s %8d %12d %12.3f %14.0f' % (
+            name, program.size(), instructions, elapsed * 1000,
+            instructions / elapsed
+        ))
+
+
+if __name__ == '__main__':
+    main()
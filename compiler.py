@@ -1,35 +1,72 @@
+import argparse
+import atexit
+import os
 import sys
+import time
 
 from src import syntactic
 from src import Semant
 from src import lex
+from src.codegen import generate, run, CompileError, CoolRuntimeError
+from src.interpreter import interpret
+from src.optimizer import optimize, LEVELS
+from src import mips, native
+from src.batch import compile_files, find_sources, OK
+from src.incremental import IncrementalCompiler, CACHE_DIR
+from src.cache import ResultCache, TOKENS, PARSE, CHECK
+from src.profiler import Profiler, NULL_PROFILER, program_counts
 
 DEBUG = False
 
-if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print('Choose a cool file to read.')
-        sys.exit(1)
 
-    with open(sys.argv[1]) as file:
+def compile_file(filename, cache=None, program=True, profiler=NULL_PROFILER,
+                 stop=True):
+    """
+        Returns the Semant that checked the file and the semantic errors,
+        exits on other errors.
+
+        The results found in cache (a ResultCache) are not computed again.
+        If program is false, the Semant is not needed: it is None when the
+        errors are in the cache, as when there are errors and stop is true.
+        profiler (a Profiler) measures the phases.
+    """
+    with open(filename) as file:
         code = file.read()
 
-    l = lex()
-    llex, lerror = l.tokenize(code)
+    if cache is not None:
+        serror = cache.get(CHECK, code)
+        if serror is not None and ((serror and stop) or not program):
+            return None, serror
+
+    def cached(phase, compute):
+        if cache is None:
+            return compute()
+        return cache.memoize(phase, (code,), compute)
+
+    with profiler.phase('lex') as record:
+        l = lex()
+        llex, lerror = cached(TOKENS, lambda: l.tokenize(code))
+    record.counts.update(tokens=len(llex), errors=len(lerror))
     if lerror:
         print('Lex - EROOR')
         print(lerror)
         sys.exit(1)
 
-    ast = syntactic(code)
+    with profiler.phase('parse') as record:
+        ast = cached(PARSE, lambda: syntactic(code))
     if ast[0] is None:
         print("Sintatic - ERROR")
         sys.exit(1)
+    record.counts.update(program_counts(ast[0]))
 
     if DEBUG:
         print('\n\n====== DEBUGGING ======\n\n')
-    s = Semant(ast[0])
-    s.build()
+    with profiler.phase('semantic') as record:
+        s = Semant(ast[0], profiler)
+        serror = s.build()
+    record.counts.update(classes=len(s.classes), errors=len(serror))
+    if cache is not None:
+        cache.put(CHECK, (code,), serror)
 
     if DEBUG:
         print('\n\n====== CLASSES ======\n\n')
@@ -38,3 +75,271 @@ if __name__ == '__main__':
         print(s.parents)
         print('\n\n====== AST ======\n\n')
         print(ast[0])
+
+    return s, serror
+
+
+def compile_incremental(filename, cache_dir):
+    """ Same as compile_file, reusing the results of the last run. """
+    result = IncrementalCompiler(cache_dir).compile(filename)
+    if result.lerror:
+        print('Lex - EROOR')
+        print(result.lerror)
+        sys.exit(1)
+
+    if result.ast is None:
+        print("Sintatic - ERROR")
+        sys.exit(1)
+
+    return result.semant, result.errors
+
+
+def report(results, elapsed):
+    """ Prints the status and the times of each file, and a summary. """
+    print('%-50s %-15s %10s %10s' % ('file', 'status', 'parse (ms)', 'check (ms)'))
+    for result in results:
+        if result.check_time is None:
+            check_time = '-'
+        else:
+            check_time = '%.1f' % (result.check_time * 1000)
+        print('%-50s %-15s %10.1f %10s' % (
+            result.path, result.status, result.parse_time * 1000, check_time
+        ))
+        for error in result.errors:
+            print('    %s' % (error,))
+
+    failed = sum(1 for result in results if result.status != OK)
+    print('\n%d files, %d failed, %.2f s' % (len(results), failed, elapsed))
+    return failed
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description='Cool compiler.')
+    argparser.add_argument(
+        'files', nargs='+', metavar='file',
+        help='the cool files to compile, or directories with cool files'
+    )
+    argparser.add_argument(
+        '-j', '--jobs', type=int,
+        help='how many files are compiled at once (default: one per CPU)'
+    )
+    argparser.add_argument(
+        '--merge', action='store_true',
+        help='check the classes of all the files as one program'
+    )
+    argparser.add_argument(
+        '--run', action='store_true', help='run the program, if it compiles'
+    )
+    argparser.add_argument(
+        '--ignore-semantic-errors', action='store_true',
+        help='print the semantic errors and go on: the checker still '
+             'rejects some valid programs, such as examples/primes.cl, '
+             'cells.cl and sort-list.cl'
+    )
+    argparser.add_argument(
+        '--backend', choices=('vm', 'interpreter', 'mips', 'native'),
+        default='vm',
+        help='what runs the program (default: %(default)s), mips runs it '
+             'with spim, or with a simulator if spim is not installed, '
+             'native compiles it to C and builds it with cc -O2'
+    )
+    argparser.add_argument(
+        '-S', '--assembly', metavar='FILE',
+        help='write the MIPS assembly of the program to FILE, for spim'
+    )
+    argparser.add_argument(
+        '--emit-c', metavar='FILE', help='write the C code of the program to FILE'
+    )
+    argparser.add_argument(
+        '-o', '--output', metavar='FILE',
+        help='build the program to the executable FILE, with cc -O2'
+    )
+    argparser.add_argument(
+        '-O', dest='level', type=int, choices=sorted(LEVELS), default=0,
+        help='optimization level of the program that runs or is written: '
+             '1 folds constants, propagates copies and removes dead code, '
+             '2 also inlines small methods (default: %(default)s)'
+    )
+    argparser.add_argument(
+        '--pass-stats', action='store_true',
+        help='print the changes and the time of each optimization pass'
+    )
+    argparser.add_argument(
+        '--gc-stats', action='store_true',
+        help='print the collections, pauses and bytes promoted by the '
+             'garbage collector of --backend native'
+    )
+    argparser.add_argument(
+        '--incremental', action='store_true',
+        help='only analyze again the classes that changed since the last run'
+    )
+    argparser.add_argument(
+        '--profile', action='store_true',
+        help='measure the time, the memory and the counts (tokens, nodes, '
+             'classes, dispatch sites) of each phase, and print them to '
+             'stderr'
+    )
+    argparser.add_argument(
+        '--profile-format', choices=('text', 'json'), default='text',
+        help='format of the --profile report (default: %(default)s)'
+    )
+    argparser.add_argument(
+        '--profile-output', metavar='FILE',
+        help='write the --profile report to FILE instead'
+    )
+    argparser.add_argument(
+        '--cprofile', metavar='DIR',
+        help='with --profile, write the cProfile stats of each phase to '
+             'DIR/<phase>.prof'
+    )
+    argparser.add_argument(
+        '--cache', action='store_true',
+        help='keep the tokens, the AST and the semantic errors of the file, '
+             'to skip the phases when the same source is compiled again'
+    )
+    argparser.add_argument(
+        '--cache-stats', action='store_true',
+        help='print the hits and misses of --cache'
+    )
+    argparser.add_argument(
+        '--cache-dir', default=CACHE_DIR,
+        help='where --incremental and --cache keep their cache '
+             '(default: %(default)s)'
+    )
+    args = argparser.parse_args()
+
+    batch = (
+        len(args.files) > 1 or os.path.isdir(args.files[0]) or
+        args.merge or args.jobs is not None
+    )
+    if batch:
+        if args.incremental or args.cache:
+            argparser.error('--incremental and --cache work with a single file')
+        program_options = [
+            ('--run', args.run), ('-S', args.assembly),
+            ('--emit-c', args.emit_c), ('-o', args.output), ('-O', args.level),
+            ('--pass-stats', args.pass_stats), ('--gc-stats', args.gc_stats),
+            ('--ignore-semantic-errors', args.ignore_semantic_errors),
+            ('--profile', args.profile),
+        ]
+        given = [name for name, value in program_options if value]
+        if given:
+            argparser.error('%s work with a single file' % ', '.join(given))
+
+        start = time.time()
+        results = compile_files(
+            find_sources(args.files), jobs=args.jobs, merge=args.merge
+        )
+        if report(results, time.time() - start):
+            sys.exit(1)
+        sys.exit(0)
+
+    args.file = args.files[0]
+    profiler = NULL_PROFILER
+    if args.profile:
+        profiler = Profiler(args.cprofile)
+
+        def write_profile():
+            # Also when the compilation stops on an error
+            report = profiler.as_json() if args.profile_format == 'json' else \
+                '\n'.join(profiler.report())
+            if args.profile_output:
+                with open(args.profile_output, 'w') as f:
+                    f.write(report + '\n')
+            else:
+                sys.stderr.write(report + '\n')
+        atexit.register(write_profile)
+
+    if args.incremental:
+        with profiler.phase('incremental'):
+            s, serror = compile_incremental(args.file, args.cache_dir)
+    elif args.cache:
+        cache = ResultCache(directory=os.path.join(args.cache_dir, 'results'))
+        program = bool(
+            args.run or args.assembly or args.emit_c or args.output or
+            args.level
+        )
+        try:
+            s, serror = compile_file(
+                args.file, cache, program, profiler,
+                stop=not args.ignore_semantic_errors
+            )
+        finally:
+            if args.cache_stats:
+                sys.stderr.write('\n'.join(cache.report()) + '\n')
+    else:
+        s, serror = compile_file(args.file, profiler=profiler)
+
+    if serror:
+        print('Semantic - ERROR')
+        for error in serror:
+            print('%s: %s' % (args.file, error))
+        if not args.ignore_semantic_errors:
+            sys.exit(1)
+
+    if args.level:
+        with profiler.phase('optimize -O%d' % args.level) as record:
+            manager = optimize(s, args.level)
+        record.counts.update(
+            nodes=manager.size_after,
+            changes=sum(stats.changes for stats in manager.stats)
+        )
+        if args.pass_stats:
+            sys.stderr.write('\n'.join(manager.report()) + '\n')
+
+    try:
+        if args.assembly:
+            with profiler.phase('mips codegen'):
+                assembly = mips.generate(s)
+            with open(args.assembly, 'w') as f:
+                f.write(assembly)
+        if args.emit_c or args.output:
+            with profiler.phase('c codegen'):
+                source = native.generate(s)
+            if args.emit_c:
+                with open(args.emit_c, 'w') as f:
+                    f.write(source)
+            if args.output:
+                with profiler.phase('cc'):
+                    native.build(source, args.output)
+    except CompileError as e:
+        print('Codegen - ERROR')
+        print('%s: %s' % (args.file, e))
+        sys.exit(1)
+
+    if args.run:
+        try:
+            if args.backend == 'interpreter':
+                with profiler.phase('run (interpreter)'):
+                    interpret(s)
+            elif args.backend == 'mips':
+                with profiler.phase('mips codegen'):
+                    assembly = mips.generate(s)
+                with profiler.phase('run (mips)'):
+                    mips.run(assembly, sys.stdin, sys.stdout)
+            elif args.backend == 'native':
+                with profiler.phase('c codegen'):
+                    source = native.generate(s)
+                # cc builds the program, then it runs
+                with profiler.phase('cc and run (native)'):
+                    stats = native.run(
+                        source, sys.stdin, sys.stdout, gc_stats=args.gc_stats
+                    )
+                if stats is not None:
+                    sys.stderr.write('\n'.join(native.gc_report(stats)) + '\n')
+            else:
+                with profiler.phase('vm codegen') as record:
+                    program = generate(s)
+                record.counts.update(
+                    functions=len(program.functions()), size=program.size()
+                )
+                with profiler.phase('run (vm)'):
+                    run(program)
+        except CompileError as e:
+            print('Codegen - ERROR')
+            print('%s: %s' % (args.file, e))
+            sys.exit(1)
+        except CoolRuntimeError as e:
+            print('\nRuntime - ERROR')
+            print('%s: %s' % (args.file, e))
+            sys.exit(1)
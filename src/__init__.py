@@ -1,3 +1,40 @@
+import hashlib
+import os
+
+__version__ = '0.1.0'
+
+# Computed by compiler_digest, the first time it is needed
+_digest = None
+
+
+def compiler_digest():
+    """
+        A hash of the sources of the compiler. The results kept on disk
+        are indexed by it, so they are computed again after any change
+        to the compiler, even if __version__ stays the same.
+    """
+    global _digest
+    if _digest is not None:
+        return _digest
+
+    digest = hashlib.sha1(__version__)
+    root = os.path.dirname(os.path.abspath(__file__))
+    for directory, subdirectories, files in os.walk(root):
+        # In the same order everywhere
+        subdirectories.sort()
+        for name in sorted(files):
+            # parsetab.py is generated from the grammar
+            if name.endswith(('.py', '.c', '.h', '.s')) and \
+                    name != 'parsetab.py':
+                path = os.path.join(directory, name)
+                with open(path, 'rb') as file:
+                    digest.update('%s\0%s\0' % (
+                        os.path.relpath(path, root), file.read()
+                    ))
+    _digest = digest.hexdigest()
+    return _digest
+
+
 from syntactic import syntactic
 from semantic import Semant
-from lexical import MyLex as lex
\ No newline at end of file
+from lexical import MyLex as lex
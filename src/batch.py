@@ -0,0 +1,214 @@
+"""
+    Compilation of many files at once.
+
+    The files are compiled by a pool of processes. Each file is checked
+    as a program of its own, in the process that parsed it, or the
+    classes of all the files are put together and checked as one
+    program.
+"""
+import cPickle as pickle
+import os
+import time
+from collections import defaultdict, namedtuple
+from multiprocessing import Pool, cpu_count
+
+from .lexical import MyLex
+from .semantic import Semant
+from .syntactic.syntactic import parser
+
+EXTENSION = '.cl'
+
+OK = 'ok'
+READ_ERROR = 'read error'
+LEX_ERROR = 'lex error'
+SYNTAX_ERROR = 'syntax error'
+SEMANTIC_ERROR = 'semantic error'
+# The compiler failed on the file (a bug), the other files go on
+INTERNAL_ERROR = 'internal error'
+
+# What the compilation of a file returns. ast is only kept when the
+# file is not checked yet. check_time is None when the file was checked
+# together with others.
+FileResult = namedtuple(
+    "FileResult", "path, status, ast, errors, parse_time, check_time"
+)
+
+mylex = MyLex()
+
+
+def find_sources(paths):
+    """
+        Returns paths, with each directory replaced by the cool files
+        inside it (and inside its subdirectories), sorted by name.
+    """
+    sources = []
+    for path in paths:
+        if not os.path.isdir(path):
+            sources.append(path)
+            continue
+
+        found = []
+        for root, dirs, files in os.walk(path):
+            found.extend(
+                os.path.join(root, name) for name in files
+                if name.endswith(EXTENSION)
+            )
+        sources.extend(sorted(found))
+    return sources
+
+
+def internal_error(e):
+    """ The error of a file where the compiler raised e. """
+    return '%s: %s' % (type(e).__name__, e)
+
+
+def compile_source(task):
+    """
+        Compiles one file, in a process of the pool.
+
+        task is a (path, check) pair, the file is only lexed and parsed
+        if check is false.
+    """
+    start = time.time()
+    try:
+        return compile_task(task, start)
+    except Exception as e:
+        return FileResult(
+            task[0], INTERNAL_ERROR, None, [internal_error(e)],
+            time.time() - start, None
+        )
+
+
+def pooled_source(task):
+    """
+        compile_source, in a process of the pool. The AST is pickled
+        here: one that can not be sent back (too deep for pickle) is an
+        internal error of its file, instead of stopping the pool.
+    """
+    result = compile_source(task)
+    if result.ast is None:
+        return result
+    try:
+        return result._replace(ast=pickle.dumps(result.ast, 2))
+    except (pickle.PicklingError, RuntimeError, TypeError) as e:
+        return result._replace(
+            status=INTERNAL_ERROR, ast=None,
+            errors=result.errors + [internal_error(e)]
+        )
+
+
+def compile_task(task, start):
+    path, check = task
+
+    try:
+        with open(path) as file:
+            code = file.read()
+    except IOError as e:
+        return FileResult(path, READ_ERROR, None, [e.strerror], 0.0, 0.0)
+
+    llex, lerror = mylex.tokenize(code)
+    if lerror:
+        return FileResult(
+            path, LEX_ERROR, None, list(lerror), time.time() - start, 0.0
+        )
+
+    result, serror = parser.parse(code, echo=False)
+    parse_time = time.time() - start
+    if result is None:
+        return FileResult(path, SYNTAX_ERROR, None, serror, parse_time, 0.0)
+
+    if not check:
+        return FileResult(path, OK, result, serror, parse_time, 0.0)
+
+    start = time.time()
+    errors = Semant(result).build()
+    status = SEMANTIC_ERROR if errors else OK
+    return FileResult(
+        path, status, None, serror + errors, parse_time, time.time() - start
+    )
+
+
+def check_together(results):
+    """
+        Checks the classes of all the parsed files as one program, and
+        gives each file the errors found in its classes.
+    """
+    classes = []
+    origins = {}
+    for i, result in enumerate(results):
+        if result.ast is None:
+            continue
+        for _class in result.ast:
+            origins[id(_class)] = i
+            for feature in _class.feature_list:
+                origins[id(feature)] = i
+        classes.extend(result.ast)
+
+    if not classes:
+        return results
+
+    s = Semant(classes)
+    try:
+        s.build()
+    except Exception as e:
+        # Which file made the checker fail is not known
+        return [
+            result._replace(
+                status=INTERNAL_ERROR, ast=None,
+                errors=result.errors + [internal_error(e)], check_time=None
+            ) if result.ast is not None else result
+            for result in results
+        ]
+
+    found = defaultdict(list)
+    first = min(origins.values())
+    for error, node in zip(s.errors, s.error_nodes):
+        # Errors without a node of the files go to the first file
+        found[origins.get(id(node), first)].append(error)
+
+    checked = []
+    for i, result in enumerate(results):
+        if result.ast is None:
+            checked.append(result)
+            continue
+
+        errors = sorted(found[i], key=lambda error: (error.line, error.column))
+        checked.append(result._replace(
+            status=SEMANTIC_ERROR if errors else result.status,
+            ast=None, errors=result.errors + errors, check_time=None
+        ))
+    return checked
+
+
+def compile_files(paths, jobs=None, merge=False):
+    """
+        Compiles the files in paths, jobs at a time (as many as the
+        CPUs by default), and returns a FileResult for each one, in the
+        same order.
+
+        If merge is true, the classes of all the files are checked as
+        one program.
+    """
+    tasks = [(path, not merge) for path in paths]
+
+    if jobs == 1 or len(tasks) < 2:
+        results = map(compile_source, tasks)
+    else:
+        jobs = jobs or cpu_count()
+        pool = Pool(jobs)
+        try:
+            # Big chunks, the files are many and small
+            chunksize = max(1, len(tasks) // (jobs * 4))
+            results = pool.map(pooled_source, tasks, chunksize)
+        finally:
+            pool.terminate()
+            pool.join()
+        results = [
+            result._replace(ast=pickle.loads(result.ast))
+            if result.ast is not None else result
+            for result in results
+        ]
+
+    if merge:
+        results = check_together(results)
+    return results
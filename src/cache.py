@@ -0,0 +1,236 @@
+"""
+    Cache of the results of the compiler, indexed by the hash of the
+    source and of the sources of the compiler (see compiler_digest).
+
+    The tokens, the parse results and the diagnostics of the sources
+    submitted again are taken from the cache, without lexing, parsing or
+    checking them. The entries are kept pickled, so their size is known
+    and each hit gets its own copy (Semant changes the AST it checks).
+
+    The memory has the entries used last, up to max_bytes; the older ones
+    are dropped (least recently used first). With a directory, the
+    entries are written to disk too, up to max_disk_bytes, and are found
+    there by the next runs. A file that can not be unpickled (cut short
+    by a crash, or corrupt) is removed, and its entry computed again.
+"""
+import cPickle as pickle
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from . import compiler_digest
+
+# Phases of the entries
+TOKENS = 'tokens'
+PARSE = 'parse'
+CHECK = 'check'
+
+MAX_BYTES = 64 * 1024 * 1024
+MAX_DISK_BYTES = 512 * 1024 * 1024
+
+
+def cache_key(phase, *sources):
+    """ The key of the results of phase for sources. """
+    digest = hashlib.sha1()
+    for part in (compiler_digest(), phase) + sources:
+        if isinstance(part, unicode):
+            part = part.encode('utf-8')
+        # The length keeps the parts apart
+        digest.update('%d:%s' % (len(part), part))
+    return digest.hexdigest()
+
+
+class ResultCache(object):
+    """ See the module. Can be used by many threads at once. """
+
+    def __init__(self, max_bytes=MAX_BYTES, directory=None,
+                 max_disk_bytes=MAX_DISK_BYTES):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.lock = threading.Lock()
+        # Key -> pickled entry, the last used at the end
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.disk_bytes = None
+
+        # Phase -> count
+        self.hits = {}
+        self.disk_hits = {}
+        self.misses = {}
+        self.evictions = 0
+
+    def get(self, phase, *sources):
+        """ The entry of phase for sources, or None. """
+        key = cache_key(phase, *sources)
+        with self.lock:
+            data = self.entries.pop(key, None)
+            if data is not None:
+                self.entries[key] = data
+        hits = self.hits
+        if data is None and self.directory is not None:
+            data = self.__read(key)
+            hits = self.disk_hits
+
+        value = None
+        if data is not None:
+            try:
+                value = pickle.loads(data)
+            except Exception:
+                # Unpickling a corrupt file can raise almost anything
+                self.__drop(key, data)
+                data = None
+            else:
+                if hits is self.disk_hits:
+                    self.__keep(key, data)
+        with self.lock:
+            count(self.misses if data is None else hits, phase)
+        return value
+
+    def put(self, phase, sources, value):
+        """ Keeps value, the entry of phase for sources. """
+        try:
+            data = pickle.dumps(value, 2)
+        except (pickle.PicklingError, RuntimeError, TypeError):
+            # A tree too deep for pickle, it is not kept
+            return
+        key = cache_key(phase, *sources)
+        self.__keep(key, data)
+        if self.directory is not None:
+            self.__write(key, data)
+
+    def memoize(self, phase, sources, compute):
+        """ The entry of phase for sources, computed on a miss. """
+        value = self.get(phase, *sources)
+        if value is None:
+            value = compute()
+            self.put(phase, sources, value)
+        return value
+
+    def stats(self):
+        """ The hits, misses and sizes of the cache, in a dictionary. """
+        with self.lock:
+            return {
+                'hits': dict(self.hits),
+                'disk_hits': dict(self.disk_hits),
+                'misses': dict(self.misses),
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def report(self):
+        """ The lines of a report of the hits and misses of each phase. """
+        stats = self.stats()
+        lines = ['%-10s %8s %10s %8s' % ('phase', 'hits', 'disk hits', 'misses')]
+        phases = set(stats['hits']) | set(stats['disk_hits']) | \
+            set(stats['misses'])
+        for phase in sorted(phases):
+            lines.append('%-10s %8d %10d %8d' % (
+                phase, stats['hits'].get(phase, 0),
+                stats['disk_hits'].get(phase, 0), stats['misses'].get(phase, 0)
+            ))
+        lines.append('%d entries, %d bytes in memory, %d evicted' % (
+            stats['entries'], stats['bytes'], stats['evictions']
+        ))
+        return lines
+
+    def __keep(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self.entries[key] = data
+            self.bytes += len(data)
+            while self.bytes > self.max_bytes:
+                _, dropped = self.entries.popitem(last=False)
+                self.bytes -= len(dropped)
+                self.evictions += 1
+
+    def __drop(self, key, data):
+        """ Removes the entry of key, and its file. """
+        with self.lock:
+            if self.entries.pop(key, None) is not None:
+                self.bytes -= len(data)
+        if self.directory is None:
+            return
+        try:
+            os.remove(self.__path(key))
+        except OSError:
+            return
+        with self.lock:
+            if self.disk_bytes is not None:
+                self.disk_bytes -= len(data)
+
+    # Disk
+
+    def __path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.pickle')
+
+    def __read(self, key):
+        path = self.__path(key)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+            # The time of the last use, for __trim
+            os.utime(path, None)
+            return data
+        except (IOError, OSError):
+            return None
+
+    def __write(self, key, data):
+        path = self.__path(key)
+        try:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            # Other processes can share the directory
+            temporary = '%s.%d.%d.tmp' % (
+                path, os.getpid(), threading.current_thread().ident
+            )
+            with open(temporary, 'wb') as file:
+                file.write(data)
+            os.rename(temporary, path)
+        except (IOError, OSError):
+            return
+
+        with self.lock:
+            if self.disk_bytes is None:
+                self.disk_bytes = sum(size for _, size, _ in self.__files())
+            else:
+                self.disk_bytes += len(data)
+            if self.disk_bytes > self.max_disk_bytes:
+                self.__trim()
+
+    def __files(self):
+        """ (time of the last use, size, path) of the files on disk. """
+        found = []
+        for root, dirs, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, stat.st_size, path))
+        return found
+
+    def __trim(self):
+        """ Removes the files used least recently, down to 3/4 of the limit. """
+        files = sorted(self.__files())
+        self.disk_bytes = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if self.disk_bytes <= self.max_disk_bytes * 3 // 4:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.disk_bytes -= size
+
+
+def count(counters, phase):
+    counters[phase] = counters.get(phase, 0) + 1
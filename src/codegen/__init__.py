@@ -0,0 +1,3 @@
+from .codegen import generate, CompileError
+from .runtime import CoolRuntimeError
+from .vm import VM, run
@@ -0,0 +1,444 @@
+"""
+    Generation of bytecode for the virtual machine (see opcodes).
+
+    Every method is compiled to a Function. The classes come from the
+    class table built by Semant: each one gets the layout of its
+    objects, its vtable and, if an attribute has an initialization, an
+    init Function that runs the initializations of the class and of its
+    ancestors, from Object down.
+"""
+from array import array
+
+from ..optimizer.hierarchy import devirtualize
+from ..syntactic.ast import *
+
+from opcodes import *
+from runtime import BUILTINS, RuntimeClass, default_value
+
+
+class CompileError(Exception):
+
+    def __init__(self, message, line=None):
+        super(CompileError, self).__init__(message)
+        self.line = line
+
+    def __str__(self):
+        msg = super(CompileError, self).__str__()
+        if not self.line:
+            return msg
+        return 'line %d: %s' % (self.line, msg)
+
+
+class Function(object):
+    """ The code of a method, with the number of its arguments and locals. """
+    __slots__ = ('name', 'nargs', 'nlocals', 'code')
+
+    def __init__(self, name, nargs, nlocals, code):
+        self.name = name
+        self.nargs = nargs
+        self.nlocals = nlocals
+        self.code = code
+
+    def __repr__(self):
+        return '<function %s>' % self.name
+
+
+class Program(object):
+    """
+        A compiled program. The operands of the instructions are indexes
+        in classes, names, constants, cases and calls.
+
+        Each case table maps the index of a class to where its branch
+        begins. entry creates a Main and calls its main method. calls has
+        the methods called directly, by CALL, without a vtable.
+    """
+
+    def __init__(self):
+        self.classes = []
+        self.by_name = {}
+        self.names = []
+        self.constants = []
+        self.cases = []
+        self.calls = []
+        self.entry = None
+
+    def functions(self):
+        """ Every Function of the program. """
+        found = set([self.entry])
+        for klass in self.classes:
+            found.add(klass.init)
+            found.update(
+                method for method in klass.vtable.values()
+                if isinstance(method, Function)
+            )
+        found.discard(None)
+        return found
+
+    def size(self):
+        """ Number of ints in the code of the program. """
+        return sum(len(function.code) for function in self.functions())
+
+
+class CodeGenerator(NodeVisitor):
+    """
+        Compiles the classes of a program analyzed by Semant.
+
+        Expressions are compiled by the visit_<node class name> methods,
+        each one leaves the value of the expression on the stack. With
+        direct_calls, a dispatch with one possible target (see
+        optimizer.hierarchy) is compiled to a CALL.
+    """
+
+    def __init__(self, semant, direct_calls=True):
+        super(CodeGenerator, self).__init__()
+        self.semant = semant
+        self.program = Program()
+        self.__names = {}
+        self.__constants = {}
+        self.__targets = devirtualize(semant).targets if direct_calls else {}
+        # (class, method name) -> index in calls
+        self.__calls = {}
+
+    def generate(self):
+        """ Returns the Program. """
+        self.__add_class('Object', None)
+
+        # The parents come before their children
+        for klass in self.program.classes:
+            if klass.parent is not None:
+                klass.vtable.update(klass.parent.vtable)
+            _class = self.semant.classes[klass.name]
+            for feature in _class.feature_list:
+                if isinstance(feature, Method):
+                    self.__add_method(klass, feature)
+            klass.init = self.__compile_init(klass)
+
+        if 'Main' not in self.program.by_name:
+            raise CompileError('Class Main is not defined')
+        self.program.entry = self.__compile_entry()
+        self.program.calls = [
+            self.program.by_name[owner].vtable[self.__name(name)]
+            for (owner, name), _ in sorted(
+                self.__calls.items(), key=lambda item: item[1]
+            )
+        ]
+        return self.program
+
+    def __add_class(self, name, parent):
+        """ Adds the class name and its children, parents first. """
+        klass = RuntimeClass(name, len(self.program.classes), parent)
+        self.program.classes.append(klass)
+        self.program.by_name[name] = klass
+
+        for feature in self.semant.classes[name].feature_list:
+            if isinstance(feature, Attr):
+                klass.attributes.append(feature.name)
+                klass.defaults.append(default_value(feature.type))
+
+        for child in sorted(self.semant.parents[name]):
+            self.__add_class(child, klass)
+
+    def __add_method(self, klass, method):
+        name = self.__name(method.name)
+        if method.body is None:
+            klass.vtable[name] = BUILTINS[klass.name, method.name]
+            return
+
+        self.__begin(klass)
+        for formal in method.formal_list:
+            self.__declare(formal.name)
+        self.visit(method.body)
+        self.__emit(RETURN)
+        klass.vtable[name] = self.__end(
+            '%s.%s' % (klass.name, method.name), len(method.formal_list)
+        )
+
+    def __compile_init(self, klass):
+        """ Returns the init Function of klass, or None if it needs none. """
+        chain = []
+        ancestor = klass
+        while ancestor is not None:
+            chain.append(ancestor)
+            ancestor = ancestor.parent
+
+        self.__begin(klass)
+        initialized = False
+        for ancestor in reversed(chain):
+            _class = self.semant.classes[ancestor.name]
+            for feature in _class.feature_list:
+                if isinstance(feature, Attr) and feature.body is not None:
+                    # The names are those seen in the class of the attribute
+                    self.__class = ancestor
+                    self.visit(feature.body)
+                    self.__emit(STORE_ATTR, self.__attribute(feature.name))
+                    self.__emit(POP)
+                    initialized = True
+        self.__emit(LOAD_SELF)
+        self.__emit(RETURN)
+        function = self.__end('%s.<init>' % klass.name, 0)
+
+        if klass.name in ('Int', 'Bool', 'String') or not initialized:
+            return None
+        return function
+
+    def __compile_entry(self):
+        """ Function that runs (new Main).main(). """
+        self.__begin(None)
+        self.__emit(NEW, self.program.by_name['Main'].index)
+        self.__emit(DISPATCH, self.__name('main'), 0, 0)
+        self.__emit(RETURN)
+        return self.__end('<entry>', 0)
+
+    # Functions
+
+    def __begin(self, klass):
+        self.__class = klass
+        self.__code = array('l')
+        self.__scopes = [{}]
+        self.__next_slot = 0
+        self.__nlocals = 0
+
+    def __end(self, name, nargs):
+        return Function(name, nargs, self.__nlocals, self.__code)
+
+    def __emit(self, opcode, *operands):
+        """ Adds an instruction, returns where it is in the code. """
+        position = len(self.__code)
+        self.__code.append(opcode)
+        self.__code.extend(operands)
+        return position
+
+    def __patch(self, position, target=None):
+        """ Makes the jump in position go to target, the end by default. """
+        if target is None:
+            target = len(self.__code)
+        self.__code[position + 1] = target
+
+    def __name(self, name):
+        if name not in self.__names:
+            self.__names[name] = len(self.program.names)
+            self.program.names.append(name)
+        return self.__names[name]
+
+    def __constant(self, value):
+        # True == 1, the type is part of the key
+        key = (type(value), value)
+        if key not in self.__constants:
+            self.__constants[key] = len(self.program.constants)
+            self.program.constants.append(value)
+        return self.__constants[key]
+
+    def __class_index(self, name, node):
+        if name not in self.program.by_name:
+            raise CompileError('Undefined class %s' % name, node.line)
+        return self.program.by_name[name].index
+
+    # Names
+
+    def __declare(self, name):
+        """ Gives a slot to the local name, in the innermost scope. """
+        slot = self.__next_slot
+        self.__scopes[-1][name] = slot
+        self.__next_slot += 1
+        self.__nlocals = max(self.__nlocals, self.__next_slot)
+        return slot
+
+    def __enter(self):
+        self.__scopes.append({})
+
+    def __leave(self):
+        # The slots of the scope are used again by the next one
+        self.__next_slot -= len(self.__scopes.pop())
+
+    def __local(self, name):
+        for scope in reversed(self.__scopes):
+            if name in scope:
+                return scope[name]
+        return None
+
+    def __attribute(self, name):
+        try:
+            return self.__class.attributes.index(name)
+        except ValueError:
+            return None
+
+    # Expressions
+
+    def generic_visit(self, expression):
+        raise CompileError(
+            'Can not compile %r' % (expression,),
+            getattr(expression, 'line', None)
+        )
+
+    def visit_Int(self, expression):
+        self.__emit(LOAD_CONST, self.__constant(expression.content))
+
+    visit_Bool = visit_Str = visit_Int
+
+    def visit_Object(self, expression):
+        if expression.name == 'self':
+            self.__emit(LOAD_SELF)
+            return
+
+        slot = self.__local(expression.name)
+        if slot is not None:
+            self.__emit(LOAD_LOCAL, slot)
+            return
+
+        slot = self.__attribute(expression.name)
+        if slot is not None:
+            self.__emit(LOAD_ATTR, slot)
+            return
+
+        raise CompileError(
+            'Undefined name %s' % expression.name, expression.line
+        )
+
+    def visit_Assign(self, expression):
+        self.visit(expression.body)
+        name = expression.name.name
+
+        slot = self.__local(name)
+        if slot is not None:
+            self.__emit(STORE_LOCAL, slot)
+            return
+
+        slot = self.__attribute(name)
+        if slot is not None:
+            self.__emit(STORE_ATTR, slot)
+            return
+
+        raise CompileError('Can not assign to %s' % name, expression.line)
+
+    def visit_Block(self, expression):
+        for i, inner in enumerate(expression.body):
+            if i:
+                self.__emit(POP)
+            self.visit(inner)
+
+    def visit_Dispatch(self, expression):
+        # The arguments are evaluated before the receiver, the receiver
+        # is on the top of the stack
+        for argument in expression.expr_list:
+            self.visit(argument)
+        if expression.body == 'self':
+            self.__emit(LOAD_SELF)
+        else:
+            self.visit(expression.body)
+
+        target = self.__targets.get(id(expression))
+        if target is not None and target[0] in self.program.by_name:
+            if target not in self.__calls:
+                self.__calls[target] = len(self.__calls)
+            self.__emit(
+                CALL, self.__calls[target], len(expression.expr_list),
+                expression.line or 0
+            )
+            return
+        self.__emit(
+            DISPATCH, self.__name(expression.method),
+            len(expression.expr_list), expression.line or 0
+        )
+
+    def visit_StaticDispatch(self, expression):
+        for argument in expression.expr_list:
+            self.visit(argument)
+        self.visit(expression.body)
+        self.__emit(
+            STATIC_DISPATCH, self.__class_index(expression.type, expression),
+            self.__name(expression.method), len(expression.expr_list),
+            expression.line or 0
+        )
+
+    __OPERATORS = {Plus: ADD, Sub: SUB, Mult: MUL, Lt: LT, Le: LE, Eq: EQ}
+
+    def visit_Plus(self, expression):
+        self.visit(expression.first)
+        self.visit(expression.second)
+        self.__emit(self.__OPERATORS[type(expression)])
+
+    visit_Sub = visit_Mult = visit_Lt = visit_Le = visit_Eq = visit_Plus
+
+    def visit_Div(self, expression):
+        self.visit(expression.first)
+        self.visit(expression.second)
+        self.__emit(DIV, expression.line or 0)
+
+    def visit_Neg(self, expression):
+        self.visit(expression.body)
+        self.__emit(NEG)
+
+    def visit_Not(self, expression):
+        self.visit(expression.body)
+        self.__emit(NOT)
+
+    def visit_Isvoid(self, expression):
+        self.visit(expression.body)
+        self.__emit(ISVOID)
+
+    def visit_If(self, expression):
+        self.visit(expression.predicate)
+        to_else = self.__emit(JUMP_IF_FALSE, 0)
+        self.visit(expression.then_body)
+        to_end = self.__emit(JUMP, 0)
+        self.__patch(to_else)
+        self.visit(expression.else_body)
+        self.__patch(to_end)
+
+    def visit_While(self, expression):
+        start = len(self.__code)
+        self.visit(expression.predicate)
+        to_end = self.__emit(JUMP_IF_FALSE, 0)
+        self.visit(expression.body)
+        self.__emit(POP)
+        self.__emit(JUMP, start)
+        self.__patch(to_end)
+        # A loop is void
+        self.__emit(LOAD_CONST, self.__constant(None))
+
+    def visit_Let(self, expression):
+        if expression.init is None:
+            value = default_value(expression.type)
+            self.__emit(LOAD_CONST, self.__constant(value))
+        else:
+            self.visit(expression.init)
+
+        self.__enter()
+        self.__emit(STORE_LOCAL, self.__declare(expression.object))
+        self.__emit(POP)
+        self.visit(expression.body)
+        self.__leave()
+
+    def visit_Case(self, expression):
+        self.visit(expression.expr)
+
+        table = {}
+        self.program.cases.append(table)
+        self.__emit(CASE, len(self.program.cases) - 1, expression.line or 0)
+
+        ends = []
+        for branch in expression.case_list:
+            index = self.__class_index(branch.type, branch)
+            # The first branch of a type is the one taken
+            table.setdefault(index, len(self.__code))
+
+            self.__enter()
+            self.__emit(STORE_LOCAL, self.__declare(branch.name))
+            self.__emit(POP)
+            self.visit(branch.body)
+            self.__leave()
+            ends.append(self.__emit(JUMP, 0))
+
+        for end in ends:
+            self.__patch(end)
+
+    def visit_New(self, expression):
+        if expression.type == 'SELF_TYPE':
+            self.__emit(NEW_SELF_TYPE)
+        else:
+            self.__emit(NEW, self.__class_index(expression.type, expression))
+
+
+def generate(semant, direct_calls=True):
+    """ Compiles the program analyzed by semant (see Semant.build). """
+    return CodeGenerator(semant, direct_calls).generate()
@@ -0,0 +1,61 @@
+"""
+    Instructions of the Cool virtual machine.
+
+    The code of a function is an array of ints: each instruction is an
+    opcode followed by its operands. The machine has a stack of values,
+    the operands of the instructions are indexes (in the constants, the
+    locals, the attributes, ...) or jump targets.
+"""
+
+# The most used instructions come first, the virtual machine tests
+# them in this order.
+NAMES = [
+    'LOAD_LOCAL', 'LOAD_ATTR', 'LOAD_CONST', 'LOAD_SELF', 'STORE_LOCAL',
+    'STORE_ATTR', 'POP', 'DISPATCH', 'CALL', 'RETURN', 'JUMP_IF_FALSE', 'JUMP',
+    'ADD', 'SUB', 'MUL', 'DIV', 'LT', 'LE', 'EQ', 'NOT', 'NEG', 'ISVOID',
+    'NEW', 'NEW_SELF_TYPE', 'STATIC_DISPATCH', 'CASE',
+]
+
+(
+    LOAD_LOCAL, LOAD_ATTR, LOAD_CONST, LOAD_SELF, STORE_LOCAL,
+    STORE_ATTR, POP, DISPATCH, CALL, RETURN, JUMP_IF_FALSE, JUMP,
+    ADD, SUB, MUL, DIV, LT, LE, EQ, NOT, NEG, ISVOID,
+    NEW, NEW_SELF_TYPE, STATIC_DISPATCH, CASE,
+) = range(len(NAMES))
+
+# Operands of each instruction
+OPERANDS = {
+    LOAD_LOCAL: ('slot',),
+    LOAD_ATTR: ('slot',),
+    LOAD_CONST: ('constant',),
+    STORE_LOCAL: ('slot',),
+    STORE_ATTR: ('slot',),
+    DISPATCH: ('name', 'argc', 'line'),
+    CALL: ('call', 'argc', 'line'),
+    JUMP_IF_FALSE: ('target',),
+    JUMP: ('target',),
+    DIV: ('line',),
+    NEW: ('class',),
+    STATIC_DISPATCH: ('class', 'name', 'argc', 'line'),
+    CASE: ('table', 'line'),
+}
+
+
+def size(opcode):
+    """ Number of ints taken by an instruction. """
+    return 1 + len(OPERANDS.get(opcode, ()))
+
+
+def disassemble(function):
+    """ Returns the code of function as text, one instruction by line. """
+    lines = []
+    code = function.code
+    pc = 0
+    while pc < len(code):
+        opcode = code[pc]
+        operands = code[pc + 1:pc + size(opcode)]
+        lines.append('%5d %-16s %s' % (
+            pc, NAMES[opcode], ' '.join(str(i) for i in operands)
+        ))
+        pc += size(opcode)
+    return '\n'.join(lines)
@@ -0,0 +1,157 @@
+"""
+    What the compiled programs use when they run: objects, classes and
+    the methods of the basic classes.
+
+    Int, Bool and String values are Python int, bool and str, void is
+    None. The objects of the other classes are Obj.
+"""
+
+# Values of the basic classes, and their default values
+VALUES = {'Int': 0, 'Bool': False, 'String': ''}
+
+
+# Int is a 32 bits integer
+MIN_INT = -2 ** 31
+MAX_INT = 2 ** 31 - 1
+
+
+def wrap(value):
+    """ value as a 32 bits integer, it wraps around on overflow. """
+    return (value - MIN_INT) % 2 ** 32 + MIN_INT
+
+
+def default_value(_type):
+    """ Value of an attribute or variable of _type without initialization. """
+    return VALUES.get(_type)
+
+
+class CoolRuntimeError(Exception):
+    """ An error while the program runs, like a dispatch to void. """
+
+    def __init__(self, message, line=None):
+        super(CoolRuntimeError, self).__init__(message)
+        self.line = line
+
+    def __str__(self):
+        msg = super(CoolRuntimeError, self).__str__()
+        if not self.line:
+            return msg
+        return 'line %d: %s' % (self.line, msg)
+
+
+class Abort(CoolRuntimeError):
+    """ The program called abort. """
+    pass
+
+
+class Obj(object):
+    """ An object of a class that is not a basic one. """
+    __slots__ = ('klass', 'attributes')
+
+    def __init__(self, klass, attributes):
+        self.klass = klass
+        self.attributes = attributes
+
+
+class RuntimeClass(object):
+    """
+        A class of the program, as the virtual machine sees it.
+
+        attributes are the names of the attributes of the objects,
+        the inherited ones first, so an attribute has the same slot in
+        a class and in its children. vtable maps the index of a method
+        name (see Program.names) to a Function or to a builtin.
+    """
+    __slots__ = (
+        'name', 'index', 'parent', 'attributes', 'defaults', 'vtable', 'init'
+    )
+
+    def __init__(self, name, index, parent):
+        self.name = name
+        self.index = index
+        self.parent = parent
+        if parent is None:
+            self.attributes = []
+            self.defaults = []
+        else:
+            self.attributes = list(parent.attributes)
+            self.defaults = list(parent.defaults)
+        self.vtable = {}
+        # Function that initializes the attributes, if any has a value
+        self.init = None
+
+    def new(self):
+        """ A new object of the class, without initialization. """
+        if self.name in VALUES:
+            return VALUES[self.name]
+        return Obj(self, list(self.defaults))
+
+    def __repr__(self):
+        return '<class %s>' % self.name
+
+
+# Builtin methods: they take the machine running the program, the
+# receiver and the arguments.
+
+def abort(vm, receiver):
+    vm.stdout.write('Abort called from class %s\n' % vm.class_of(receiver).name)
+    raise Abort('abort')
+
+
+def type_name(vm, receiver):
+    return vm.class_of(receiver).name
+
+
+def copy(vm, receiver):
+    if type(receiver) is Obj:
+        return Obj(receiver.klass, list(receiver.attributes))
+    return receiver
+
+
+def out_string(vm, receiver, arg):
+    vm.stdout.write(arg)
+    return receiver
+
+
+def out_int(vm, receiver, arg):
+    vm.stdout.write(str(arg))
+    return receiver
+
+
+def in_string(vm, receiver):
+    return vm.stdin.readline().rstrip('\n')
+
+
+def in_int(vm, receiver):
+    try:
+        return int(vm.stdin.readline())
+    except ValueError:
+        return 0
+
+
+def length(vm, receiver):
+    return len(receiver)
+
+
+def concat(vm, receiver, arg):
+    return receiver + arg
+
+
+def substr(vm, receiver, start, count):
+    if start < 0 or count < 0 or start + count > len(receiver):
+        raise CoolRuntimeError('Index out of range in substr')
+    return receiver[start:start + count]
+
+
+BUILTINS = {
+    ('Object', 'abort'): abort,
+    ('Object', 'type_name'): type_name,
+    ('Object', 'copy'): copy,
+    ('IO', 'out_string'): out_string,
+    ('IO', 'out_int'): out_int,
+    ('IO', 'in_string'): in_string,
+    ('IO', 'in_int'): in_int,
+    ('String', 'length'): length,
+    ('String', 'concat'): concat,
+    ('String', 'substr'): substr,
+}
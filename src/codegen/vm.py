@@ -0,0 +1,254 @@
+"""
+    Virtual machine that runs the bytecode of a Program.
+
+    The machine has one stack of values, shared by all the calls. A call
+    saves where the caller was (code, pc, locals and self) in a stack of
+    frames, so a deep recursion in Cool is not a recursion in Python.
+"""
+import sys
+
+from opcodes import *
+from codegen import Function
+from runtime import CoolRuntimeError, Obj, MIN_INT, MAX_INT, wrap
+
+
+class VM(object):
+
+    def __init__(self, program, stdin=None, stdout=None):
+        self.program = program
+        self.stdin = stdin or sys.stdin
+        self.stdout = stdout or sys.stdout
+        by_name = program.by_name
+        # Classes of the values that are not Obj
+        self.value_classes = {
+            int: by_name['Int'], long: by_name['Int'],
+            bool: by_name['Bool'], str: by_name['String'],
+        }
+        # Instructions executed so far
+        self.instructions = 0
+
+    def class_of(self, value):
+        if type(value) is Obj:
+            return value.klass
+        return self.value_classes[type(value)]
+
+    def run(self):
+        """ Runs the program, returns the value of main. """
+        return self.execute(self.program.entry, None)
+
+    def execute(self, function, receiver):
+        """ Calls function, with receiver as self, and no arguments. """
+        program = self.program
+        constants = program.constants
+        classes = program.classes
+        cases = program.cases
+        calls = program.calls
+        value_classes = self.value_classes
+
+        code = function.code
+        pc = 0
+        local = [None] * function.nlocals
+        this = receiver
+
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        frames = []
+        count = 0
+
+        try:
+            while True:
+                op = code[pc]
+                count += 1
+
+                if op == LOAD_LOCAL:
+                    push(local[code[pc + 1]])
+                    pc += 2
+                elif op == LOAD_ATTR:
+                    push(this.attributes[code[pc + 1]])
+                    pc += 2
+                elif op == LOAD_CONST:
+                    push(constants[code[pc + 1]])
+                    pc += 2
+                elif op == LOAD_SELF:
+                    push(this)
+                    pc += 1
+                elif op == STORE_LOCAL:
+                    local[code[pc + 1]] = stack[-1]
+                    pc += 2
+                elif op == STORE_ATTR:
+                    this.attributes[code[pc + 1]] = stack[-1]
+                    pc += 2
+                elif op == POP:
+                    pop()
+                    pc += 1
+
+                elif op == DISPATCH or op == STATIC_DISPATCH or op == CALL:
+                    if op == CALL:
+                        # The method is known, the receiver is only checked
+                        method = calls[code[pc + 1]]
+                        argc = code[pc + 2]
+                        line = code[pc + 3]
+                        following = pc + 4
+                    elif op == DISPATCH:
+                        klass = None
+                        name = code[pc + 1]
+                        argc = code[pc + 2]
+                        line = code[pc + 3]
+                        following = pc + 4
+                    else:
+                        klass = classes[code[pc + 1]]
+                        name = code[pc + 2]
+                        argc = code[pc + 3]
+                        line = code[pc + 4]
+                        following = pc + 5
+
+                    receiver = pop()
+                    base = len(stack) - argc
+                    if receiver is None:
+                        raise CoolRuntimeError('Dispatch to void', line)
+
+                    if op != CALL:
+                        if klass is None:
+                            if type(receiver) is Obj:
+                                klass = receiver.klass
+                            else:
+                                klass = value_classes[type(receiver)]
+
+                        method = klass.vtable.get(name)
+                        if method is None:
+                            raise CoolRuntimeError(
+                                'Undefined method %s in class %s' % (
+                                    program.names[name], klass.name
+                                ), line
+                            )
+
+                    args = stack[base:]
+                    del stack[base:]
+                    if type(method) is Function:
+                        frames.append((code, following, local, this))
+                        code = method.code
+                        pc = 0
+                        local = args + [None] * (method.nlocals - argc)
+                        this = receiver
+                    else:
+                        push(method(self, receiver, *args))
+                        pc = following
+
+                elif op == RETURN:
+                    # The value returned stays on the stack
+                    if not frames:
+                        return pop()
+                    code, pc, local, this = frames.pop()
+
+                elif op == JUMP_IF_FALSE:
+                    if pop():
+                        pc += 2
+                    else:
+                        pc = code[pc + 1]
+                elif op == JUMP:
+                    pc = code[pc + 1]
+
+                elif op == ADD:
+                    value = stack[-2] + pop()
+                    if not MIN_INT <= value <= MAX_INT:
+                        value = wrap(value)
+                    stack[-1] = value
+                    pc += 1
+                elif op == SUB:
+                    value = stack[-2] - pop()
+                    if not MIN_INT <= value <= MAX_INT:
+                        value = wrap(value)
+                    stack[-1] = value
+                    pc += 1
+                elif op == MUL:
+                    value = stack[-2] * pop()
+                    if not MIN_INT <= value <= MAX_INT:
+                        value = wrap(value)
+                    stack[-1] = value
+                    pc += 1
+                elif op == DIV:
+                    value = pop()
+                    if value == 0:
+                        raise CoolRuntimeError('Division by zero', code[pc + 1])
+                    # Rounds towards zero, like C
+                    quotient = abs(stack[-1]) // abs(value)
+                    if (stack[-1] < 0) != (value < 0):
+                        quotient = -quotient
+                    stack[-1] = wrap(quotient)
+                    pc += 2
+                elif op == LT:
+                    value = pop()
+                    stack[-1] = stack[-1] < value
+                    pc += 1
+                elif op == LE:
+                    value = pop()
+                    stack[-1] = stack[-1] <= value
+                    pc += 1
+                elif op == EQ:
+                    # Basic values are equal by value, objects by identity
+                    value = pop()
+                    other = stack[-1]
+                    stack[-1] = other is value or (
+                        type(other) is type(value) and other == value
+                    )
+                    pc += 1
+                elif op == NOT:
+                    stack[-1] = not stack[-1]
+                    pc += 1
+                elif op == NEG:
+                    stack[-1] = wrap(-stack[-1])
+                    pc += 1
+                elif op == ISVOID:
+                    stack[-1] = stack[-1] is None
+                    pc += 1
+
+                elif op == NEW or op == NEW_SELF_TYPE:
+                    if op == NEW:
+                        klass = classes[code[pc + 1]]
+                        pc += 2
+                    else:
+                        klass = self.class_of(this)
+                        pc += 1
+
+                    obj = klass.new()
+                    init = klass.init
+                    if init is None:
+                        push(obj)
+                    else:
+                        # init returns the object
+                        frames.append((code, pc, local, this))
+                        code = init.code
+                        pc = 0
+                        local = [None] * init.nlocals
+                        this = obj
+
+                elif op == CASE:
+                    value = stack[-1]
+                    if value is None:
+                        raise CoolRuntimeError('Case on void', code[pc + 2])
+
+                    table = cases[code[pc + 1]]
+                    klass = self.class_of(value)
+                    # The branch of the closest ancestor
+                    while klass is not None and klass.index not in table:
+                        klass = klass.parent
+                    if klass is None:
+                        raise CoolRuntimeError(
+                            'No branch of case for class %s' % (
+                                self.class_of(value).name
+                            ), code[pc + 2]
+                        )
+                    pc = table[klass.index]
+
+                else:
+                    raise CoolRuntimeError('Bad opcode %d' % op)
+        finally:
+            self.instructions += count
+
+
+def run(program, stdin=None, stdout=None):
+    """ Runs program, returns the VM, with the number of instructions. """
+    vm = VM(program, stdin, stdout)
+    vm.run()
+    return vm
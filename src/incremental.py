@@ -0,0 +1,333 @@
+"""
+    Incremental compilation.
+
+    The source is split in classes, without the full lexer. The AST of
+    each class is kept in a cache on disk, indexed by a hash of the
+    class' text and of the sources of the compiler, so only the classes
+    that changed are parsed again.
+
+    The class table is built for the whole program on every run (it is
+    cheap), but the features of a class are checked again only if the
+    class, or a class it depends on, changed. A class depends on its
+    parent and on every class whose name it uses, and so on.
+"""
+import hashlib
+import os
+import re
+import cPickle as pickle
+from collections import namedtuple
+
+from . import compiler_digest
+from .lexical import MyLex
+from .lexical import tokrules
+from .semantic import Semant
+from .syntactic.ast import walk, Class
+from .syntactic.syntactic import parser
+
+CACHE_DIR = '.coolcache'
+
+# What a compilation returns. semant has the class table, checked is
+# the number of classes whose features were checked in this run.
+Result = namedtuple("Result", "ast, semant, lerror, serror, errors, checked")
+
+# Finds where classes begin and end: the class keyword, braces and
+# semicolons that are not inside a comment or a string.
+SPLITTER = re.compile(r'''
+    (?P<skip> %s | %s )
+  | (?P<open> \{ )
+  | (?P<close> \} )
+  | (?P<semi> ; )
+  | (?P<class> \b[cC][lL][aA][sS][sS]\b )
+''' % (tokrules.t_COMMENT.__doc__, tokrules.t_STRING.__doc__), re.VERBOSE)
+
+
+def split_classes(code):
+    """
+        Returns the (start, end) offsets of the classes of code, or None
+        if the braces are not balanced.
+    """
+    spans = []
+    depth = 0
+    start = None
+
+    for m in SPLITTER.finditer(code):
+        kind = m.lastgroup
+        if kind == 'class' and depth == 0 and start is None:
+            start = m.start()
+        elif kind == 'open':
+            depth += 1
+        elif kind == 'close':
+            depth -= 1
+        elif kind == 'semi' and depth == 0 and start is not None:
+            spans.append((start, m.end()))
+            start = None
+
+    if depth != 0 or start is not None:
+        return None
+    return spans
+
+
+# The names of classes, and other words that start with a capital
+TYPE_NAME = re.compile(r'\b[A-Z][a-zA-Z_0-9]*')
+
+
+def used_types(text):
+    """
+        Names of the classes used in the definition of a class, text.
+
+        The names in comments and strings are there too: the class only
+        depends on more classes, and is checked more often than needed.
+    """
+    return frozenset(TYPE_NAME.findall(text))
+
+
+def digest(*parts):
+    return hashlib.sha1(repr(parts)).hexdigest()
+
+
+def move(nodes, lines):
+    """ Adds lines to the line of every node. """
+    for node in nodes:
+        if node.line is not None:
+            node.line += lines
+
+
+class ClassSource(object):
+    """
+        The text of a class in the source, from the beginning of its
+        first line, so the columns are the same as in the whole source.
+    """
+
+    def __init__(self, code, start, end, line):
+        first = code.rfind('\n', 0, start) + 1
+        self.line = line
+        self.text = code[first:end]
+        # The lexer counts the columns of the first line of the input
+        # one less than the others, so a class that is not on the first
+        # line is parsed after a newline.
+        if line > 1:
+            self.text = '\n' + self.text
+            self.offset = line - 2
+        else:
+            self.offset = 0
+        self.key = digest(compiler_digest(), self.text)
+
+
+def new_cache():
+    """ An empty cache, for IncrementalCompiler.check. """
+    return {
+        'version': compiler_digest(),
+        'classes': {}, 'checks': {}, 'nodes': {},
+    }
+
+
+def valid_cache(cache):
+    """ True if cache, read from disk, is a cache of this compiler. """
+    return isinstance(cache, dict) and \
+        cache.get('version') == compiler_digest() and \
+        isinstance(cache.get('classes'), dict) and \
+        isinstance(cache.get('checks'), dict)
+
+
+class IncrementalCompiler(object):
+    """
+        Compiles files, reusing what did not change since the last run.
+
+        If echo is false, the syntax errors are not printed.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, echo=True):
+        self.cache_dir = cache_dir
+        self.echo = echo
+        self.mylex = MyLex()
+
+    def compile(self, path):
+        with open(path) as file:
+            code = file.read()
+
+        cache = self.__load(path)
+        result = self.check(code, cache)
+        self.__save(path, cache)
+
+        return result
+
+    def check(self, code, cache):
+        """
+            Compiles code, reusing cache (see new_cache), a cache kept in
+            memory. After the call, cache only has what this run used.
+
+            The classes of the result that did not change are the nodes
+            of the last call, they must not be changed.
+        """
+        # What this run uses, the rest is dropped
+        cache['used'] = {'classes': {}, 'checks': {}, 'nodes': {}}
+        result = self.__compile(code, cache)
+        if result is None:
+            result = self.__compile_all(code)
+
+        used = cache.pop('used')
+        cache['classes'] = used['classes']
+        cache['checks'] = used['checks']
+        cache['nodes'] = used['nodes']
+        return result
+
+    def __compile(self, code, cache):
+        spans = split_classes(code)
+        if spans is None:
+            return None
+
+        # Between the classes there must be only comments and spaces
+        gaps = zip([0] + [end for start, end in spans],
+                   [start for start, end in spans] + [len(code)])
+        for start, end in gaps:
+            if code[start:end].isspace():
+                continue
+            llex, lerror = self.mylex.tokenize(code[start:end])
+            if llex or lerror:
+                return None
+
+        sources = []
+        line = 1
+        last = 0
+        for start, end in spans:
+            line += code.count('\n', last, start)
+            sources.append(ClassSource(code, start, end, line))
+            line += code.count('\n', start, end)
+            last = end
+
+        asts = {}
+        classes = {}
+        uses = {}
+        for source in sources:
+            entry = cache['classes'].get(source.key)
+            # The nodes of the last check, at the same lines
+            _class = cache['nodes'].get((source.key, source.offset))
+            if entry is not None and _class is None:
+                try:
+                    _class = pickle.loads(entry[0])
+                    if not isinstance(_class, Class):
+                        raise TypeError('Not a class')
+                    if entry[2] != source.offset:
+                        # The class moved, it is kept at its new lines
+                        move(walk(_class), source.offset - entry[2])
+                        entry = self.__entry(_class, entry[1], source)
+                except Exception:
+                    # Unpickling a corrupt entry can raise almost
+                    # anything, the class is parsed again
+                    entry = None
+            if entry is None:
+                # Errors are reported by the compilation of the whole
+                # source, with their positions in it.
+                lerror = []
+                # Parsed at its lines in the source
+                result, serror = parser.parse(
+                    '\n' * source.offset + source.text, echo=False,
+                    lerror=lerror
+                )
+                if lerror or result is None or serror:
+                    return None
+                _class = result[0]
+                entry = self.__entry(_class, used_types(source.text), source)
+            cache['used']['classes'][source.key] = entry
+            cache['used']['nodes'][(source.key, source.offset)] = _class
+            asts[source] = _class
+            classes[_class.name] = source
+            uses[_class.name] = entry[1]
+
+        keys = {}
+        for source, _class in asts.items():
+            depends = self.__depends(_class.name, uses)
+            keys[_class.name] = digest(source.key, sorted(
+                (name, classes[name].key if name in classes else None)
+                for name in depends
+            ))
+
+        check = set(
+            name for name, key in keys.items() if key not in cache['checks']
+        )
+        s = Semant([asts[source] for source in sources])
+        errors = s.build(check)
+
+        for name, key in keys.items():
+            source = classes[name]
+            if name in check:
+                # Classes left out of the class table have no entry
+                diagnostics = s.class_errors.get(name, [])
+                cache['used']['checks'][key] = [
+                    d._replace(line=d.line - source.offset)
+                    if d.line is not None else d
+                    for d in diagnostics
+                ]
+            else:
+                diagnostics = cache['checks'][key]
+                cache['used']['checks'][key] = diagnostics
+                errors.extend(
+                    d._replace(line=d.line + source.offset)
+                    if d.line is not None else d
+                    for d in diagnostics
+                )
+
+        errors.sort(key=lambda error: (error.line, error.column))
+        return Result(s.ast, s, (), [], errors, len(check))
+
+    def __compile_all(self, code):
+        """ Compiles code without the cache. """
+        llex, lerror = self.mylex.tokenize(code)
+        if lerror:
+            return Result(None, None, lerror, [], [], 0)
+
+        result, serror = parser.parse(code, echo=self.echo)
+        if result is None:
+            return Result(None, None, (), serror, [], 0)
+
+        s = Semant(result)
+        errors = s.build()
+        return Result(s.ast, s, (), serror, errors, len(s.class_errors))
+
+    def __entry(self, _class, uses, source):
+        """
+            The cache entry of a class: its AST, pickled at the lines of
+            source (so it is not moved when the class stays there), the
+            names of the classes it uses and its offset in lines.
+        """
+        return pickle.dumps(_class, 2), uses, source.offset
+
+    def __depends(self, name, uses):
+        """ Names of the classes that name depends on, name included. """
+        depends = set()
+        pending = [name]
+        while pending:
+            name = pending.pop()
+            if name not in depends:
+                depends.add(name)
+                pending.extend(uses.get(name, ()))
+        return depends
+
+    def __cache_file(self, path):
+        name = hashlib.sha1(os.path.abspath(path)).hexdigest()
+        return os.path.join(self.cache_dir, name + '.pickle')
+
+    def __load(self, path):
+        cache = None
+        try:
+            with open(self.__cache_file(path), 'rb') as file:
+                cache = pickle.load(file)
+        except Exception:
+            # Missing, cut short or corrupt: unpickling can raise almost
+            # anything, the cache is started again
+            pass
+
+        if not valid_cache(cache):
+            cache = new_cache()
+        cache['nodes'] = {}
+        return cache
+
+    def __save(self, path, cache):
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        filename = self.__cache_file(path)
+        # The nodes are only kept in memory
+        saved = dict(cache, nodes={})
+        with open(filename + '.tmp', 'wb') as file:
+            pickle.dump(saved, file, 2)
+        os.rename(filename + '.tmp', filename)
@@ -0,0 +1,111 @@
+"""
+    Differential testing of the backends.
+
+    A program is run by the interpreter, the reference, and by each
+    backend in BACKENDS. A backend is right when it prints the same
+    output and stops with the same runtime error as the interpreter.
+
+    The interpreter runs out of stack long before the backends (see
+    interpreter.RECURSION_LIMIT): a program that it stops with a stack
+    overflow is not compared.
+"""
+import time
+from collections import namedtuple
+from StringIO import StringIO
+
+from ..codegen import generate, VM
+from ..codegen.runtime import CoolRuntimeError
+from .. import mips, native
+from ..optimizer import optimize
+from ..semantic import Semant
+from ..syntactic.syntactic import parser
+
+from interpreter import Interpreter
+
+# The error of the interpreter when the program recurses too deeply
+STACK_OVERFLOW = 'Stack overflow'
+
+# What a run printed, the runtime error it stopped with (or None), and
+# how long it took, in seconds
+Outcome = namedtuple("Outcome", "output, error, time")
+
+
+def run_interpreter(semant, stdin, stdout):
+    Interpreter(semant, stdin, stdout).run()
+
+
+def run_vm(semant, stdin, stdout):
+    VM(generate(semant), stdin, stdout).run()
+
+
+def run_mips(semant, stdin, stdout):
+    mips.run(mips.generate(semant), stdin, stdout)
+
+
+def run_native(semant, stdin, stdout):
+    native.run(native.generate(semant), stdin, stdout)
+
+
+def run_vm_optimized(semant, stdin, stdout):
+    optimize(semant, 2)
+    run_vm(semant, stdin, stdout)
+
+
+# Name -> function that runs a program analyzed by Semant, reading
+# stdin and writing to stdout. New backends are added here.
+BACKENDS = {
+    'vm': run_vm,
+    'mips': run_mips,
+    'native': run_native,
+    'vm -O2': run_vm_optimized,
+}
+
+
+def analyze(code):
+    """
+        Returns the Semant of code. The semantic errors are ignored,
+        the checker still rejects some valid programs.
+    """
+    result, serror = parser.parse(code, echo=False)
+    if result is None:
+        raise SyntaxError(serror)
+    s = Semant(result)
+    s.build()
+    return s
+
+
+def execute(runner, code, stdin=''):
+    """ Runs code with runner, returns its Outcome. """
+    # Semant changes the AST, each run has its own
+    s = analyze(code)
+    stdout = StringIO()
+    error = None
+
+    start = time.time()
+    try:
+        runner(s, StringIO(stdin), stdout)
+    except CoolRuntimeError as e:
+        error = str(e)
+    return Outcome(stdout.getvalue(), error, time.time() - start)
+
+
+def conclusive(expected):
+    """ False if the interpreter could not run the program to the end. """
+    return expected.error != STACK_OVERFLOW
+
+
+def agree(expected, outcome):
+    return (expected.output, expected.error) == (outcome.output, outcome.error)
+
+
+def compare(code, stdin='', backends=None):
+    """
+        Runs code with the interpreter and with backends (the names of
+        some BACKENDS, all of them by default). Returns the Outcome of
+        the interpreter, and a dict with the Outcome of each backend.
+    """
+    expected = execute(run_interpreter, code, stdin)
+    outcomes = {}
+    for name in backends or sorted(BACKENDS):
+        outcomes[name] = execute(BACKENDS[name], code, stdin)
+    return expected, outcomes
@@ -0,0 +1,438 @@
+"""
+    Interpreter that runs a program by walking its abstract syntax tree.
+
+    It is the reference for the other backends: it follows the Cool
+    manual as directly as it can, and a backend is right when it prints
+    what the interpreter prints.
+
+    The classes come from the class table built by Semant: the vtable of
+    a class is Semant.methods, the methods of the basic classes are the
+    ones in codegen.runtime. The names of a method are resolved before
+    its first call, so a variable is an index in the list of locals, or
+    in the attributes of self.
+"""
+import sys
+import threading
+
+from ..codegen.runtime import (
+    BUILTINS, RuntimeClass, CoolRuntimeError, Obj, default_value, wrap
+)
+from ..syntactic.ast import *
+
+# The program runs in a thread with a stack of STACK_SIZE bytes, that
+# can hold RECURSION_LIMIT Python frames. Each Cool call takes about ten,
+# so the interpreter stops with a stack overflow after about 20000 nested
+# calls, well before the other backends.
+STACK_SIZE = 512 * 1024 * 1024
+RECURSION_LIMIT = 200000
+
+# The recursion limit and the stack size of new threads are the same for
+# every thread of the process. The limit is raised by the first run that
+# starts and restored by the last one that ends, the stack size is only
+# changed while the thread of a run is created.
+_lock = threading.Lock()
+_runs = {'count': 0, 'limit': None}
+
+
+def run_deep(target):
+    """ Calls target in a new thread, where it can recurse deeply. """
+    with _lock:
+        if _runs['count'] == 0:
+            _runs['limit'] = sys.getrecursionlimit()
+            sys.setrecursionlimit(max(_runs['limit'], RECURSION_LIMIT))
+        _runs['count'] += 1
+    try:
+        with _lock:
+            size = threading.stack_size(STACK_SIZE)
+            try:
+                thread = threading.Thread(target=target)
+                thread.start()
+            finally:
+                threading.stack_size(size)
+        thread.join()
+    finally:
+        with _lock:
+            _runs['count'] -= 1
+            if _runs['count'] == 0:
+                sys.setrecursionlimit(_runs['limit'])
+
+
+SELF, LOCAL, ATTRIBUTE = range(3)
+
+
+class Frame(object):
+    """ self and the locals of a call. """
+    __slots__ = ('this', 'locals')
+
+    def __init__(self, this, nlocals, args=()):
+        self.this = this
+        self.locals = list(args) + [None] * (nlocals - len(args))
+
+
+class Resolver(NodeVisitor):
+    """
+        Gives a slot to each local of a method (or of the initialization
+        of an attribute), and finds what each name refers to.
+
+        names maps the id of an Object (or Assign) node to (kind, slot),
+        slots maps the id of a Let or CaseBranch to the slot of the
+        variable it declares.
+    """
+
+    def __init__(self, names, slots):
+        super(Resolver, self).__init__()
+        self.names = names
+        self.slots = slots
+
+    def resolve(self, klass, formals, body):
+        """ Returns the number of locals of body. """
+        self.klass = klass
+        self.scopes = [{}]
+        self.next_slot = 0
+        self.nlocals = 0
+        for formal in formals:
+            self.declare(formal.name)
+        self.visit(body)
+        return self.nlocals
+
+    def declare(self, name):
+        slot = self.next_slot
+        self.scopes[-1][name] = slot
+        self.next_slot += 1
+        self.nlocals = max(self.nlocals, self.next_slot)
+        return slot
+
+    def lookup(self, name, node):
+        if name == 'self':
+            return (SELF, None)
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return (LOCAL, scope[name])
+        if name in self.klass.attributes:
+            return (ATTRIBUTE, self.klass.attributes.index(name))
+        raise CoolRuntimeError('Undefined name %s' % name, node.line)
+
+    def generic_visit(self, node):
+        for value in node:
+            if isinstance(value, Node):
+                self.visit(value)
+            elif isinstance(value, list):
+                for item in value:
+                    self.visit(item)
+
+    def visit_Object(self, node):
+        self.names[id(node)] = self.lookup(node.name, node)
+
+    def visit_Assign(self, node):
+        self.visit(node.body)
+        self.names[id(node)] = self.lookup(node.name.name, node)
+
+    def visit_Let(self, node):
+        if node.init is not None:
+            self.visit(node.init)
+        self.scopes.append({})
+        self.slots[id(node)] = self.declare(node.object)
+        self.visit(node.body)
+        self.next_slot -= len(self.scopes.pop())
+
+    def visit_CaseBranch(self, node):
+        self.scopes.append({})
+        self.slots[id(node)] = self.declare(node.name)
+        self.visit(node.body)
+        self.next_slot -= len(self.scopes.pop())
+
+
+class Interpreter(NodeVisitor):
+    """
+        Runs a program analyzed by Semant (see Semant.build).
+
+        Expressions are evaluated by the visit_<node class name> methods,
+        with the Frame of the call.
+    """
+
+    def __init__(self, semant, stdin=None, stdout=None):
+        super(Interpreter, self).__init__()
+        self.semant = semant
+        self.stdin = stdin or sys.stdin
+        self.stdout = stdout or sys.stdout
+
+        self.classes = {}
+        # id of a Method or Attr -> the class where it is defined
+        self.owners = {}
+        # Class name -> (slot, Attr) of the attributes to initialize, the
+        # ones of the ancestors first
+        self.initializers = {}
+        self.__add_class('Object', None)
+        self.value_classes = {
+            int: self.classes['Int'], long: self.classes['Int'],
+            bool: self.classes['Bool'], str: self.classes['String'],
+        }
+
+        self.names = {}
+        self.slots = {}
+        self.resolver = Resolver(self.names, self.slots)
+        # id of a Method or Attr -> number of locals, once resolved
+        self.nlocals = {}
+
+    def __add_class(self, name, parent):
+        """ Adds the class name and its children, parents first. """
+        klass = RuntimeClass(name, len(self.classes), parent)
+        self.classes[name] = klass
+
+        initializers = list(self.initializers.get(parent and parent.name, ()))
+        _class = self.semant.classes[name]
+        for feature in _class.feature_list:
+            self.owners[id(feature)] = klass
+            if isinstance(feature, Attr):
+                if feature.body is not None:
+                    initializers.append((len(klass.attributes), feature))
+                klass.attributes.append(feature.name)
+                klass.defaults.append(default_value(feature.type))
+            elif feature.body is None:
+                klass.vtable[feature.name] = BUILTINS[name, feature.name]
+        self.initializers[name] = initializers
+        for method_name, method in self.semant.methods[name].items():
+            if method.body is not None:
+                klass.vtable[method_name] = method
+            elif method_name not in klass.vtable:
+                klass.vtable[method_name] = parent.vtable[method_name]
+
+        for child in sorted(self.semant.parents[name]):
+            self.__add_class(child, klass)
+
+    def class_of(self, value):
+        if type(value) is Obj:
+            return value.klass
+        return self.value_classes[type(value)]
+
+    def run(self):
+        """ Runs (new Main).main(), returns its value. """
+        if 'Main' not in self.classes:
+            raise CoolRuntimeError('Class Main is not defined')
+
+        outcome = {}
+
+        def main():
+            try:
+                obj = self.new(self.classes['Main'])
+                outcome['value'] = self.call(
+                    obj, self.class_of(obj), 'main', [], 0
+                )
+            except RuntimeError as e:
+                if 'recursion' in str(e):
+                    error = CoolRuntimeError('Stack overflow')
+                    outcome['error'] = (CoolRuntimeError, error, None)
+                else:
+                    outcome['error'] = sys.exc_info()
+            except BaseException:
+                outcome['error'] = sys.exc_info()
+
+        run_deep(main)
+
+        if 'error' in outcome:
+            error_type, error, traceback = outcome['error']
+            raise error_type, error, traceback
+        return outcome['value']
+
+    def new(self, klass):
+        """ A new object of klass, with its attributes initialized. """
+        obj = klass.new()
+        if type(obj) is not Obj:
+            return obj
+
+        for slot, attr in self.initializers[klass.name]:
+            nlocals = self.__resolve(attr, [])
+            obj.attributes[slot] = self.visit(attr.body, Frame(obj, nlocals))
+        return obj
+
+    def call(self, receiver, klass, name, args, line):
+        """ Calls the method name of klass, on receiver. """
+        method = klass.vtable.get(name)
+        if method is None:
+            raise CoolRuntimeError(
+                'Undefined method %s in class %s' % (name, klass.name), line
+            )
+        if not isinstance(method, Method):
+            return method(self, receiver, *args)
+
+        nlocals = self.__resolve(method, method.formal_list)
+        return self.visit(method.body, Frame(receiver, nlocals, args))
+
+    def __resolve(self, feature, formals):
+        """ Returns the number of locals of feature. """
+        key = id(feature)
+        if key not in self.nlocals:
+            self.nlocals[key] = self.resolver.resolve(
+                self.owners[key], formals, feature.body
+            )
+        return self.nlocals[key]
+
+    # Expressions
+
+    def generic_visit(self, expression, frame):
+        raise CoolRuntimeError(
+            'Can not evaluate %r' % (expression,),
+            getattr(expression, 'line', None)
+        )
+
+    def visit_Int(self, expression, frame):
+        return expression.content
+
+    visit_Bool = visit_Str = visit_Int
+
+    def visit_Object(self, expression, frame):
+        kind, slot = self.names[id(expression)]
+        if kind == LOCAL:
+            return frame.locals[slot]
+        if kind == ATTRIBUTE:
+            return frame.this.attributes[slot]
+        return frame.this
+
+    def visit_Assign(self, expression, frame):
+        value = self.visit(expression.body, frame)
+        kind, slot = self.names[id(expression)]
+        if kind == LOCAL:
+            frame.locals[slot] = value
+        elif kind == ATTRIBUTE:
+            frame.this.attributes[slot] = value
+        else:
+            raise CoolRuntimeError('Can not assign to self', expression.line)
+        return value
+
+    def visit_Block(self, expression, frame):
+        for inner in expression.body:
+            value = self.visit(inner, frame)
+        return value
+
+    def visit_Dispatch(self, expression, frame):
+        # The arguments are evaluated before the receiver
+        args = [self.visit(arg, frame) for arg in expression.expr_list]
+        if expression.body == 'self':
+            receiver = frame.this
+        else:
+            receiver = self.visit(expression.body, frame)
+        if receiver is None:
+            raise CoolRuntimeError('Dispatch to void', expression.line)
+        return self.call(
+            receiver, self.class_of(receiver), expression.method, args,
+            expression.line
+        )
+
+    def visit_StaticDispatch(self, expression, frame):
+        args = [self.visit(arg, frame) for arg in expression.expr_list]
+        receiver = self.visit(expression.body, frame)
+        if receiver is None:
+            raise CoolRuntimeError('Dispatch to void', expression.line)
+        return self.call(
+            receiver, self.classes[expression.type], expression.method, args,
+            expression.line
+        )
+
+    def visit_Plus(self, expression, frame):
+        return wrap(
+            self.visit(expression.first, frame) +
+            self.visit(expression.second, frame)
+        )
+
+    def visit_Sub(self, expression, frame):
+        return wrap(
+            self.visit(expression.first, frame) -
+            self.visit(expression.second, frame)
+        )
+
+    def visit_Mult(self, expression, frame):
+        return wrap(
+            self.visit(expression.first, frame) *
+            self.visit(expression.second, frame)
+        )
+
+    def visit_Div(self, expression, frame):
+        first = self.visit(expression.first, frame)
+        second = self.visit(expression.second, frame)
+        if second == 0:
+            raise CoolRuntimeError('Division by zero', expression.line)
+        # Rounds towards zero, like C
+        quotient = abs(first) // abs(second)
+        if (first < 0) != (second < 0):
+            quotient = -quotient
+        return wrap(quotient)
+
+    def visit_Lt(self, expression, frame):
+        return (
+            self.visit(expression.first, frame) <
+            self.visit(expression.second, frame)
+        )
+
+    def visit_Le(self, expression, frame):
+        return (
+            self.visit(expression.first, frame) <=
+            self.visit(expression.second, frame)
+        )
+
+    def visit_Eq(self, expression, frame):
+        # Basic values are equal by value, objects by identity
+        first = self.visit(expression.first, frame)
+        second = self.visit(expression.second, frame)
+        if type(first) is Obj or type(second) is Obj:
+            return first is second
+        return type(first) is type(second) and first == second
+
+    def visit_Neg(self, expression, frame):
+        return wrap(-self.visit(expression.body, frame))
+
+    def visit_Not(self, expression, frame):
+        return not self.visit(expression.body, frame)
+
+    def visit_Isvoid(self, expression, frame):
+        return self.visit(expression.body, frame) is None
+
+    def visit_If(self, expression, frame):
+        if self.visit(expression.predicate, frame):
+            return self.visit(expression.then_body, frame)
+        return self.visit(expression.else_body, frame)
+
+    def visit_While(self, expression, frame):
+        while self.visit(expression.predicate, frame):
+            self.visit(expression.body, frame)
+        return None
+
+    def visit_Let(self, expression, frame):
+        if expression.init is None:
+            value = default_value(expression.type)
+        else:
+            value = self.visit(expression.init, frame)
+        frame.locals[self.slots[id(expression)]] = value
+        return self.visit(expression.body, frame)
+
+    def visit_Case(self, expression, frame):
+        value = self.visit(expression.expr, frame)
+        if value is None:
+            raise CoolRuntimeError('Case on void', expression.line)
+
+        # The branch of the closest ancestor
+        klass = self.class_of(value)
+        while klass is not None:
+            for branch in expression.case_list:
+                if branch.type == klass.name:
+                    frame.locals[self.slots[id(branch)]] = value
+                    return self.visit(branch.body, frame)
+            klass = klass.parent
+
+        raise CoolRuntimeError(
+            'No branch of case for class %s' % self.class_of(value).name,
+            expression.line
+        )
+
+    def visit_New(self, expression, frame):
+        if expression.type == 'SELF_TYPE':
+            return self.new(self.class_of(frame.this))
+        if expression.type not in self.classes:
+            raise CoolRuntimeError(
+                'Undefined class %s' % expression.type, expression.line
+            )
+        return self.new(self.classes[expression.type])
+
+
+def interpret(semant, stdin=None, stdout=None):
+    """ Runs the program analyzed by semant, returns the value of main. """
+    return Interpreter(semant, stdin, stdout).run()
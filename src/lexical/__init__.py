@@ -1 +1 @@
-from .lexical import MyLex
+from .lexical import MyLex, Token, read_source
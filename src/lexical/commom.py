@@ -7,4 +7,4 @@ def find_column(input, token):
         # Not found
         last_cr = 0
     column = (token.lexpos - last_cr) + 1
-    return column
\ No newline at end of file
+    return column
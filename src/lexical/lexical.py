@@ -1,35 +1,114 @@
 # coding: utf-8
+import mmap
 import sys
+from collections import namedtuple
+from contextlib import closing, contextmanager
 
 import ply.lex as lex
 
-from commom import find_column
 import tokrules
 
+# What the lexer yields for each token
+Token = namedtuple("Token", "type, value, line, column")
+
+
+@contextmanager
+def read_source(source):
+    """
+        Gives the source in a form that PLY can read, in a with block.
+
+        Strings and mmaps are used as they are, unicode is encoded in
+        UTF-8. A file is mapped in memory when possible, so big sources
+        are not copied, otherwise it is read. The mmap is closed at the
+        end of the block.
+    """
+    if isinstance(source, (str, mmap.mmap)):
+        yield source
+        return
+
+    if isinstance(source, unicode):
+        yield source.encode('utf-8')
+        return
+
+    try:
+        data = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, EnvironmentError, ValueError):
+        # No file descriptor (StringIO) or an empty file.
+        yield source.read()
+        return
+
+    with closing(data):
+        yield data
+
 
 class MyLex(object):
+    """
+        Builds the PLY lexer (and its master regex) once.
+
+        The built lexer is never used to read an input, every call gets
+        its own copy from clone(). So a single MyLex can be shared by the
+        web app, the parser and batch jobs, even between threads.
+    """
 
     def __init__(self, module=tokrules):
         self.module = module
         self.lexer = None
-        self.llex = []
 
         self._build_lexer()
 
     def _build_lexer(self):
         self.lexer = lex.lex(module=self.module)
+        self.lexer.lerror = []
+        self.lexer.last_newline = 0
 
-    def tokenize(self, newString):
-        self.lexer.input(str(newString))
+    def clone(self):
+        """
+            Returns a new PLY lexer that shares the compiled rules,
+            but has its own position, line number and error list.
+
+            Its tokens have a column too, counted from the last newline
+            that the rules saw before the token (see tokrules.newlines).
+        """
+        lexer = self.lexer.clone()
+        lexer.lineno = 1
+        lexer.last_newline = 0
+        lexer.lerror = []
 
-        while True:
-            tok = self.lexer.token()
-            if not tok:
-                break
-            lt = (tok.type, tok.value, tok.lineno, find_column(newString, tok))
-            self.llex.append(lt)
+        read = lexer.token
 
-        return tuple(self.llex), tuple(tokrules.lerror)
+        def token():
+            tok = read()
+            # A string keeps the column of the line where it starts
+            if tok is not None and tok.type != 'STR_CONST':
+                tok.column = tok.lexpos - lexer.last_newline + 1
+            return tok
+        lexer.token = token
+        return lexer
+
+    def iter_tokens(self, source, lerror=None):
+        """
+            Yields a Token for each token of source, lazily.
+
+            source can be a string, a file or a mmap. If lerror is given,
+            the lexical errors are added to it while the tokens are read.
+        """
+        with read_source(source) as data:
+            lexer = self.clone()
+            if lerror is not None:
+                lexer.lerror = lerror
+            lexer.input(data)
+
+            while True:
+                tok = lexer.token()
+                if not tok:
+                    break
+                yield Token(tok.type, tok.value, tok.lineno, tok.column)
+
+    def tokenize(self, newString):
+        lerror = []
+        llex = tuple(self.iter_tokens(newString, lerror))
+
+        return llex, tuple(lerror)
 
 
 if __name__ == '__main__':
@@ -47,13 +126,11 @@ if __name__ == '__main__':
         print('Choose a cool file to read.')
         sys.exit(1)
 
-    with open(sys.argv[1]) as file:
-        codigo = file.read()
     l = MyLex()
-    llex, lerror = l.tokenize(codigo)
-
-    for l in llex:
-        print(l)
+    lerror = []
+    with open(sys.argv[1]) as file:
+        for tok in l.iter_tokens(file, lerror):
+            print(tok)
 
     print('ERROR')
     for e in lerror:
@@ -1,3 +1,5 @@
+import re
+
 # Reserved words
 reserved = [
     'class', 'in', 'inherits', 'isvoid', 'let', 'new', 'of', 'not',
@@ -36,10 +38,14 @@ t_AT = '@'
 
 t_ignore = ' \t\r\f'
 
+COMMENT_DELIMITER = re.compile(r'\(\*|\*\)')
+
 
 # Handle objects_types_and_reserved_words
 def t_ID(t):
     r'[a-zA-Z_][a-zA-Z_0-9]*'
+    # Names are repeated a lot in a program, keep only one copy of each
+    t.value = intern(t.value)
     if t.value == 'true':
         t.type = 'BOOL_CONST'
         t.value = True
@@ -59,13 +65,43 @@ def t_ID(t):
     return t
 
 
+def newlines(t):
+    """
+        Counts the lines of the token t, and keeps the offset of its last
+        newline in the lexer, where the columns of the next tokens start.
+    """
+    count = t.value.count("\n")
+    if count:
+        t.lexer.lineno += count
+        t.lexer.last_newline = t.lexpos + t.value.rfind("\n")
+
+
 def t_COMMENT(t):
-    r'--.* | \(\*.+[\n\*\w\s]*\*\)'
-    pass
+    r'--.* | \(\*'
+    if t.value == '(*':
+        # Block comments nest, the rule only finds where one starts
+        data = t.lexer.lexdata
+        depth = 1
+        end = t.lexer.lexpos
+        while depth:
+            match = COMMENT_DELIMITER.search(data, end)
+            if match is None:
+                # Not closed, an error: the rest of the file is the comment
+                t.lexer.lerror.append((t.value, t.lineno, t.lexpos))
+                end = len(data)
+                break
+            depth += 1 if match.group() == '(*' else -1
+            end = match.end()
+        t.value = data[t.lexpos:end]
+        t.lexer.lexpos = end
+    newlines(t)
 
 
 def t_STRING(t):
     r'\"[^"]*\"'
+    # The column of the string is counted from the line where it starts
+    t.column = t.lexpos - t.lexer.last_newline + 1
+    newlines(t)
     # Tira as aspas (only python 2)
     t.value = t.value[1:-1].decode("string-escape")
     t.type = 'STR_CONST'
@@ -80,13 +116,12 @@ def t_INT_CONST(t):
 
 def t_NEWLINE(t):
     r'\n+'
-    t.lexer.lineno += t.value.count("\n")
-
-
-lerror = []
+    newlines(t)
 
 
+# Errors are kept in the lexer itself (see MyLex.clone),
+# so each call has its own list.
 def t_error(t):
     lr = (t.value[0], t.lineno, t.lexpos)
-    lerror.append(lr)
+    t.lexer.lerror.append(lr)
     t.lexer.skip(1)
@@ -0,0 +1,3 @@
+from .mips import generate, selectors
+from .simulator import Machine, SimulatorError, simulate
+from .spim import run, spim
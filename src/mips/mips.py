@@ -0,0 +1,595 @@
+"""
+    Generation of MIPS assembly, for spim.
+
+    The classes get a tag in preorder from Object, so the descendants of
+    a class have the tags from its own to last[class]. Each class has
+    a prototype object (<class>_protObj), copied by new, a dispatch
+    table (<class>_dispTab) and an init method (<class>_init). The
+    runtime (runtime.s) has the methods of the basic classes.
+
+    The value of an expression is left in $a0, self is in $s0. The
+    caller pushes the arguments, from the first one, and the callee
+    pops them. A frame is:
+
+        fp + 8 + 4 * (n - i)    argument i of n
+        fp + 8                  saved $fp
+        fp + 4                  saved $s0
+        fp                      saved $ra
+        fp - 4 - 4 * i          local i (let and case variables)
+"""
+import os
+
+from ..codegen import CompileError
+from ..codegen.runtime import CoolRuntimeError, RuntimeClass, wrap
+from ..interpreter.interpreter import Resolver, SELF, LOCAL
+from ..optimizer.hierarchy import devirtualize
+from ..syntactic.ast import *
+
+RUNTIME = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'runtime.s')
+
+# Offsets in an object
+TAG, SIZE, DISPATCH, ATTRIBUTES = 0, 4, 8, 12
+WORD = 4
+
+BASIC = ('Object', 'IO', 'Int', 'Bool', 'String')
+
+
+def runtime():
+    """ The assembly of the runtime. """
+    with open(RUNTIME) as f:
+        return f.read()
+
+
+def ascii_bytes(string):
+    """ .byte directive with string, and a zero at the end. """
+    return '.byte %s' % ', '.join([str(ord(c)) for c in string] + ['0'])
+
+
+def selectors(tables):
+    """
+        Gives each method name a slot in the dispatch tables, the same one
+        in every class, so a dispatch does not need the class of the
+        receiver. tables maps a class name to the names of its methods.
+        Names of methods of the same class get different slots, the
+        others can share one. Returns a dict name -> slot.
+    """
+    taken = {}
+    for table in tables.values():
+        for name in table:
+            taken.setdefault(name, set()).update(table)
+
+    slots = {}
+    for name in sorted(taken, key=lambda name: (-len(taken[name]), name)):
+        used = set(slots[other] for other in taken[name] if other in slots)
+        slot = 0
+        while slot in used:
+            slot += 1
+        slots[name] = slot
+    return slots
+
+
+class MipsGenerator(NodeVisitor):
+    """
+        Compiles the classes of a program analyzed by Semant.
+
+        Expressions are compiled by the visit_<node class name> methods,
+        each one leaves the value of the expression in $a0. With
+        direct_calls, a dispatch with one possible target jumps to the
+        method, without the dispatch table.
+    """
+
+    def __init__(self, semant, direct_calls=True):
+        super(MipsGenerator, self).__init__()
+        self.semant = semant
+        # id of a Dispatch -> (class, method name) it calls
+        self.targets = devirtualize(semant).targets if direct_calls else {}
+        self.classes = []
+        self.by_name = {}
+        # Class name -> tag of its last descendant
+        self.last = {}
+        # Class name -> {method name: label}
+        self.tables = {}
+        # Method name -> its offset in the dispatch tables
+        self.selectors = {}
+        self.__ints = {}
+        self.__strings = {}
+        self.__labels = 0
+
+        self.names = {}
+        self.slots = {}
+        self.resolver = Resolver(self.names, self.slots)
+
+    def generate(self):
+        """ Returns the assembly of the program. """
+        self.__add_class('Object', None)
+        self.selectors = selectors(self.tables)
+        if 'Main' not in self.by_name:
+            raise CompileError('Class Main is not defined')
+        if 'main' not in self.tables['Main']:
+            raise CompileError('Class Main has no main method')
+
+        self.__text = ['\t.text', '\t.globl main']
+        self.__entry()
+        for klass in self.classes:
+            self.__init(klass)
+            _class = self.semant.classes[klass.name]
+            for feature in _class.feature_list:
+                if isinstance(feature, Method) and feature.body is not None:
+                    self.__method(klass, feature)
+
+        data = self.__data()
+        return '\n'.join(data + self.__text + [runtime()])
+
+    def __add_class(self, name, parent):
+        """ Adds the class name and its children, parents first. """
+        klass = RuntimeClass(name, len(self.classes), parent)
+        self.classes.append(klass)
+        self.by_name[name] = klass
+
+        table = dict(self.tables.get(parent and parent.name, {}))
+        for feature in self.semant.classes[name].feature_list:
+            if isinstance(feature, Attr):
+                klass.attributes.append(feature.name)
+                klass.defaults.append(feature.type)
+            else:
+                table[feature.name] = '%s.%s' % (name, feature.name)
+        self.tables[name] = table
+
+        for child in sorted(self.semant.parents[name]):
+            self.__add_class(child, klass)
+        self.last[name] = len(self.classes) - 1
+
+    def __method_offset(self, method, node):
+        if method not in self.selectors:
+            raise CompileError(
+                'Undefined method %s' % method, getattr(node, 'line', None)
+            )
+        return WORD * self.selectors[method]
+
+    def __class(self, name, node):
+        if name not in self.by_name:
+            raise CompileError('Undefined class %s' % name, node.line)
+        return self.by_name[name]
+
+    # Data
+
+    def __data(self):
+        data = ['\t.data', '\t.align 2']
+        for name, label in (('Int', '_int_tag'), ('Bool', '_bool_tag'),
+                            ('String', '_string_tag')):
+            data += ['%s:' % label, '\t.word %d' % self.by_name[name].index]
+
+        names = [self.__string(klass.name) for klass in self.classes]
+        # The prototypes use the constants of the default values
+        tables = []
+        for klass in self.classes:
+            tables += self.__prototype(klass)
+            tables += self.__dispatch_table(klass)
+
+        for value in (False, True):
+            data += [
+                'bool_const%d:' % value,
+                '\t.word %d, 4, Bool_dispTab, %d' % (
+                    self.by_name['Bool'].index, value
+                ),
+            ]
+        for value, label in sorted(self.__ints.items()):
+            data += [
+                '%s:' % label,
+                '\t.word %d, 4, Int_dispTab, %d' % (
+                    self.by_name['Int'].index, value
+                ),
+            ]
+        for value, label in sorted(self.__strings.items()):
+            data += [
+                '%s:' % label,
+                '\t.word %d, %d, String_dispTab, %d' % (
+                    self.by_name['String'].index, 4 + (len(value) + 4) // 4,
+                    len(value)
+                ),
+                '\t' + ascii_bytes(value),
+                '\t.align 2',
+            ]
+
+        data += ['class_nameTab:'] + ['\t.word %s' % label for label in names]
+        data.append('class_objTab:')
+        for klass in self.classes:
+            data.append('\t.word %s_protObj, %s_init' % (klass.name, klass.name))
+        return data + tables
+
+    def __dispatch_table(self, klass):
+        table = self.tables[klass.name]
+        labels = ['0'] * (max([-1] + [
+            self.selectors[name] for name in table
+        ]) + 1)
+        for name, label in table.items():
+            labels[self.selectors[name]] = label
+        return ['%s_dispTab:' % klass.name] + [
+            '\t.word %s' % label for label in labels
+        ]
+
+    def __prototype(self, klass):
+        words = [str(klass.index), None, '%s_dispTab' % klass.name]
+        if klass.name == 'String':
+            # Length 0, and the zero at the end
+            words += ['0', '0']
+        elif klass.name in ('Int', 'Bool'):
+            words.append('0')
+        else:
+            words += [self.__default(_type) for _type in klass.defaults]
+        words[1] = str(len(words))
+        return ['%s_protObj:' % klass.name, '\t.word %s' % ', '.join(words)]
+
+    def __default(self, _type):
+        if _type == 'Int':
+            return self.__int(0)
+        if _type == 'Bool':
+            return 'bool_const0'
+        if _type == 'String':
+            return self.__string('')
+        return '0'
+
+    def __int(self, value):
+        value = wrap(value)
+        if value not in self.__ints:
+            self.__ints[value] = 'int_const%d' % len(self.__ints)
+        return self.__ints[value]
+
+    def __string(self, value):
+        if value not in self.__strings:
+            self.__strings[value] = 'str_const%d' % len(self.__strings)
+        return self.__strings[value]
+
+    # Code
+
+    def __emit(self, *lines):
+        self.__text.extend('\t' + line for line in lines)
+
+    def __label(self):
+        self.__labels += 1
+        return '_label%d' % self.__labels
+
+    def __place(self, label):
+        self.__text.append('%s:' % label)
+
+    def __push(self):
+        self.__emit('sw $a0 0($sp)', 'addiu $sp $sp -4')
+
+    def __pop(self, register):
+        self.__emit('lw %s 4($sp)' % register, 'addiu $sp $sp 4')
+
+    def __resolve(self, klass, formals, body):
+        try:
+            return self.resolver.resolve(klass, formals, body)
+        except CoolRuntimeError as e:
+            raise CompileError(e.args[0], e.line)
+
+    def __prologue(self, nlocals):
+        self.__emit(
+            'addiu $sp $sp -12', 'sw $fp 12($sp)', 'sw $s0 8($sp)',
+            'sw $ra 4($sp)', 'addiu $fp $sp 4', 'move $s0 $a0'
+        )
+        if nlocals:
+            self.__emit('addiu $sp $sp %d' % (-WORD * nlocals))
+
+    def __epilogue(self, nlocals, nargs):
+        if nlocals:
+            self.__emit('addiu $sp $sp %d' % (WORD * nlocals))
+        self.__emit(
+            'lw $fp 12($sp)', 'lw $s0 8($sp)', 'lw $ra 4($sp)',
+            'addiu $sp $sp %d' % (12 + WORD * nargs), 'jr $ra'
+        )
+
+    def __entry(self):
+        """ main: runs (new Main).main(), and exits. """
+        self.__place('main')
+        self.__emit(
+            'la $a0 Main_protObj', 'jal Object.copy', 'jal Main_init',
+            'lw $t1 %d($a0)' % DISPATCH,
+            'lw $t1 %d($t1)' % self.__method_offset('main', None),
+            'jalr $t1', 'li $v0 10', 'syscall'
+        )
+
+    def __init(self, klass):
+        """ <class>_init: initializes the attributes of self ($a0). """
+        self.__place('%s_init' % klass.name)
+        if klass.name in BASIC:
+            self.__emit('jr $ra')
+            return
+
+        attributes = [
+            feature for feature in self.semant.classes[klass.name].feature_list
+            if isinstance(feature, Attr) and feature.body is not None
+        ]
+        nlocals = max(
+            [self.__resolve(klass, [], attr.body) for attr in attributes] + [0]
+        )
+        self.__klass, self.__nargs = klass, 0
+        self.__prologue(nlocals)
+        if klass.parent.name != 'Object':
+            self.__emit('jal %s_init' % klass.parent.name)
+        for attr in attributes:
+            self.visit(attr.body)
+            self.__emit('sw $a0 %d($s0)' % self.__attribute(attr.name))
+        self.__emit('move $a0 $s0')
+        self.__epilogue(nlocals, 0)
+
+    def __method(self, klass, method):
+        nargs = len(method.formal_list)
+        nlocals = self.__resolve(klass, method.formal_list, method.body) - nargs
+        self.__klass, self.__nargs = klass, nargs
+
+        self.__place('%s.%s' % (klass.name, method.name))
+        self.__prologue(nlocals)
+        self.visit(method.body)
+        self.__epilogue(nlocals, nargs)
+
+    def __attribute(self, name):
+        return ATTRIBUTES + WORD * self.__klass.attributes.index(name)
+
+    def __local(self, slot):
+        """ Where the local slot is, from $fp. """
+        if slot < self.__nargs:
+            return 8 + WORD * (self.__nargs - slot)
+        return -WORD - WORD * (slot - self.__nargs)
+
+    def __abort(self, routine, line):
+        """ Jumps to the runtime error routine, with the line in $t1. """
+        self.__emit('li $t1 %d' % (line or 0), 'j %s' % routine)
+
+    # Expressions
+
+    def generic_visit(self, expression):
+        raise CompileError(
+            'Can not compile %r' % (expression,),
+            getattr(expression, 'line', None)
+        )
+
+    def visit_Int(self, expression):
+        self.__emit('la $a0 %s' % self.__int(expression.content))
+
+    def visit_Str(self, expression):
+        self.__emit('la $a0 %s' % self.__string(expression.content))
+
+    def visit_Bool(self, expression):
+        self.__emit('la $a0 bool_const%d' % bool(expression.content))
+
+    def visit_Object(self, expression):
+        kind, slot = self.names[id(expression)]
+        if kind == SELF:
+            self.__emit('move $a0 $s0')
+        elif kind == LOCAL:
+            self.__emit('lw $a0 %d($fp)' % self.__local(slot))
+        else:
+            self.__emit('lw $a0 %d($s0)' % (ATTRIBUTES + WORD * slot))
+
+    def visit_Assign(self, expression):
+        self.visit(expression.body)
+        kind, slot = self.names[id(expression)]
+        if kind == LOCAL:
+            self.__emit('sw $a0 %d($fp)' % self.__local(slot))
+        elif kind == SELF:
+            raise CompileError('Can not assign to self', expression.line)
+        else:
+            self.__emit('sw $a0 %d($s0)' % (ATTRIBUTES + WORD * slot))
+
+    def visit_Block(self, expression):
+        for inner in expression.body:
+            self.visit(inner)
+
+    def __call(self, expression, static_type):
+        # The arguments are evaluated before the receiver
+        for argument in expression.expr_list:
+            self.visit(argument)
+            self.__push()
+        if expression.body == 'self':
+            self.__emit('move $a0 $s0')
+        else:
+            self.visit(expression.body)
+
+        done = self.__label()
+        self.__emit('bnez $a0 %s' % done)
+        self.__abort('_dispatch_abort', expression.line)
+        self.__place(done)
+
+        target = self.targets.get(id(expression))
+        if static_type is None and target is not None and \
+                target[1] in self.tables.get(target[0], ()):
+            self.__emit('jal %s' % self.tables[target[0]][target[1]])
+            return
+        if static_type is None:
+            self.__emit('lw $t1 %d($a0)' % DISPATCH)
+        else:
+            self.__emit('la $t1 %s_dispTab' % static_type)
+        self.__emit(
+            'lw $t1 %d($t1)' % self.__method_offset(expression.method, expression),
+            'jalr $t1'
+        )
+
+    def visit_Dispatch(self, expression):
+        self.__call(expression, None)
+
+    def visit_StaticDispatch(self, expression):
+        self.__class(expression.type, expression)
+        self.__call(expression, expression.type)
+
+    def __operands(self, expression):
+        """ first in $t1 and second in $a0. """
+        self.visit(expression.first)
+        self.__push()
+        self.visit(expression.second)
+        self.__pop('$t1')
+
+    def __arithmetic(self, expression, instruction):
+        self.visit(expression.first)
+        self.__push()
+        self.visit(expression.second)
+        # A new Int for the result
+        self.__emit('jal Object.copy')
+        self.__pop('$t1')
+        self.__emit('lw $t1 12($t1)', 'lw $t2 12($a0)')
+        if instruction == 'div':
+            done = self.__label()
+            self.__emit('bnez $t2 %s' % done)
+            self.__abort('_divide_abort', expression.line)
+            self.__place(done)
+        self.__emit('%s $t1 $t1 $t2' % instruction, 'sw $t1 12($a0)')
+
+    def visit_Plus(self, expression):
+        self.__arithmetic(expression, 'addu')
+
+    def visit_Sub(self, expression):
+        self.__arithmetic(expression, 'subu')
+
+    def visit_Mult(self, expression):
+        self.__arithmetic(expression, 'mul')
+
+    def visit_Div(self, expression):
+        self.__arithmetic(expression, 'div')
+
+    def __compare(self, expression, branch):
+        self.__operands(expression)
+        done = self.__label()
+        self.__emit(
+            'lw $t1 12($t1)', 'lw $t2 12($a0)', 'la $a0 bool_const1',
+            '%s $t1 $t2 %s' % (branch, done), 'la $a0 bool_const0'
+        )
+        self.__place(done)
+
+    def visit_Lt(self, expression):
+        self.__compare(expression, 'blt')
+
+    def visit_Le(self, expression):
+        self.__compare(expression, 'ble')
+
+    def visit_Eq(self, expression):
+        # Basic values are equal by value (see equality_test), objects by
+        # identity
+        self.__operands(expression)
+        done = self.__label()
+        self.__emit(
+            'move $t2 $a0', 'la $a0 bool_const1', 'beq $t1 $t2 %s' % done,
+            'la $a1 bool_const0', 'jal equality_test'
+        )
+        self.__place(done)
+
+    def visit_Neg(self, expression):
+        self.visit(expression.body)
+        self.__emit(
+            'jal Object.copy', 'lw $t1 12($a0)', 'subu $t1 $zero $t1',
+            'sw $t1 12($a0)'
+        )
+
+    def visit_Not(self, expression):
+        self.visit(expression.body)
+        done = self.__label()
+        self.__emit(
+            'lw $t1 12($a0)', 'la $a0 bool_const1', 'beqz $t1 %s' % done,
+            'la $a0 bool_const0'
+        )
+        self.__place(done)
+
+    def visit_Isvoid(self, expression):
+        self.visit(expression.body)
+        done = self.__label()
+        self.__emit(
+            'move $t1 $a0', 'la $a0 bool_const1', 'beqz $t1 %s' % done,
+            'la $a0 bool_const0'
+        )
+        self.__place(done)
+
+    def visit_If(self, expression):
+        otherwise, done = self.__label(), self.__label()
+        self.visit(expression.predicate)
+        self.__emit('lw $t1 12($a0)', 'beqz $t1 %s' % otherwise)
+        self.visit(expression.then_body)
+        self.__emit('b %s' % done)
+        self.__place(otherwise)
+        self.visit(expression.else_body)
+        self.__place(done)
+
+    def visit_While(self, expression):
+        start, done = self.__label(), self.__label()
+        self.__place(start)
+        self.visit(expression.predicate)
+        self.__emit('lw $t1 12($a0)', 'beqz $t1 %s' % done)
+        self.visit(expression.body)
+        self.__emit('b %s' % start)
+        self.__place(done)
+        # A loop is void
+        self.__emit('move $a0 $zero')
+
+    def visit_Let(self, expression):
+        if expression.init is None:
+            default = self.__default(expression.type)
+            if default == '0':
+                self.__emit('move $a0 $zero')
+            else:
+                self.__emit('la $a0 %s' % default)
+        else:
+            self.visit(expression.init)
+        slot = self.slots[id(expression)]
+        self.__emit('sw $a0 %d($fp)' % self.__local(slot))
+        self.visit(expression.body)
+
+    def visit_Case(self, expression):
+        self.visit(expression.expr)
+        found = self.__label()
+        self.__emit('bnez $a0 %s' % found)
+        self.__abort('_case_void_abort', expression.line)
+        self.__place(found)
+        self.__emit('lw $t2 0($a0)')
+
+        # The branch of the closest ancestor: the deepest classes first,
+        # the first branch of a class is the one taken
+        branches = {}
+        for branch in expression.case_list:
+            tag = self.__class(branch.type, branch).index
+            branches.setdefault(tag, branch)
+
+        done = self.__label()
+        for tag in sorted(branches, key=self.__depth, reverse=True):
+            branch = branches[tag]
+            following = self.__label()
+            last = self.last[self.classes[tag].name]
+            self.__emit(
+                'blt $t2 %d %s' % (tag, following),
+                'bgt $t2 %d %s' % (last, following),
+                'sw $a0 %d($fp)' % self.__local(self.slots[id(branch)])
+            )
+            self.visit(branch.body)
+            self.__emit('b %s' % done)
+            self.__place(following)
+        self.__abort('_case_abort', expression.line)
+        self.__place(done)
+
+    def __depth(self, tag):
+        depth = 0
+        klass = self.classes[tag]
+        while klass.parent is not None:
+            klass = klass.parent
+            depth += 1
+        return depth
+
+    def visit_New(self, expression):
+        if expression.type == 'SELF_TYPE':
+            # The prototype and init of the class of self
+            self.__emit(
+                'lw $t1 %d($s0)' % TAG, 'sll $t1 $t1 3',
+                'la $a0 class_objTab', 'addu $a0 $a0 $t1'
+            )
+            self.__push()
+            self.__emit('lw $a0 0($a0)', 'jal Object.copy')
+            self.__pop('$t1')
+            self.__emit('lw $t1 4($t1)', 'jalr $t1')
+        else:
+            name = self.__class(expression.type, expression).name
+            self.__emit(
+                'la $a0 %s_protObj' % name, 'jal Object.copy',
+                'jal %s_init' % name
+            )
+
+
+def generate(semant, direct_calls=True):
+    """ The MIPS assembly of the program analyzed by semant (see Semant.build). """
+    return MipsGenerator(semant, direct_calls).generate()
@@ -0,0 +1,351 @@
+# Runtime of the programs compiled to MIPS (see mips.py).
+#
+# An object is: class tag, size in words, dispatch table, attributes.
+# Int and Bool keep their value in the first attribute. A String keeps
+# its length there, and then its characters, ended by a zero.
+#
+# The methods of the basic classes take the receiver in $a0 and the
+# arguments on the stack, like the compiled methods, and pop the
+# arguments. They only change $a0-$a3, $v0 and the $t registers.
+#
+# Runtime errors print "\nERROR: " and a message, and stop the program.
+
+	.data
+	.align 2
+_input_buffer:
+	.space 1028
+_abort_message:
+	.byte 65, 98, 111, 114, 116, 32, 99, 97, 108, 108, 101, 100, 32, 102, 114, 111, 109, 32, 99, 108, 97, 115, 115, 32, 0
+_newline:
+	.byte 10, 0
+_error_prefix:
+	.byte 10, 69, 82, 82, 79, 82, 58, 32, 0
+_error_line:
+	.byte 108, 105, 110, 101, 32, 0
+_error_colon:
+	.byte 58, 32, 0
+_error_abort:
+	.byte 97, 98, 111, 114, 116, 10, 0
+_dispatch_message:
+	.byte 68, 105, 115, 112, 97, 116, 99, 104, 32, 116, 111, 32, 118, 111, 105, 100, 10, 0
+_case_void_message:
+	.byte 67, 97, 115, 101, 32, 111, 110, 32, 118, 111, 105, 100, 10, 0
+_case_message:
+	.byte 78, 111, 32, 98, 114, 97, 110, 99, 104, 32, 111, 102, 32, 99, 97, 115, 101, 32, 102, 111, 114, 32, 99, 108, 97, 115, 115, 32, 0
+_divide_message:
+	.byte 68, 105, 118, 105, 115, 105, 111, 110, 32, 98, 121, 32, 122, 101, 114, 111, 10, 0
+_substr_message:
+	.byte 73, 110, 100, 101, 120, 32, 111, 117, 116, 32, 111, 102, 32, 114, 97, 110, 103, 101, 32, 105, 110, 32, 115, 117, 98, 115, 116, 114, 10, 0
+	.align 2
+
+	.text
+
+# Object.copy: a new object with the same words as $a0
+Object.copy:
+	lw $t1 4($a0)
+	move $t3 $a0
+	sll $a0 $t1 2
+	li $v0 9
+	syscall
+	move $t4 $v0
+_copy_loop:
+	beqz $t1 _copy_end
+	lw $t5 0($t3)
+	sw $t5 0($t4)
+	addiu $t3 $t3 4
+	addiu $t4 $t4 4
+	addiu $t1 $t1 -1
+	b _copy_loop
+_copy_end:
+	move $a0 $v0
+	jr $ra
+
+Object.abort:
+	move $t0 $a0
+	la $a0 _abort_message
+	li $v0 4
+	syscall
+	lw $t1 0($t0)
+	sll $t1 $t1 2
+	la $t2 class_nameTab
+	addu $t2 $t2 $t1
+	lw $a0 0($t2)
+	addiu $a0 $a0 16
+	li $v0 4
+	syscall
+	la $a0 _newline
+	li $v0 4
+	syscall
+	la $a0 _error_prefix
+	li $v0 4
+	syscall
+	la $a0 _error_abort
+	li $v0 4
+	syscall
+	li $v0 10
+	syscall
+
+Object.type_name:
+	lw $t1 0($a0)
+	sll $t1 $t1 2
+	la $t2 class_nameTab
+	addu $t2 $t2 $t1
+	lw $a0 0($t2)
+	jr $ra
+
+IO.out_string:
+	move $t0 $a0
+	lw $a0 4($sp)
+	addiu $a0 $a0 16
+	li $v0 4
+	syscall
+	move $a0 $t0
+	addiu $sp $sp 4
+	jr $ra
+
+IO.out_int:
+	move $t0 $a0
+	lw $a0 4($sp)
+	lw $a0 12($a0)
+	li $v0 1
+	syscall
+	move $a0 $t0
+	addiu $sp $sp 4
+	jr $ra
+
+IO.in_int:
+	move $t9 $ra
+	li $v0 5
+	syscall
+	move $a1 $v0
+	jal _int_box
+	move $ra $t9
+	jr $ra
+
+IO.in_string:
+	move $t9 $ra
+	la $a0 _input_buffer
+	li $a1 1025
+	li $v0 8
+	syscall
+	# The length, up to the end of the line
+	la $t0 _input_buffer
+	li $t1 0
+	li $t4 10
+_in_string_length:
+	addu $t2 $t0 $t1
+	lb $t3 0($t2)
+	beqz $t3 _in_string_copy
+	beq $t3 $t4 _in_string_copy
+	addiu $t1 $t1 1
+	b _in_string_length
+_in_string_copy:
+	jal _string_alloc
+	la $t2 _input_buffer
+	addiu $t3 $a0 16
+	move $t4 $t1
+	jal _copy_bytes
+	move $ra $t9
+	jr $ra
+
+String.length:
+	move $t9 $ra
+	lw $a1 12($a0)
+	jal _int_box
+	move $ra $t9
+	jr $ra
+
+String.concat:
+	move $t9 $ra
+	move $a2 $a0
+	lw $a3 4($sp)
+	lw $t1 12($a2)
+	lw $t0 12($a3)
+	addu $t1 $t1 $t0
+	jal _string_alloc
+	addiu $t2 $a2 16
+	addiu $t3 $a0 16
+	lw $t4 12($a2)
+	jal _copy_bytes
+	addiu $t2 $a3 16
+	lw $t4 12($a3)
+	jal _copy_bytes
+	move $ra $t9
+	addiu $sp $sp 4
+	jr $ra
+
+String.substr:
+	move $t9 $ra
+	move $a2 $a0
+	lw $a3 8($sp)
+	lw $a3 12($a3)
+	lw $t1 4($sp)
+	lw $t1 12($t1)
+	bltz $a3 _substr_error
+	bltz $t1 _substr_error
+	addu $t2 $a3 $t1
+	lw $t3 12($a2)
+	bgt $t2 $t3 _substr_error
+	jal _string_alloc
+	addu $t2 $a2 $a3
+	addiu $t2 $t2 16
+	addiu $t3 $a0 16
+	move $t4 $t1
+	jal _copy_bytes
+	move $ra $t9
+	addiu $sp $sp 8
+	jr $ra
+_substr_error:
+	li $t1 0
+	la $a1 _substr_message
+	j _runtime_error
+
+# A new Int with the value $a1
+_int_box:
+	li $a0 16
+	li $v0 9
+	syscall
+	la $t0 Int_protObj
+	lw $t1 0($t0)
+	sw $t1 0($v0)
+	lw $t1 4($t0)
+	sw $t1 4($v0)
+	lw $t1 8($t0)
+	sw $t1 8($v0)
+	sw $a1 12($v0)
+	move $a0 $v0
+	jr $ra
+
+# A new String of length $t1, with its last zero. Keeps $t1.
+_string_alloc:
+	addiu $t5 $t1 4
+	srl $t5 $t5 2
+	addiu $t5 $t5 4
+	sll $a0 $t5 2
+	li $v0 9
+	syscall
+	la $t6 String_protObj
+	lw $t7 0($t6)
+	sw $t7 0($v0)
+	sw $t5 4($v0)
+	lw $t7 8($t6)
+	sw $t7 8($v0)
+	sw $t1 12($v0)
+	addu $t7 $v0 $t1
+	sb $zero 16($t7)
+	move $a0 $v0
+	jr $ra
+
+# Copies $t4 bytes from $t2 to $t3
+_copy_bytes:
+	beqz $t4 _copy_bytes_end
+	lb $t8 0($t2)
+	sb $t8 0($t3)
+	addiu $t2 $t2 1
+	addiu $t3 $t3 1
+	addiu $t4 $t4 -1
+	b _copy_bytes
+_copy_bytes_end:
+	jr $ra
+
+# $a0 is bool_const1 and $a1 bool_const0. Returns $a0 if the objects
+# $t1 and $t2 are equal basic values, $a1 otherwise.
+equality_test:
+	beqz $t1 _equal_false
+	beqz $t2 _equal_false
+	lw $t3 0($t1)
+	lw $t4 0($t2)
+	bne $t3 $t4 _equal_false
+	lw $t5 _int_tag
+	beq $t3 $t5 _equal_value
+	lw $t5 _bool_tag
+	beq $t3 $t5 _equal_value
+	lw $t5 _string_tag
+	beq $t3 $t5 _equal_string
+	b _equal_false
+_equal_value:
+	lw $t3 12($t1)
+	lw $t4 12($t2)
+	beq $t3 $t4 _equal_true
+	b _equal_false
+_equal_string:
+	lw $t3 12($t1)
+	lw $t4 12($t2)
+	bne $t3 $t4 _equal_false
+	addiu $t1 $t1 16
+	addiu $t2 $t2 16
+_equal_chars:
+	beqz $t3 _equal_true
+	lb $t4 0($t1)
+	lb $t5 0($t2)
+	bne $t4 $t5 _equal_false
+	addiu $t1 $t1 1
+	addiu $t2 $t2 1
+	addiu $t3 $t3 -1
+	b _equal_chars
+_equal_true:
+	jr $ra
+_equal_false:
+	move $a0 $a1
+	jr $ra
+
+# Runtime errors. $t1 is the line, or 0.
+
+_dispatch_abort:
+	la $a1 _dispatch_message
+	j _runtime_error
+
+_case_void_abort:
+	la $a1 _case_void_message
+	j _runtime_error
+
+_divide_abort:
+	la $a1 _divide_message
+	j _runtime_error
+
+# No branch for the object $a0
+_case_abort:
+	move $t0 $a0
+	jal _error_position
+	la $a0 _case_message
+	li $v0 4
+	syscall
+	lw $t2 0($t0)
+	sll $t2 $t2 2
+	la $t3 class_nameTab
+	addu $t3 $t3 $t2
+	lw $a0 0($t3)
+	addiu $a0 $a0 16
+	li $v0 4
+	syscall
+	la $a0 _newline
+	li $v0 4
+	syscall
+	li $v0 10
+	syscall
+
+# Prints the message $a1
+_runtime_error:
+	jal _error_position
+	move $a0 $a1
+	li $v0 4
+	syscall
+	li $v0 10
+	syscall
+
+_error_position:
+	la $a0 _error_prefix
+	li $v0 4
+	syscall
+	beqz $t1 _error_position_end
+	la $a0 _error_line
+	li $v0 4
+	syscall
+	move $a0 $t1
+	li $v0 1
+	syscall
+	la $a0 _error_colon
+	li $v0 4
+	syscall
+_error_position_end:
+	jr $ra
@@ -0,0 +1,389 @@
+"""
+    Simulator of the MIPS assembly that mips.py generates, for when spim
+    is not installed, and to count the instructions a program executes.
+
+    It knows the instructions and directives the generator and the
+    runtime use, and the spim system calls print_int, print_string,
+    read_int, read_string, sbrk and exit. A pseudo instruction (la, li,
+    blt, mul, ...) is one instruction, where spim would execute two or
+    three.
+"""
+import re
+import struct
+import sys
+
+from ..codegen.runtime import MIN_INT
+
+TEXT = 0x00400000
+DATA = 0x10010000
+STACK_TOP = 0x7ffffffc
+STACK_SIZE = 64 * 1024 * 1024
+STACK_BASE = STACK_TOP + 4 - STACK_SIZE
+
+REGISTERS = {
+    'zero': 0, 'at': 1, 'v0': 2, 'v1': 3, 'a0': 4, 'a1': 5, 'a2': 6, 'a3': 7,
+    't0': 8, 't1': 9, 't2': 10, 't3': 11, 't4': 12, 't5': 13, 't6': 14,
+    't7': 15, 's0': 16, 's1': 17, 's2': 18, 's3': 19, 's4': 20, 's5': 21,
+    's6': 22, 's7': 23, 't8': 24, 't9': 25, 'k0': 26, 'k1': 27, 'gp': 28,
+    'sp': 29, 'fp': 30, 'ra': 31,
+}
+SP, RA, V0, A0, A1 = 29, 31, 2, 4, 5
+
+# Operations, by operands: (register, offset(register) or label),
+# (register, register, register or immediate), (register, label),
+# (register, register, label) and (label or register)
+(
+    LW, SW, LB, SB,
+    LI, MOVE, ADDIU, ADDU, SUBU, MUL, DIV, SLL, SRL,
+    B, JAL, JR, JALR,
+    BEQZ, BNEZ, BLTZ, BEQ, BNE, BLT, BLE, BGT, BGE,
+    SYSCALL,
+) = range(27)
+
+MEMORY = {'lw': LW, 'sw': SW, 'lb': LB, 'sb': SB}
+ARITHMETIC = {
+    'addiu': ADDIU, 'addu': ADDU, 'subu': SUBU, 'mul': MUL, 'div': DIV,
+    'sll': SLL, 'srl': SRL,
+}
+BRANCH_ZERO = {'beqz': BEQZ, 'bnez': BNEZ, 'bltz': BLTZ}
+BRANCH = {'beq': BEQ, 'bne': BNE, 'blt': BLT, 'ble': BLE, 'bgt': BGT, 'bge': BGE}
+
+ADDRESS = re.compile(r'^(-?\d+)\((\$\w+)\)$')
+WORD = struct.Struct('<i')
+
+
+class SimulatorError(Exception):
+    """ The assembly is wrong, or the program used a bad address. """
+    pass
+
+
+def signed(value):
+    """ value as a 32 bits signed integer. """
+    return (value - MIN_INT) % 2 ** 32 + MIN_INT
+
+
+class Machine(object):
+    """
+        Runs a MIPS program: Machine(assembly, stdin, stdout).run().
+        instructions is the number of instructions executed, text_size
+        and data_size the size of the program, in instructions and bytes.
+    """
+
+    def __init__(self, assembly, stdin=None, stdout=None):
+        self.stdin = stdin or sys.stdin
+        self.stdout = stdout or sys.stdout
+        self.labels = {}
+        self.code = []
+        self.data = bytearray()
+        self.stack = bytearray(STACK_SIZE)
+        self.instructions = 0
+        self.__assemble(assembly)
+        self.text_size = len(self.code)
+        self.data_size = len(self.data)
+
+    # Assembler
+
+    def __lines(self, assembly):
+        """ Yields (section, label or None, tokens) of each line. """
+        section = 'text'
+        for line in assembly.splitlines():
+            line = line.split('#', 1)[0].strip()
+            label = None
+            if ':' in line:
+                label, line = line.split(':', 1)
+                label, line = label.strip(), line.strip()
+            tokens = line.replace(',', ' ').split()
+            if tokens and tokens[0] in ('.text', '.data'):
+                section = tokens[0][1:]
+                tokens = []
+            yield section, label, tokens
+
+    def __assemble(self, assembly):
+        lines = list(self.__lines(assembly))
+
+        # The address of each label
+        text = data = 0
+        for section, label, tokens in lines:
+            if section == 'data' and tokens:
+                data = self.__align(data, tokens)
+            if label is not None:
+                if label in self.labels:
+                    raise SimulatorError('Label %s defined twice' % label)
+                self.labels[label] = (
+                    TEXT + 4 * text if section == 'text' else DATA + data
+                )
+            if not tokens or tokens[0] == '.globl':
+                continue
+            if section == 'text':
+                text += 1
+            else:
+                data += self.__size(tokens)
+
+        for section, label, tokens in lines:
+            if not tokens or tokens[0] == '.globl':
+                continue
+            if section == 'text':
+                self.code.append(self.__instruction(tokens))
+            else:
+                self.__directive(tokens)
+
+    def __align(self, offset, tokens):
+        if tokens[0] == '.align':
+            alignment = 2 ** int(tokens[1])
+            return (offset + alignment - 1) // alignment * alignment
+        if tokens[0] == '.word' and offset % 4:
+            raise SimulatorError('.word not aligned')
+        return offset
+
+    def __size(self, tokens):
+        directive, operands = tokens[0], tokens[1:]
+        if directive == '.word':
+            return 4 * len(operands)
+        if directive == '.byte':
+            return len(operands)
+        if directive == '.space':
+            return int(operands[0])
+        if directive == '.align':
+            return 0
+        raise SimulatorError('Unknown directive %s' % directive)
+
+    def __directive(self, tokens):
+        directive, operands = tokens[0], tokens[1:]
+        if directive == '.align':
+            self.data.extend(bytearray(self.__align(len(self.data), tokens) - len(self.data)))
+        elif directive == '.space':
+            self.data.extend(bytearray(int(operands[0])))
+        elif directive == '.byte':
+            self.data.extend(bytearray(int(value) & 0xff for value in operands))
+        else:
+            for value in operands:
+                self.data.extend(WORD.pack(signed(self.__value(value))))
+
+    def __value(self, token):
+        """ An immediate, or the address of a label. """
+        if token in self.labels:
+            return self.labels[token]
+        try:
+            return int(token, 0)
+        except ValueError:
+            raise SimulatorError('Undefined label %s' % token)
+
+    def __register(self, token):
+        if not token.startswith('$') or token[1:] not in REGISTERS:
+            raise SimulatorError('Bad register %s' % token)
+        return REGISTERS[token[1:]]
+
+    def __target(self, token):
+        """ The index of the instruction at a text label. """
+        return (self.__value(token) - TEXT) // 4
+
+    def __instruction(self, tokens):
+        name, operands = tokens[0], tokens[1:]
+        try:
+            if name in MEMORY:
+                match = ADDRESS.match(operands[1])
+                if match is None:
+                    offset, base = self.__value(operands[1]), 0
+                else:
+                    offset = int(match.group(1))
+                    base = self.__register(match.group(2))
+                return (MEMORY[name], self.__register(operands[0]), base, offset)
+            if name in ('li', 'la'):
+                return (LI, self.__register(operands[0]), self.__value(operands[1]))
+            if name == 'move':
+                return (MOVE, self.__register(operands[0]),
+                        self.__register(operands[1]))
+            if name in ARITHMETIC:
+                if name in ('addiu', 'sll', 'srl'):
+                    third = int(operands[2], 0)
+                else:
+                    third = self.__register(operands[2])
+                return (ARITHMETIC[name], self.__register(operands[0]),
+                        self.__register(operands[1]), third)
+            if name in ('b', 'j', 'jal'):
+                return (JAL if name == 'jal' else B, self.__target(operands[0]))
+            if name in ('jr', 'jalr'):
+                return (JR if name == 'jr' else JALR, self.__register(operands[0]))
+            if name in BRANCH_ZERO:
+                return (BRANCH_ZERO[name], self.__register(operands[0]),
+                        self.__target(operands[1]))
+            if name in BRANCH:
+                if operands[1].startswith('$'):
+                    # The second operand is a register, or an immediate
+                    second = (True, self.__register(operands[1]))
+                else:
+                    second = (False, int(operands[1], 0))
+                return (BRANCH[name], self.__register(operands[0]), second,
+                        self.__target(operands[2]))
+            if name == 'syscall':
+                return (SYSCALL,)
+        except IndexError:
+            raise SimulatorError('Missing operand: %s' % ' '.join(tokens))
+        raise SimulatorError('Unknown instruction %s' % name)
+
+    # Memory
+
+    def __memory(self, address):
+        """ The buffer with address, and where it is in it. """
+        if STACK_BASE <= address <= STACK_TOP:
+            return self.stack, address - STACK_BASE
+        offset = address - DATA
+        if 0 <= offset < len(self.data):
+            return self.data, offset
+        if STACK_BASE - STACK_SIZE <= address < STACK_BASE:
+            raise SimulatorError('Stack overflow')
+        raise SimulatorError('Bad address 0x%x' % (address & 0xffffffff))
+
+    def __string(self, address):
+        memory, offset = self.__memory(address)
+        return str(memory[offset:memory.index('\0', offset)])
+
+    # Execution
+
+    def run(self):
+        """ Runs the program from main, until it exits. """
+        if 'main' not in self.labels:
+            raise SimulatorError('No main label')
+
+        code = self.code
+        registers = [0] * 32
+        registers[SP] = STACK_TOP
+        registers[RA] = -1
+        memory = self.__memory
+        unpack = WORD.unpack_from
+        pack = WORD.pack_into
+        pc = self.__target('main')
+        count = 0
+
+        try:
+            while True:
+                instruction = code[pc]
+                op = instruction[0]
+                count += 1
+                pc += 1
+
+                if op == LW:
+                    buf, offset = memory(registers[instruction[2]] + instruction[3])
+                    registers[instruction[1]] = unpack(buf, offset)[0]
+                elif op == SW:
+                    buf, offset = memory(registers[instruction[2]] + instruction[3])
+                    pack(buf, offset, registers[instruction[1]])
+                elif op == ADDIU:
+                    registers[instruction[1]] = signed(
+                        registers[instruction[2]] + instruction[3]
+                    )
+                elif op == LI:
+                    registers[instruction[1]] = instruction[2]
+                elif op == MOVE:
+                    registers[instruction[1]] = registers[instruction[2]]
+                elif op == JAL:
+                    registers[RA] = TEXT + 4 * pc
+                    pc = instruction[1]
+                elif op == JALR:
+                    registers[RA] = TEXT + 4 * pc
+                    pc = (registers[instruction[1]] - TEXT) >> 2
+                elif op == JR:
+                    pc = (registers[instruction[1]] - TEXT) >> 2
+                elif op == B:
+                    pc = instruction[1]
+                elif op == BEQZ:
+                    if registers[instruction[1]] == 0:
+                        pc = instruction[2]
+                elif op == BNEZ:
+                    if registers[instruction[1]] != 0:
+                        pc = instruction[2]
+                elif op == BLTZ:
+                    if registers[instruction[1]] < 0:
+                        pc = instruction[2]
+                elif op <= BGE and op >= BEQ:
+                    first = registers[instruction[1]]
+                    is_register, second = instruction[2]
+                    if is_register:
+                        second = registers[second]
+                    if op == BEQ:
+                        taken = first == second
+                    elif op == BNE:
+                        taken = first != second
+                    elif op == BLT:
+                        taken = first < second
+                    elif op == BLE:
+                        taken = first <= second
+                    elif op == BGT:
+                        taken = first > second
+                    else:
+                        taken = first >= second
+                    if taken:
+                        pc = instruction[3]
+                elif op == LB:
+                    buf, offset = memory(registers[instruction[2]] + instruction[3])
+                    byte = buf[offset]
+                    registers[instruction[1]] = byte - 256 if byte > 127 else byte
+                elif op == SB:
+                    buf, offset = memory(registers[instruction[2]] + instruction[3])
+                    buf[offset] = registers[instruction[1]] & 0xff
+                elif op <= SRL and op >= ADDU:
+                    first = registers[instruction[2]]
+                    if op == SLL:
+                        value = first << instruction[3]
+                    elif op == SRL:
+                        value = (first & 0xffffffff) >> instruction[3]
+                    else:
+                        second = registers[instruction[3]]
+                        if op == ADDU:
+                            value = first + second
+                        elif op == SUBU:
+                            value = first - second
+                        elif op == MUL:
+                            value = first * second
+                        else:
+                            if second == 0:
+                                raise SimulatorError('Division by zero')
+                            # Rounds towards zero
+                            value = abs(first) // abs(second)
+                            if (first < 0) != (second < 0):
+                                value = -value
+                    registers[instruction[1]] = signed(value)
+                elif op == SYSCALL:
+                    if not self.__syscall(registers):
+                        return
+                else:
+                    raise SimulatorError('Bad instruction %r' % (instruction,))
+                registers[0] = 0
+        except IndexError:
+            raise SimulatorError('Jump out of the program')
+        finally:
+            self.instructions += count
+
+    def __syscall(self, registers):
+        """ Runs the system call in $v0, returns False on exit. """
+        call = registers[V0]
+        if call == 1:
+            self.stdout.write(str(registers[A0]))
+        elif call == 4:
+            self.stdout.write(self.__string(registers[A0]))
+        elif call == 5:
+            try:
+                registers[V0] = signed(int(self.stdin.readline()))
+            except ValueError:
+                registers[V0] = 0
+        elif call == 8:
+            # At most $a1 - 1 characters, and a zero
+            size = registers[A1]
+            line = self.stdin.readline(max(size - 1, 0))
+            memory, offset = self.__memory(registers[A0])
+            memory[offset:offset + len(line) + 1] = bytearray(line + '\0')
+        elif call == 9:
+            registers[V0] = DATA + len(self.data)
+            self.data.extend(bytearray(registers[A0]))
+        elif call == 10:
+            return False
+        else:
+            raise SimulatorError('Unknown system call %d' % call)
+        return True
+
+
+def simulate(assembly, stdin=None, stdout=None):
+    """ Runs assembly, returns the Machine, with the number of instructions. """
+    machine = Machine(assembly, stdin, stdout)
+    machine.run()
+    return machine
@@ -0,0 +1,84 @@
+"""
+    Runs the assembly of a program with spim, or with the simulator when
+    spim is not installed.
+
+    The runtime prints "\nERROR: " and the message of a runtime error
+    before it stops, run splits it from the output of the program.
+"""
+import os
+import subprocess
+import tempfile
+from StringIO import StringIO
+from distutils.spawn import find_executable
+
+from ..codegen.runtime import CoolRuntimeError
+
+from simulator import simulate
+
+ERROR = '\nERROR: '
+
+# Lines spim prints before the output of the program
+HEADER = ('SPIM Version', 'Copyright', 'All Rights Reserved',
+          'See the file', 'Loaded:')
+
+
+def spim():
+    """ Path of spim, or None if it is not installed. """
+    return find_executable('spim')
+
+
+def run_spim(assembly, stdin=''):
+    """
+        Runs assembly with spim, with the input stdin (a string or a
+        file), returns what it printed.
+    """
+    handle, path = tempfile.mkstemp(suffix='.s')
+    try:
+        with os.fdopen(handle, 'w') as f:
+            f.write(assembly)
+        if hasattr(stdin, 'fileno'):
+            process = subprocess.Popen(
+                [spim(), '-file', path], stdin=stdin, stdout=subprocess.PIPE
+            )
+            output, _ = process.communicate()
+        else:
+            process = subprocess.Popen(
+                [spim(), '-file', path], stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE
+            )
+            output, _ = process.communicate(stdin)
+    finally:
+        os.remove(path)
+
+    lines = output.split('\n')
+    while lines and lines[0].startswith(HEADER):
+        lines.pop(0)
+    return '\n'.join(lines)
+
+
+def run(assembly, stdin, stdout, simulator=None):
+    """
+        Runs assembly, reading stdin and writing to stdout (files). Uses
+        the simulator if simulator is True, or if spim is not installed.
+        A runtime error is raised as a CoolRuntimeError. Returns the
+        simulator Machine, or None.
+    """
+    if simulator is None:
+        simulator = spim() is None
+
+    machine = None
+    if simulator:
+        output = StringIO()
+        machine = simulate(assembly, stdin, output)
+        output = output.getvalue()
+    else:
+        if not hasattr(stdin, 'fileno'):
+            stdin = stdin.read()
+        output = run_spim(assembly, stdin)
+
+    error = output.rfind(ERROR)
+    if error < 0:
+        stdout.write(output)
+        return machine
+    stdout.write(output[:error])
+    raise CoolRuntimeError(output[error + len(ERROR):].rstrip('\n'))
@@ -0,0 +1,2 @@
+from .native import generate
+from .cc import build, execute, run, cc, GCStats, gc_report
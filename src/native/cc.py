@@ -0,0 +1,137 @@
+"""
+    Builds the C code of a program with the system C compiler, and runs
+    it.
+
+    The program prints to stdout; a runtime error is printed to stderr,
+    and the program exits with status 1. When the environment variable
+    COOL_GC_STATS names a file, the program writes the statistics of its
+    heap to it at the end.
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+from collections import namedtuple
+from distutils.spawn import find_executable
+
+from ..codegen import CompileError
+from ..codegen.runtime import CoolRuntimeError
+
+FLAGS = ('-O2',)
+LIBRARIES = ('-lpthread',)
+
+# Bytes allocated, collections, bytes copied from the nursery to the old
+# generation, the time of the collections and of the longest one (in
+# seconds), and the size of the heap at the end (in bytes)
+GCStats = namedtuple(
+    "GCStats", "allocated, minor, major, promoted, pause, max_pause, heap"
+)
+
+
+def gc_report(stats):
+    """ The GCStats stats, as lines of text. """
+    return [
+        'allocated: %d bytes, promoted: %d bytes' % (
+            stats.allocated, stats.promoted
+        ),
+        'collections: %d minor, %d major' % (stats.minor, stats.major),
+        'pauses: %.2f ms, longest %.2f ms' % (
+            stats.pause * 1000, stats.max_pause * 1000
+        ),
+        'heap: %d bytes' % stats.heap,
+    ]
+
+
+def read_gc_stats(path):
+    values = {}
+    with open(path) as f:
+        for line in f:
+            name, value = line.split()
+            values[name] = float(value) if '.' in value else int(value)
+    return GCStats(**values)
+
+
+def cc():
+    """ Path of the C compiler, or None if there is none. """
+    for name in ('cc', 'gcc', 'clang'):
+        path = find_executable(name)
+        if path is not None:
+            return path
+    return None
+
+
+def build(source, output, flags=FLAGS):
+    """ Compiles the C code source to the executable output. """
+    compiler = cc()
+    if compiler is None:
+        raise CompileError('No C compiler found (cc, gcc or clang)')
+
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'program.c')
+        with open(path, 'w') as f:
+            f.write(source)
+        process = subprocess.Popen(
+            [compiler] + list(flags) + ['-o', output, path] + list(LIBRARIES),
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+        messages, _ = process.communicate()
+    finally:
+        shutil.rmtree(directory)
+    if process.returncode != 0:
+        raise CompileError('%s failed:\n%s' % (compiler, messages))
+
+
+def execute(executable, stdin='', stdout=None, gc_stats=False):
+    """
+        Runs executable with the input stdin, a string or a file, and
+        writes what it prints to stdout (a file). Raises CoolRuntimeError
+        on a runtime error. With gc_stats, returns the GCStats of the run.
+    """
+    env = None
+    if gc_stats:
+        descriptor, path = tempfile.mkstemp()
+        os.close(descriptor)
+        env = dict(os.environ, COOL_GC_STATS=path)
+    try:
+        if hasattr(stdin, 'fileno'):
+            # The program reads the file itself, as it needs it
+            process = subprocess.Popen(
+                [executable], stdin=stdin, stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE, env=env
+            )
+            output, error = process.communicate()
+        else:
+            process = subprocess.Popen(
+                [executable], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE, env=env
+            )
+            output, error = process.communicate(stdin)
+        stats = read_gc_stats(path) if gc_stats and process.returncode == 0 \
+            else None
+    finally:
+        if gc_stats:
+            os.remove(path)
+    if stdout is not None:
+        stdout.write(output)
+    if process.returncode != 0:
+        raise CoolRuntimeError(
+            error.strip() or 'Exit status %d' % process.returncode
+        )
+    return stats
+
+
+def run(source, stdin, stdout, flags=FLAGS, gc_stats=False):
+    """
+        Builds and runs the C code source, reading and writing files.
+        With gc_stats, returns the GCStats of the run.
+    """
+    directory = tempfile.mkdtemp()
+    try:
+        executable = os.path.join(directory, 'program')
+        build(source, executable, flags)
+        if not hasattr(stdin, 'fileno'):
+            stdin = stdin.read()
+        return execute(executable, stdin, stdout, gc_stats)
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,586 @@
+"""
+    Generation of C code, compiled to native code by the system cc (see
+    cc.py).
+
+    Each class gets a struct with its attributes, the inherited ones
+    first, a function per method, a constructor (new_<class>) and a
+    Class with its tag, its name and its vtable. The vtable slots come
+    from selectors, like in the MIPS backend, so a dispatch does not need
+    the class of the receiver. The runtime (runtime.h and runtime.c) has
+    the methods of the basic classes.
+
+    Each expression is compiled to statements that leave its value in a
+    temporary, which keeps the order of evaluation of Cool (the arguments
+    before the receiver).
+
+    The garbage collector of the runtime moves the objects: a function
+    keeps self, its arguments, its locals and its temporaries in an
+    array r, that it makes a root of the collector while it runs. The
+    values declared Int or Bool (the arguments a0, a1, ..., the locals
+    l0, l1, ... and the temporaries t1, t2, ...) are not roots: the
+    collector does not move them. Like the checker, this trusts the
+    declared types.
+"""
+import os
+
+from ..codegen import CompileError
+from ..codegen.runtime import CoolRuntimeError, RuntimeClass, wrap
+from ..interpreter.interpreter import Resolver, SELF, LOCAL
+from ..mips import selectors
+from ..optimizer.hierarchy import devirtualize
+from ..syntactic.ast import *
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+BASIC = ('Object', 'IO', 'Int', 'Bool', 'String')
+
+# The types of the values that are not objects of the heap
+VALUE_TYPES = frozenset(['Int', 'Bool'])
+
+# sizeof of the objects of the basic classes
+SIZES = {
+    'Object': 'sizeof(Object)', 'IO': 'sizeof(Object)', 'Int': '0',
+    'Bool': 'sizeof(Object)', 'String': 'sizeof(String)',
+}
+
+
+def runtime(name):
+    """ The code of runtime.h or runtime.c. """
+    with open(os.path.join(DIRECTORY, name)) as f:
+        return f.read()
+
+
+def c_string(string):
+    """ string as a C string literal. """
+    chars = []
+    for c in string:
+        if c in '"\\' or not ' ' <= c <= '~':
+            chars.append('\\%03o' % ord(c))
+        else:
+            chars.append(c)
+    return '"%s"' % ''.join(chars)
+
+
+class CGenerator(NodeVisitor):
+    """
+        Compiles the classes of a program analyzed by Semant.
+
+        Expressions are compiled by the visit_<node class name> methods,
+        each one emits the statements of the expression and returns a C
+        expression, without side effects, with its value. With
+        direct_calls, a dispatch with one possible target calls the C
+        function of the method, which cc can inline.
+    """
+
+    def __init__(self, semant, direct_calls=True):
+        super(CGenerator, self).__init__()
+        self.semant = semant
+        # id of a Dispatch -> (class, method name) it calls
+        self.targets = devirtualize(semant).targets if direct_calls else {}
+        self.classes = []
+        self.by_name = {}
+        # Class name -> tag of its last descendant
+        self.last = {}
+        # Class name -> {method name: C function}
+        self.tables = {}
+        self.selectors = {}
+        self.__strings = {}
+
+        self.names = {}
+        self.slots = {}
+        self.resolver = Resolver(self.names, self.slots)
+
+        # Method name -> the types its definitions return
+        self.returns = {}
+        for table in semant.methods.values():
+            for name, method in table.items():
+                self.returns.setdefault(name, set()).add(method.return_type)
+
+    def generate(self):
+        """ Returns the C code of the program. """
+        self.__add_class('Object', None)
+        self.selectors = selectors(self.tables)
+        if 'Main' not in self.by_name:
+            raise CompileError('Class Main is not defined')
+        if 'main' not in self.tables['Main']:
+            raise CompileError('Class Main has no main method')
+
+        names = [self.__string(klass.name) for klass in self.classes]
+        structs, prototypes, functions = [], [], []
+        for klass in self.classes:
+            if klass.name in BASIC:
+                continue
+            structs += self.__struct(klass)
+            prototypes += [
+                'Value new_%s(void);' % klass.name,
+                'static Value init_%s(Value self);' % klass.name,
+                'extern const Class class_%s;' % klass.name,
+            ]
+            functions += self.__constructor(klass)
+            for feature in self.semant.classes[klass.name].feature_list:
+                if isinstance(feature, Method):
+                    prototypes.append('%s;' % self.__signature(klass, feature))
+                    functions += self.__method(klass, feature)
+        functions += self.__entry()
+
+        return '\n'.join(
+            [runtime('runtime.h')] + structs + prototypes +
+            self.__constants() + self.__classes(names) + functions +
+            [runtime('runtime.c')]
+        )
+
+    def __add_class(self, name, parent):
+        """ Adds the class name and its children, parents first. """
+        klass = RuntimeClass(name, len(self.classes), parent)
+        self.classes.append(klass)
+        self.by_name[name] = klass
+
+        table = dict(self.tables.get(parent and parent.name, {}))
+        for feature in self.semant.classes[name].feature_list:
+            if isinstance(feature, Attr):
+                klass.attributes.append(feature.name)
+                klass.defaults.append(feature.type)
+            else:
+                table[feature.name] = '%s_%s' % (name, feature.name)
+        self.tables[name] = table
+
+        for child in sorted(self.semant.parents[name]):
+            self.__add_class(child, klass)
+        self.last[name] = len(self.classes) - 1
+
+    def __class(self, name, node):
+        if name not in self.by_name:
+            raise CompileError('Undefined class %s' % name, node.line)
+        return self.by_name[name]
+
+    def __selector(self, method, node):
+        if method not in self.selectors:
+            raise CompileError('Undefined method %s' % method, node.line)
+        return self.selectors[method]
+
+    # Declarations
+
+    def __struct(self, klass):
+        lines = ['struct cool_%s {' % klass.name, '    const Class *klass;']
+        lines += ['    Value a_%s;' % name for name in klass.attributes]
+        return lines + ['};']
+
+    def __signature(self, klass, method):
+        formals = ['Value self'] + [
+            'Value a%d' % i for i in range(len(method.formal_list))
+        ]
+        return 'Value %s_%s(%s)' % (klass.name, method.name, ', '.join(formals))
+
+    def __constants(self):
+        return [
+            'static String %s = {&class_String, %d, %s};' % (
+                label, len(value), c_string(value)
+            )
+            for value, label in sorted(self.__strings.items())
+        ]
+
+    def __classes(self, names):
+        lines = []
+        for klass, name in zip(self.classes, names):
+            table = self.tables[klass.name]
+            vtable = ['0'] * (max([-1] + [
+                self.selectors[method] for method in table
+            ]) + 1)
+            for method, function in table.items():
+                vtable[self.selectors[method]] = '(Method)%s' % function
+            lines.append('static const Method vtable_%s[] = {%s};' % (
+                klass.name, ', '.join(vtable or ['0'])
+            ))
+            lines.append(
+                'const Class class_%s = {(Value)&%s, %d, %d, %s, new_%s, '
+                'vtable_%s};' % (
+                    klass.name, name, klass.index, self.last[klass.name],
+                    SIZES.get(klass.name, 'sizeof(struct cool_%s)' % klass.name),
+                    klass.name, klass.name
+                )
+            )
+        return lines
+
+    def __string(self, value):
+        if value not in self.__strings:
+            self.__strings[value] = 'string%d' % len(self.__strings)
+        return self.__strings[value]
+
+    def __default(self, _type):
+        if _type == 'Int':
+            return 'MAKE_INT(0)'
+        if _type == 'Bool':
+            return 'FALSE'
+        if _type == 'String':
+            return '(Value)&%s' % self.__string('')
+        return '0'
+
+    # Functions
+
+    def __resolve(self, klass, formals, body):
+        try:
+            return self.resolver.resolve(klass, formals, body)
+        except CoolRuntimeError as e:
+            raise CompileError(e.args[0], e.line)
+
+    def __begin(self, klass, formals, bodies, nlocals):
+        """ Begins a function with the formals, that runs bodies. """
+        self.__klass = klass
+        self.__nargs = len(formals)
+        self.__lines = []
+        self.__values = 0
+        self.__depth = 1
+
+        # The variables of a slot, its declared types
+        types = {}
+        for i, formal in enumerate(formals):
+            types.setdefault(i, set()).add(formal.type)
+        for body in bodies:
+            for node in walk(body):
+                if isinstance(node, (Let, CaseBranch)):
+                    types.setdefault(self.slots[id(node)], set()).add(node.type)
+        self.__locals = []
+        self.__value_slots = set()
+        self.__roots = ['self']
+        for slot in range(max(self.__nargs, nlocals)):
+            name = ('a%d' if slot < self.__nargs else 'l%d') % slot
+            if types.get(slot, set(['Object'])) <= VALUE_TYPES:
+                self.__value_slots.add(slot)
+                self.__locals.append(name)
+            else:
+                self.__locals.append('r[%d]' % len(self.__roots))
+                self.__roots.append(name if slot < self.__nargs else None)
+        self.__temps = len(self.__roots)
+
+    def __end(self, signature, result):
+        """
+            The lines of the function, that returns result. r has self,
+            and the arguments, locals and temporaries that are roots.
+        """
+        lines = [signature, '{']
+        values = [
+            name for name in self.__locals[self.__nargs:] if name[0] == 'l'
+        ] + ['t%d' % i for i in range(1, self.__values + 1)]
+        if values:
+            lines.append('    Value %s;' % ', '.join(values))
+        arguments = [name for name in self.__roots if name is not None]
+        lines += [
+            '    Value r[%d] = {%s};' % (self.__temps, ', '.join(arguments)),
+            '    ENTER(r, %d);' % self.__temps,
+        ]
+        return lines + self.__lines + [
+            '    LEAVE();', '    return %s;' % result, '}', '',
+        ]
+
+    def __emit(self, line):
+        self.__lines.append('    ' * self.__depth + line)
+
+    def __temp(self, expression=None, root=True):
+        """
+            A new temporary, with the value of expression if any. It is
+            not a root if not root: the value is an Int or a Bool.
+        """
+        if not root:
+            return self.__value(expression)
+        temp = 'r[%d]' % self.__temps
+        self.__temps += 1
+        if expression is not None:
+            self.__emit('%s = %s;' % (temp, expression))
+        return temp
+
+    def __value(self, expression):
+        """ A temporary, not a root, with the Int or Bool expression. """
+        self.__values += 1
+        temp = 't%d' % self.__values
+        self.__emit('%s = %s;' % (temp, expression))
+        return temp
+
+    def __local(self, slot):
+        return self.__locals[slot]
+
+    def __attribute(self, slot):
+        return '((struct cool_%s *)r[0])->a_%s' % (
+            self.__klass.name, self.__klass.attributes[slot]
+        )
+
+    def __constructor(self, klass):
+        """ new_<class>, and init_<class> that initializes the attributes. """
+        lines = [
+            'Value new_%s(void)' % klass.name, '{',
+            '    struct cool_%s *object = allocate(sizeof(struct cool_%s));' % (
+                klass.name, klass.name
+            ),
+            '    object->klass = &class_%s;' % klass.name,
+        ]
+        for name, _type in zip(klass.attributes, klass.defaults):
+            default = self.__default(_type)
+            if default != '0':
+                lines.append('    object->a_%s = %s;' % (name, default))
+        lines += [
+            '    return init_%s((Value)object);' % klass.name, '}', '',
+        ]
+
+        attributes = [
+            feature for feature in self.semant.classes[klass.name].feature_list
+            if isinstance(feature, Attr) and feature.body is not None
+        ]
+        nlocals = max(
+            [self.__resolve(klass, [], attr.body) for attr in attributes] + [0]
+        )
+        self.__begin(klass, [], [attr.body for attr in attributes], nlocals)
+        if klass.parent.name not in BASIC:
+            # init returns self, where the collector moved it
+            self.__emit('r[0] = init_%s(r[0]);' % klass.parent.name)
+        for attr in attributes:
+            value = self.visit(attr.body)
+            self.__store(klass.attributes.index(attr.name), value)
+        return lines + self.__end(
+            'static Value init_%s(Value self)' % klass.name, 'r[0]'
+        )
+
+    def __method(self, klass, method):
+        nlocals = self.__resolve(klass, method.formal_list, method.body)
+        self.__begin(klass, method.formal_list, [method.body], nlocals)
+        result = self.visit(method.body)
+        return self.__end(self.__signature(klass, method), result)
+
+    def __entry(self):
+        """ main, that runs (new Main).main(). """
+        return [
+            'static Value entry(void)', '{',
+            '    return %s(new_Main());' % self.tables['Main']['main'],
+            '}', '',
+            'int main(void)', '{', '    return run(entry);', '}', '',
+        ]
+
+    # Expressions
+
+    def generic_visit(self, expression):
+        raise CompileError(
+            'Can not compile %r' % (expression,),
+            getattr(expression, 'line', None)
+        )
+
+    def visit_Int(self, expression):
+        return 'MAKE_INT(%d)' % wrap(expression.content)
+
+    def visit_Str(self, expression):
+        return '(Value)&%s' % self.__string(expression.content)
+
+    def visit_Bool(self, expression):
+        return 'TRUE' if expression.content else 'FALSE'
+
+    def visit_Object(self, expression):
+        kind, slot = self.names[id(expression)]
+        if kind == SELF:
+            return 'r[0]'
+        if kind == LOCAL:
+            return self.__temp(
+                self.__local(slot), slot not in self.__value_slots
+            )
+        return self.__temp(
+            self.__attribute(slot),
+            self.__klass.defaults[slot] not in VALUE_TYPES
+        )
+
+    def visit_Assign(self, expression):
+        value = self.visit(expression.body)
+        kind, slot = self.names[id(expression)]
+        if kind == SELF:
+            raise CompileError('Can not assign to self', expression.line)
+        if kind == LOCAL:
+            self.__emit('%s = %s;' % (self.__local(slot), value))
+        else:
+            self.__store(slot, value)
+        return value
+
+    def __store(self, slot, value):
+        """ Stores value in the attribute slot of self. """
+        self.__emit('%s = %s;' % (self.__attribute(slot), value))
+        self.__emit('WRITE_BARRIER(r[0], %s);' % value)
+
+    def visit_Block(self, expression):
+        value = '0'
+        for inner in expression.body:
+            value = self.visit(inner)
+        return value
+
+    def __call(self, expression, function, returns):
+        """
+            Calls function, where %(receiver)s is the receiver, that
+            returns a value of one of the types returns.
+        """
+        # The arguments are evaluated before the receiver
+        args = [self.visit(argument) for argument in expression.expr_list]
+        if expression.body == 'self':
+            receiver = 'r[0]'
+        else:
+            receiver = self.visit(expression.body)
+            self.__emit('if (%s == 0) runtime_error(%d, "Dispatch to void");' % (
+                receiver, expression.line or 0
+            ))
+        return self.__temp('%s(%s)' % (
+            function % {'receiver': receiver}, ', '.join([receiver] + args)
+        ), not returns <= VALUE_TYPES)
+
+    def visit_Dispatch(self, expression):
+        target = self.targets.get(id(expression))
+        if target is not None and target[1] in self.tables.get(target[0], ()):
+            method = self.semant.methods[target[0]][target[1]]
+            if len(method.formal_list) == len(expression.expr_list):
+                return self.__call(
+                    expression, self.tables[target[0]][target[1]],
+                    set([method.return_type])
+                )
+
+        slot = self.__selector(expression.method, expression)
+        return self.__call(
+            expression, '((Value (*)(%s))CLASS_OF(%%(receiver)s)->vtable[%d])' % (
+                ', '.join(['Value'] * (len(expression.expr_list) + 1)), slot
+            ), self.returns[expression.method]
+        )
+
+    def visit_StaticDispatch(self, expression):
+        table = self.tables[self.__class(expression.type, expression).name]
+        if expression.method not in table:
+            raise CompileError(
+                'Undefined method %s in class %s' % (
+                    expression.method, expression.type
+                ), expression.line
+            )
+        method = self.semant.methods[expression.type][expression.method]
+        return self.__call(
+            expression, table[expression.method], set([method.return_type])
+        )
+
+    def __binary(self, expression, template):
+        first = self.visit(expression.first)
+        second = self.visit(expression.second)
+        return self.__value(template % {'a': first, 'b': second})
+
+    def visit_Plus(self, expression):
+        return self.__binary(expression, 'ADD(%(a)s, %(b)s)')
+
+    def visit_Sub(self, expression):
+        return self.__binary(expression, 'SUB(%(a)s, %(b)s)')
+
+    def visit_Mult(self, expression):
+        return self.__binary(expression, 'MUL(%(a)s, %(b)s)')
+
+    def visit_Div(self, expression):
+        return self.__binary(
+            expression, 'divide(%%(a)s, %%(b)s, %d)' % (expression.line or 0)
+        )
+
+    def visit_Lt(self, expression):
+        return self.__binary(expression, 'BOOL(INT(%(a)s) < INT(%(b)s))')
+
+    def visit_Le(self, expression):
+        return self.__binary(expression, 'BOOL(INT(%(a)s) <= INT(%(b)s))')
+
+    def visit_Eq(self, expression):
+        # Basic values are equal by value, objects by identity
+        return self.__binary(expression, 'BOOL(equal(%(a)s, %(b)s))')
+
+    def visit_Neg(self, expression):
+        return self.__value('NEG(%s)' % self.visit(expression.body))
+
+    def visit_Not(self, expression):
+        return self.__value('BOOL(%s == FALSE)' % self.visit(expression.body))
+
+    def visit_Isvoid(self, expression):
+        return self.__value('BOOL(%s == 0)' % self.visit(expression.body))
+
+    def __branch(self, result, body):
+        """ Emits body, inside a block, that leaves its value in result. """
+        self.__depth += 1
+        self.__emit('%s = %s;' % (result, self.visit(body)))
+        self.__depth -= 1
+
+    def visit_If(self, expression):
+        predicate = self.visit(expression.predicate)
+        result = self.__temp()
+        self.__emit('if (%s == TRUE) {' % predicate)
+        self.__branch(result, expression.then_body)
+        self.__emit('} else {')
+        self.__branch(result, expression.else_body)
+        self.__emit('}')
+        return result
+
+    def visit_While(self, expression):
+        self.__emit('for (;;) {')
+        self.__depth += 1
+        predicate = self.visit(expression.predicate)
+        self.__emit('if (%s != TRUE) break;' % predicate)
+        self.visit(expression.body)
+        self.__depth -= 1
+        self.__emit('}')
+        # A loop is void
+        return '0'
+
+    def visit_Let(self, expression):
+        if expression.init is None:
+            value = self.__default(expression.type)
+        else:
+            value = self.visit(expression.init)
+        self.__emit('%s = %s;' % (
+            self.__local(self.slots[id(expression)]), value
+        ))
+        return self.visit(expression.body)
+
+    def visit_Case(self, expression):
+        value = self.visit(expression.expr)
+        line = expression.line or 0
+        self.__emit('if (%s == 0) runtime_error(%d, "Case on void");' % (
+            value, line
+        ))
+        tag = self.__value('CLASS_OF(%s)->tag' % value)
+        result = self.__temp()
+
+        # The branch of the closest ancestor: the deepest classes first,
+        # the first branch of a class is the one taken
+        branches = {}
+        for branch in expression.case_list:
+            index = self.__class(branch.type, branch).index
+            branches.setdefault(index, branch)
+
+        test = 'if'
+        for index in sorted(branches, key=self.__class_depth, reverse=True):
+            branch = branches[index]
+            self.__emit('%s (%s >= %d && %s <= %d) {' % (
+                test, tag, index, tag, self.last[self.classes[index].name]
+            ))
+            self.__depth += 1
+            self.__emit('%s = %s;' % (
+                self.__local(self.slots[id(branch)]), value
+            ))
+            self.__depth -= 1
+            self.__branch(result, branch.body)
+            test = '} else if'
+        if branches:
+            self.__emit('} else {')
+            self.__depth += 1
+        self.__emit('no_branch(%s, %d);' % (value, line))
+        if branches:
+            self.__depth -= 1
+            self.__emit('}')
+        return result
+
+    def __class_depth(self, index):
+        depth = 0
+        klass = self.classes[index]
+        while klass.parent is not None:
+            klass = klass.parent
+            depth += 1
+        return depth
+
+    def visit_New(self, expression):
+        if expression.type == 'SELF_TYPE':
+            return self.__temp('CLASS_OF(r[0])->create()')
+        name = self.__class(expression.type, expression).name
+        return self.__temp('new_%s()' % name)
+
+
+def generate(semant, direct_calls=True):
+    """ The C code of the program analyzed by semant (see Semant.build). """
+    return CGenerator(semant, direct_calls).generate()
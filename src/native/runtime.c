@@ -0,0 +1,537 @@
+/*
+ * Runtime of the programs compiled to C: memory, runtime errors and the
+ * methods of the basic classes. The program prints to stdout, and a
+ * runtime error to stderr, before it exits with status 1.
+ */
+#include <pthread.h>
+#include <signal.h>
+#include <time.h>
+#include <unistd.h>
+
+/* The program runs in a thread with a stack of STACK_SIZE bytes, deep
+   recursions are common in Cool */
+#define STACK_SIZE (512 * 1024 * 1024)
+/* COOL_NURSERY_SIZE can change it */
+#define NURSERY_SIZE (2 * 1024 * 1024)
+/* A minor collection runs when so many objects are remembered */
+#define REMEMBERED_LIMIT 65536
+#define ROUND(size) (((size) + sizeof(Value) - 1) & ~(sizeof(Value) - 1))
+
+Object true_object = {&class_Bool};
+Object false_object = {&class_Bool};
+
+static String empty_string = {&class_String, 0, ""};
+
+/*
+ * The heap has two generations. The objects are allocated in the
+ * nursery; a minor collection copies the ones that are alive to the old
+ * generation, and empties the nursery. When the old generation has no
+ * room for them, a major collection copies the live objects of both
+ * generations to a new old generation. The copies follow the roots, the
+ * values of the frames, and in a minor collection the remembered
+ * objects of the old generation, that may point to the nursery.
+ *
+ * A copied object keeps the address of its copy, with the low bit set,
+ * in place of its class.
+ */
+Frame *frames;
+char *nursery, *nursery_end;
+static char *nursery_top;
+static size_t nursery_size = NURSERY_SIZE, large_size = NURSERY_SIZE / 8;
+static char *old, *old_top, *old_end;
+
+static Value *remembered;
+static size_t remembered_count, remembered_size;
+
+/* The collection copies the objects of the spaces from, to to_top */
+static struct {
+    char *start, *end;
+} from[2];
+static char *to_top;
+
+static struct {
+    unsigned long minor, major;
+    unsigned long long allocated, promoted;
+    double pause, max_pause;
+} stats;
+
+static void *reserve(size_t size)
+{
+    void *memory = malloc(size);
+
+    if (memory == NULL)
+        runtime_error(0, "Out of memory");
+    return memory;
+}
+
+static size_t object_size(const Object *object)
+{
+    if (object->klass == &class_String)
+        return ROUND(sizeof(String) + ((String *)object)->length + 1);
+    return object->klass->size;
+}
+
+static void forward(Value *slot)
+{
+    Value value = *slot;
+    Object *object = (Object *)value, *copy;
+    size_t size;
+
+    if (IS_INT(value) ||
+            !(((char *)value >= from[0].start && (char *)value < from[0].end) ||
+              ((char *)value >= from[1].start && (char *)value < from[1].end)))
+        return;
+    if ((Value)object->klass & 1) {
+        *slot = (Value)object->klass & ~(Value)1;
+        return;
+    }
+
+    size = object_size(object);
+    copy = (Object *)to_top;
+    to_top += size;
+    memcpy(copy, object, size);
+    if (copy->klass == &class_String)
+        STRING(copy)->chars = (char *)(STRING(copy) + 1);
+    object->klass = (const Class *)((Value)copy | 1);
+    *slot = (Value)copy;
+}
+
+static void scan(Object *object)
+{
+    Value *field, *end;
+
+    if (object->klass == &class_String)
+        return;
+    end = (Value *)((char *)object + object->klass->size);
+    for (field = (Value *)(object + 1); field < end; field++)
+        forward(field);
+}
+
+/* Copies the roots and, from start, what the copies point to */
+static void copy_live(char *start)
+{
+    Frame *frame;
+    int i;
+
+    for (frame = frames; frame != NULL; frame = frame->previous)
+        for (i = 0; i < frame->size; i++)
+            forward(&frame->values[i]);
+    while (start < to_top) {
+        scan((Object *)start);
+        start += object_size((Object *)start);
+    }
+}
+
+static void empty_nursery(void)
+{
+    memset(nursery, 0, nursery_top - nursery);
+    nursery_top = nursery;
+    remembered_count = 0;
+}
+
+static void minor_collection(void)
+{
+    char *start = old_top;
+    size_t i;
+
+    from[0].start = nursery;
+    from[0].end = nursery_top;
+    from[1].start = from[1].end = NULL;
+    to_top = old_top;
+    for (i = 0; i < remembered_count; i++)
+        scan((Object *)remembered[i]);
+    copy_live(start);
+
+    stats.minor++;
+    stats.promoted += to_top - start;
+    old_top = to_top;
+    empty_nursery();
+}
+
+/* Makes room for extra more bytes in the old generation */
+static void major_collection(size_t extra)
+{
+    size_t used = (old_top - old) + (nursery_top - nursery), live, limit;
+    size_t capacity = used + extra + 4 * nursery_size;
+    char *space = reserve(capacity);
+
+    from[0].start = old;
+    from[0].end = old_top;
+    from[1].start = nursery;
+    from[1].end = nursery_top;
+    to_top = space;
+    copy_live(space);
+
+    free(old);
+    live = to_top - space;
+    old = space;
+    old_top = to_top;
+    /* The old generation grows with what is alive */
+    limit = 2 * live + extra + 4 * nursery_size;
+    old_end = space + (limit < capacity ? limit : capacity);
+    stats.major++;
+    empty_nursery();
+}
+
+static double now(void)
+{
+    struct timespec time;
+
+    clock_gettime(CLOCK_MONOTONIC, &time);
+    return time.tv_sec + time.tv_nsec / 1e9;
+}
+
+/* Collects, and leaves room for extra bytes in the old generation */
+static void collect(size_t extra)
+{
+    double start = now(), pause;
+
+    if ((size_t)(old_end - old_top) < (size_t)(nursery_top - nursery) + extra)
+        major_collection(extra);
+    else
+        minor_collection();
+    pause = now() - start;
+    stats.pause += pause;
+    if (pause > stats.max_pause)
+        stats.max_pause = pause;
+}
+
+static void record(Value object)
+{
+    if (remembered_count == remembered_size) {
+        remembered_size = remembered_size ? 2 * remembered_size : 1024;
+        remembered = realloc(remembered, remembered_size * sizeof(Value));
+        if (remembered == NULL)
+            runtime_error(0, "Out of memory");
+    }
+    remembered[remembered_count++] = object;
+}
+
+void remember(Value object)
+{
+    record(object);
+    if (remembered_count >= REMEMBERED_LIMIT)
+        collect(0);
+}
+
+/* The memory of an object, full of zeros. A collection may move the
+   objects, the values the caller needs must be in a Frame */
+void *allocate(size_t size)
+{
+    void *memory;
+
+    size = ROUND(size);
+    stats.allocated += size;
+    if (size > large_size) {
+        /* A big object goes to the old generation, it may point to the
+           nursery */
+        if ((size_t)(old_end - old_top) < size)
+            collect(size);
+        memory = old_top;
+        old_top += size;
+        memset(memory, 0, size);
+        record((Value)memory);
+        return memory;
+    }
+    if (nursery_top + size > nursery_end)
+        collect(0);
+    memory = nursery_top;
+    nursery_top += size;
+    return memory;
+}
+
+static void heap_init(void)
+{
+    const char *size = getenv("COOL_NURSERY_SIZE");
+
+    if (size != NULL && atol(size) > 0)
+        nursery_size = ROUND((size_t)atol(size));
+    large_size = nursery_size / 8;
+    nursery = nursery_top = calloc(1, nursery_size);
+    if (nursery == NULL)
+        runtime_error(0, "Out of memory");
+    nursery_end = nursery + nursery_size;
+    old = old_top = reserve(4 * nursery_size);
+    old_end = old + 4 * nursery_size;
+}
+
+/* Writes the statistics of the heap to the file COOL_GC_STATS, if set */
+static void write_stats(void)
+{
+    const char *path = getenv("COOL_GC_STATS");
+    FILE *file;
+
+    if (path == NULL || (file = fopen(path, "w")) == NULL)
+        return;
+    fprintf(file, "allocated %llu\nminor %lu\nmajor %lu\npromoted %llu\n"
+            "pause %.9f\nmax_pause %.9f\nheap %lu\n",
+            stats.allocated, stats.minor, stats.major, stats.promoted,
+            stats.pause, stats.max_pause,
+            (unsigned long)((old_end - old) + nursery_size));
+    fclose(file);
+}
+
+void runtime_error(int line, const char *message)
+{
+    fflush(stdout);
+    if (line)
+        fprintf(stderr, "line %d: %s\n", line, message);
+    else
+        fprintf(stderr, "%s\n", message);
+    exit(1);
+}
+
+void no_branch(Value value, int line)
+{
+    const String *name = STRING(CLASS_OF(value)->name);
+    char message[256];
+
+    snprintf(message, sizeof(message), "No branch of case for class %.*s",
+             (int)name->length, name->chars);
+    runtime_error(line, message);
+}
+
+Value divide(Value a, Value b, int line)
+{
+    int32_t x = INT(a), y = INT(b);
+
+    if (y == 0)
+        runtime_error(line, "Division by zero");
+    /* Rounds towards zero, the overflow wraps around */
+    if (y == -1)
+        return NEG(a);
+    return MAKE_INT(x / y);
+}
+
+int equal(Value a, Value b)
+{
+    /* Ints and Bools are the same value when they are equal, Strings
+       are equal by value, other objects by identity */
+    if (a == b)
+        return 1;
+    if (IS_INT(a) || IS_INT(b) || a == 0 || b == 0)
+        return 0;
+    if (CLASS_OF(a) != &class_String || CLASS_OF(b) != &class_String)
+        return 0;
+    return STRING(a)->length == STRING(b)->length &&
+        memcmp(STRING(a)->chars, STRING(b)->chars, STRING(a)->length) == 0;
+}
+
+/* A String of length chars, to fill */
+static String *new_string(int32_t length)
+{
+    String *string = allocate(sizeof(String) + length + 1);
+
+    string->klass = &class_String;
+    string->length = length;
+    string->chars = (char *)(string + 1);
+    return string;
+}
+
+/* Methods of the basic classes */
+
+Value Object_abort(Value self)
+{
+    const String *name = STRING(CLASS_OF(self)->name);
+
+    printf("Abort called from class %.*s\n", (int)name->length, name->chars);
+    runtime_error(0, "abort");
+    return 0;
+}
+
+Value Object_type_name(Value self)
+{
+    return CLASS_OF(self)->name;
+}
+
+Value Object_copy(Value self)
+{
+    const Class *klass = CLASS_OF(self);
+    Value roots[1] = {self};
+    Object *copy;
+
+    /* Values of the basic classes do not change, they are not copied */
+    if (IS_INT(self) || klass == &class_Bool || klass == &class_String)
+        return self;
+    {
+        ENTER(roots, 1);
+        copy = allocate(klass->size);
+        LEAVE();
+    }
+    memcpy(copy, (void *)roots[0], klass->size);
+    return (Value)copy;
+}
+
+Value IO_out_string(Value self, Value arg)
+{
+    fwrite(STRING(arg)->chars, 1, STRING(arg)->length, stdout);
+    return self;
+}
+
+Value IO_out_int(Value self, Value arg)
+{
+    printf("%d", (int)INT(arg));
+    return self;
+}
+
+/* A line of the input, without the end of line; NULL at the end */
+static char *read_line(size_t *length)
+{
+    static char *line;
+    static size_t size;
+    ssize_t read = getline(&line, &size, stdin);
+
+    if (read < 0)
+        return NULL;
+    if (read > 0 && line[read - 1] == '\n')
+        line[--read] = '\0';
+    *length = read;
+    return line;
+}
+
+Value IO_in_string(Value self)
+{
+    size_t length;
+    char *line = read_line(&length);
+    String *string;
+
+    if (line == NULL)
+        return (Value)&empty_string;
+    string = new_string(length);
+    memcpy((char *)string->chars, line, length);
+    return (Value)string;
+}
+
+Value IO_in_int(Value self)
+{
+    size_t length;
+    char *line = read_line(&length), *end;
+    long value;
+
+    if (line == NULL)
+        return MAKE_INT(0);
+    value = strtol(line, &end, 10);
+    while (*end == ' ' || *end == '\t' || *end == '\r')
+        end++;
+    if (end == line || *end != '\0')
+        return MAKE_INT(0);
+    return MAKE_INT(value);
+}
+
+Value String_length(Value self)
+{
+    return MAKE_INT(STRING(self)->length);
+}
+
+Value String_concat(Value self, Value arg)
+{
+    Value roots[2] = {self, arg};
+    const String *first, *second;
+    String *string;
+
+    {
+        ENTER(roots, 2);
+        string = new_string(STRING(self)->length + STRING(arg)->length);
+        LEAVE();
+    }
+    first = STRING(roots[0]);
+    second = STRING(roots[1]);
+    memcpy((char *)string->chars, first->chars, first->length);
+    memcpy((char *)string->chars + first->length, second->chars,
+           second->length);
+    return (Value)string;
+}
+
+Value String_substr(Value self, Value start, Value count)
+{
+    int32_t i = INT(start), n = INT(count);
+    Value roots[1] = {self};
+    String *string;
+
+    if (i < 0 || n < 0 || (int64_t)i + n > STRING(self)->length)
+        runtime_error(0, "Index out of range in substr");
+    {
+        ENTER(roots, 1);
+        string = new_string(n);
+        LEAVE();
+    }
+    memcpy((char *)string->chars, STRING(roots[0])->chars + i, n);
+    return (Value)string;
+}
+
+Value new_Object(void)
+{
+    Object *object = allocate(sizeof(Object));
+
+    object->klass = &class_Object;
+    return (Value)object;
+}
+
+Value new_IO(void)
+{
+    Object *object = allocate(sizeof(Object));
+
+    object->klass = &class_IO;
+    return (Value)object;
+}
+
+Value new_Int(void)
+{
+    return MAKE_INT(0);
+}
+
+Value new_Bool(void)
+{
+    return FALSE;
+}
+
+Value new_String(void)
+{
+    return (Value)&empty_string;
+}
+
+/* Running the program */
+
+static void stack_overflow(int signal)
+{
+    fflush(stdout);
+    write(2, "Stack overflow\n", 15);
+    _exit(1);
+}
+
+static void *start(void *entry)
+{
+    /* The handler of SIGSEGV needs a stack of its own, the stack of the
+       thread is full when it runs */
+    static char handler_stack[64 * 1024];
+    stack_t alternate;
+    struct sigaction action;
+
+    alternate.ss_sp = handler_stack;
+    alternate.ss_size = sizeof(handler_stack);
+    alternate.ss_flags = 0;
+    sigaltstack(&alternate, NULL);
+    memset(&action, 0, sizeof(action));
+    action.sa_handler = stack_overflow;
+    action.sa_flags = SA_ONSTACK;
+    sigaction(SIGSEGV, &action, NULL);
+
+    ((Value (*)(void))entry)();
+    return NULL;
+}
+
+int run(Value (*entry)(void))
+{
+    pthread_t thread;
+    pthread_attr_t attributes;
+
+    heap_init();
+    pthread_attr_init(&attributes);
+    pthread_attr_setstacksize(&attributes, STACK_SIZE);
+    if (pthread_create(&thread, &attributes, start, (void *)entry) != 0)
+        runtime_error(0, "Can not create the thread of the program");
+    pthread_join(thread, NULL);
+    fflush(stdout);
+    write_stats();
+    return 0;
+}
@@ -0,0 +1,109 @@
+/*
+ * Runtime of the programs compiled to C (see native.py).
+ *
+ * A value is an Int, kept in the value itself as (n << 1) | 1, or a
+ * pointer to an object (0 is void). Every object begins with its class.
+ * Bool has two objects, true_object and false_object.
+ *
+ * The objects live in a heap with a garbage collector, that moves them.
+ * Each function keeps its values in an array, a Frame, that the
+ * collector finds in the list frames: it updates them when it moves an
+ * object. A store in an attribute goes through WRITE_BARRIER.
+ */
+#define _XOPEN_SOURCE 700
+
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+typedef intptr_t Value;
+typedef Value (*Method)(void);
+
+typedef struct Class {
+    Value name;
+    /* The classes get a tag in preorder, so the descendants of a class
+       have the tags from tag to last */
+    int tag, last;
+    size_t size;
+    Value (*create)(void);
+    const Method *vtable;
+} Class;
+
+typedef struct Object {
+    const Class *klass;
+} Object;
+
+typedef struct String {
+    const Class *klass;
+    int32_t length;
+    /* The chars of a String of the heap follow the String */
+    const char *chars;
+} String;
+
+typedef struct Frame {
+    struct Frame *previous;
+    int size;
+    Value *values;
+} Frame;
+
+extern const Class class_Object, class_IO, class_Int, class_Bool, class_String;
+extern Object true_object, false_object;
+
+#define IS_INT(v) ((v) & 1)
+/* The shifts are unsigned: shifting a negative value to the left is
+   undefined in C */
+#define INT(v) ((int32_t)(uint32_t)((uintptr_t)(v) >> 1))
+#define MAKE_INT(n) \
+    ((Value)(((uintptr_t)(Value)(int32_t)(n) << 1) | 1))
+#define TRUE ((Value)&true_object)
+#define FALSE ((Value)&false_object)
+#define BOOL(c) ((c) ? TRUE : FALSE)
+#define STRING(v) ((String *)(v))
+#define CLASS_OF(v) (IS_INT(v) ? &class_Int : ((Object *)(v))->klass)
+
+/* Wraps around on overflow, like a 32 bits integer */
+#define ADD(a, b) MAKE_INT((uint32_t)INT(a) + (uint32_t)INT(b))
+#define SUB(a, b) MAKE_INT((uint32_t)INT(a) - (uint32_t)INT(b))
+#define MUL(a, b) MAKE_INT((uint32_t)INT(a) * (uint32_t)INT(b))
+#define NEG(a) MAKE_INT(-(uint32_t)INT(a))
+
+extern Frame *frames;
+extern char *nursery, *nursery_end;
+
+/* The n values of the array values are roots, until LEAVE */
+#define ENTER(values, n) Frame frame = {frames, (n), (values)}; frames = &frame
+#define LEAVE() (frames = frame.previous)
+
+#define IS_YOUNG(v) \
+    (!IS_INT(v) && (char *)(v) >= nursery && (char *)(v) < nursery_end)
+/* The collector has to know the objects of the old generation that
+   point to the nursery */
+#define WRITE_BARRIER(object, value) \
+    ((IS_YOUNG(value) && !IS_YOUNG(object)) ? remember(object) : (void)0)
+
+void *allocate(size_t size);
+void remember(Value object);
+Value divide(Value a, Value b, int line);
+int equal(Value a, Value b);
+void runtime_error(int line, const char *message);
+void no_branch(Value value, int line);
+
+Value Object_abort(Value self);
+Value Object_type_name(Value self);
+Value Object_copy(Value self);
+Value IO_out_string(Value self, Value arg);
+Value IO_out_int(Value self, Value arg);
+Value IO_in_string(Value self);
+Value IO_in_int(Value self);
+Value String_length(Value self);
+Value String_concat(Value self, Value arg);
+Value String_substr(Value self, Value start, Value count);
+
+Value new_Object(void);
+Value new_IO(void);
+Value new_Int(void);
+Value new_Bool(void);
+Value new_String(void);
+
+int run(Value (*entry)(void));
@@ -0,0 +1,3 @@
+from .hierarchy import devirtualize, ClassHierarchy, Devirtualization
+from .manager import optimize, PassManager, PassStats, LEVELS
+from .passes import ConstantFolding, CopyPropagation, DeadCode, Inlining
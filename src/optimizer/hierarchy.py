@@ -0,0 +1,237 @@
+"""
+    Class hierarchy analysis: finds the dispatches that have one possible
+    target in the whole program, so a backend can call the method
+    directly, without its vtable.
+
+    The receiver of a dispatch has a static type, from the declarations
+    of the program (a formal, a let, an attribute, the return type of a
+    method, ...), and its class at runtime is that class or one of its
+    subclasses. When all of them get the method from the same class, the
+    dispatch is monomorphic. The analysis trusts the declared types, as
+    the checker does.
+"""
+from collections import namedtuple
+
+from ..syntactic.ast import *
+
+BASIC_TYPES = {Int: 'Int', Bool: 'Bool', Str: 'String'}
+
+# targets maps the id of a Dispatch node to (class, method name): the
+# class where the method called is defined. sites is the number of
+# dispatches of the program.
+Devirtualization = namedtuple("Devirtualization", "targets, sites")
+
+
+class ClassHierarchy(object):
+    """ The classes of a program analyzed by Semant, and their methods. """
+
+    def __init__(self, semant):
+        self.semant = semant
+        # Class name -> the class and its subclasses
+        self.__subclasses = {}
+        # id of a Method -> the class that defines it
+        self.owners = {}
+        for name, _class in semant.classes.items():
+            for feature in _class.feature_list:
+                if isinstance(feature, Method):
+                    self.owners[id(feature)] = name
+
+    def subclasses(self, name):
+        if name not in self.__subclasses:
+            found = [name]
+            for child in sorted(self.semant.parents.get(name, ())):
+                found.extend(self.subclasses(child))
+            self.__subclasses[name] = found
+        return self.__subclasses[name]
+
+    def ancestors(self, name):
+        """ name and its ancestors, up to Object. """
+        chain = []
+        while name is not None and name in self.semant.classes and \
+                name not in chain:
+            chain.append(name)
+            parent = self.semant.classes[name].parent
+            name = parent if name != 'Object' else None
+        return chain
+
+    def join(self, first, second):
+        """ The closest common ancestor of two classes (None if unknown). """
+        if first is None or second is None:
+            return None
+        ancestors = self.ancestors(second)
+        for name in self.ancestors(first):
+            if name in ancestors:
+                return name
+        return None
+
+    def method(self, klass, name):
+        """ The Method name of klass, or None. """
+        return self.semant.methods.get(klass, {}).get(name)
+
+    def targets(self, klass, name):
+        """ The classes that define the method name called on a klass. """
+        found = set()
+        for subclass in self.subclasses(klass):
+            method = self.method(subclass, name)
+            if method is not None:
+                found.add(self.owners[id(method)])
+        return found
+
+
+class CallSites(NodeVisitor):
+    """
+        Finds the static type of the expressions of each method, and the
+        targets of its dispatches. visit returns the static type of an
+        expression, a class name, or None when it is not known.
+    """
+
+    def __init__(self, hierarchy):
+        super(CallSites, self).__init__()
+        self.hierarchy = hierarchy
+        self.semant = hierarchy.semant
+        self.targets = {}
+        self.sites = 0
+
+    def analyze(self):
+        for name in sorted(self.semant.classes):
+            self.klass = name
+            for feature in self.semant.classes[name].feature_list:
+                if feature.body is None:
+                    continue
+                self.scopes = [{}]
+                if isinstance(feature, Method):
+                    for formal in feature.formal_list:
+                        self.scopes[0][formal.name] = formal.type
+                self.visit(feature.body)
+        return Devirtualization(self.targets, self.sites)
+
+    def known(self, _type):
+        """ _type as a class of the program, or None. """
+        if _type == 'SELF_TYPE':
+            return self.klass
+        if _type in self.semant.classes:
+            return _type
+        return None
+
+    def lookup(self, name):
+        if name == 'self':
+            return self.klass
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return self.known(scope[name])
+        attribute = self.semant.attributes.get(self.klass, {}).get(name)
+        if attribute is not None:
+            return self.known(attribute.type)
+        return None
+
+    def returns(self, method, receiver):
+        if method.return_type == 'SELF_TYPE':
+            return receiver
+        return self.known(method.return_type)
+
+    def generic_visit(self, node):
+        for value in node:
+            if isinstance(value, Node):
+                self.visit(value)
+            elif isinstance(value, list):
+                for item in value:
+                    if isinstance(item, Node):
+                        self.visit(item)
+        return None
+
+    def visit_Int(self, node):
+        return BASIC_TYPES[type(node)]
+
+    visit_Bool = visit_Str = visit_Int
+
+    def visit_Object(self, node):
+        return self.lookup(node.name)
+
+    def visit_Assign(self, node):
+        return self.visit(node.body)
+
+    def visit_Block(self, node):
+        _type = None
+        for expression in node.body:
+            _type = self.visit(expression)
+        return _type
+
+    def visit_New(self, node):
+        return self.known(node.type)
+
+    def visit_Plus(self, node):
+        self.generic_visit(node)
+        return 'Int'
+
+    visit_Sub = visit_Mult = visit_Div = visit_Neg = visit_Plus
+
+    def visit_Lt(self, node):
+        self.generic_visit(node)
+        return 'Bool'
+
+    visit_Le = visit_Eq = visit_Not = visit_Isvoid = visit_Lt
+
+    def visit_While(self, node):
+        self.generic_visit(node)
+        return 'Object'
+
+    def visit_If(self, node):
+        self.visit(node.predicate)
+        return self.hierarchy.join(
+            self.visit(node.then_body), self.visit(node.else_body)
+        )
+
+    def visit_Let(self, node):
+        if node.init is not None:
+            self.visit(node.init)
+        self.scopes.append({node.object: node.type})
+        _type = self.visit(node.body)
+        self.scopes.pop()
+        return _type
+
+    def visit_Case(self, node):
+        self.visit(node.expr)
+        _type = None
+        for i, branch in enumerate(node.case_list):
+            self.scopes.append({branch.name: branch.type})
+            branch_type = self.visit(branch.body)
+            self.scopes.pop()
+            _type = branch_type if i == 0 else self.hierarchy.join(
+                _type, branch_type
+            )
+        return _type
+
+    def visit_Dispatch(self, node):
+        for argument in node.expr_list:
+            self.visit(argument)
+        if node.body == 'self':
+            receiver = self.klass
+        else:
+            receiver = self.visit(node.body)
+
+        self.sites += 1
+        klass = receiver or 'Object'
+        targets = self.hierarchy.targets(klass, node.method)
+        if len(targets) == 1:
+            owner = targets.pop()
+            self.targets[id(node)] = (owner, node.method)
+            return self.returns(self.hierarchy.method(owner, node.method), receiver)
+
+        method = self.hierarchy.method(klass, node.method)
+        if receiver is None or method is None:
+            return None
+        return self.returns(method, receiver)
+
+    def visit_StaticDispatch(self, node):
+        for argument in node.expr_list:
+            self.visit(argument)
+        receiver = self.visit(node.body)
+        method = self.hierarchy.method(node.type, node.method)
+        if method is None:
+            return None
+        return self.returns(method, receiver)
+
+
+def devirtualize(semant):
+    """ The Devirtualization of the program analyzed by semant. """
+    return CallSites(ClassHierarchy(semant)).analyze()
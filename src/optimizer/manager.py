@@ -0,0 +1,88 @@
+"""
+    Runs the optimization passes of a level, and measures them.
+"""
+import time
+from collections import namedtuple
+
+from ..syntactic.ast import walk
+
+from passes import ConstantFolding, CopyPropagation, DeadCode, Inlining
+
+# The passes of each level, run in order, again and again while they
+# change the program (at most ROUNDS times)
+LEVELS = {
+    0: (),
+    1: (ConstantFolding, CopyPropagation, DeadCode),
+    2: (Inlining, ConstantFolding, CopyPropagation, DeadCode),
+}
+ROUNDS = 4
+
+# A pass, how many times it ran, its changes, and its time in seconds
+PassStats = namedtuple("PassStats", "name, runs, changes, time")
+
+
+def program_size(semant):
+    """ Number of nodes in the methods and attributes of the program. """
+    return sum(
+        1
+        for _class in semant.classes.values()
+        for feature in _class.feature_list
+        if feature.body is not None
+        for _ in walk(feature.body)
+    )
+
+
+class PassManager(object):
+    """
+        Runs passes (classes of passes) over a program analyzed by Semant.
+        stats has a PassStats for each pass, after run.
+    """
+
+    def __init__(self, passes, rounds=ROUNDS):
+        self.passes = [cls() for cls in passes]
+        self.rounds = rounds
+        self.stats = []
+        self.size_before = self.size_after = None
+
+    def run(self, semant):
+        """ Optimizes semant in place, returns the stats. """
+        runs = [0] * len(self.passes)
+        changes = [0] * len(self.passes)
+        times = [0.0] * len(self.passes)
+
+        self.size_before = program_size(semant)
+        for _ in range(self.rounds):
+            changed = False
+            for i, optimization in enumerate(self.passes):
+                start = time.time()
+                count = optimization.run(semant)
+                times[i] += time.time() - start
+                runs[i] += 1
+                changes[i] += count
+                changed = changed or count > 0
+            if not changed:
+                break
+        self.size_after = program_size(semant)
+
+        self.stats = [
+            PassStats(optimization.name, runs[i], changes[i], times[i])
+            for i, optimization in enumerate(self.passes)
+        ]
+        return self.stats
+
+    def report(self):
+        """ The stats, as lines of text. """
+        lines = ['%-24s %6s %8s %10s' % ('pass', 'runs', 'changes', 'time (ms)')]
+        for stats in self.stats:
+            lines.append('%-24s %6d %8d %10.2f' % (
+                stats.name, stats.runs, stats.changes, stats.time * 1000
+            ))
+        lines.append('nodes: %d -> %d' % (self.size_before, self.size_after))
+        return lines
+
+
+def optimize(semant, level=1):
+    """ Optimizes semant at level (0, 1 or 2), returns the PassManager. """
+    manager = PassManager(LEVELS[level])
+    manager.run(semant)
+    return manager
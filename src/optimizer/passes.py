@@ -0,0 +1,371 @@
+"""
+    Optimization passes over the checked abstract syntax tree.
+
+    A pass changes the tree of each method and attribute in place, and
+    counts its changes. The tree keeps the meaning it had: the same
+    output and the same runtime errors, in every backend.
+"""
+import copy
+
+from ..codegen.runtime import wrap
+from ..syntactic.ast import *
+
+LITERALS = (Int, Bool, Str)
+
+# Methods with at most INLINE_SIZE nodes are inlined
+INLINE_SIZE = 24
+
+
+def located(node, like):
+    """ node, at the position of like. """
+    node.line, node.column = like.line, like.column
+    return node
+
+
+def is_pure(node):
+    """ The evaluation of node has no effect, and can not fail. """
+    return isinstance(node, LITERALS + (Object,))
+
+
+def names(tree):
+    """ The variable names read, assigned or declared in tree. """
+    found = set()
+    for node in walk(tree):
+        if isinstance(node, Object):
+            found.add(node.name)
+        elif isinstance(node, Let):
+            found.add(node.object)
+        elif isinstance(node, CaseBranch):
+            found.add(node.name)
+    return found
+
+
+def size(tree):
+    """ Number of nodes of tree. """
+    return sum(1 for _ in walk(tree))
+
+
+class Transformer(NodeVisitor):
+    """
+        Base of the passes. visit returns the node that takes the place
+        of the one visited, generic_visit visits the children.
+
+        locals has the names of the variables in scope: the formals and
+        the let and case variables around the node visited.
+    """
+    name = None
+
+    def __init__(self):
+        super(Transformer, self).__init__()
+        self.changes = 0
+
+    def run(self, semant):
+        """ Runs the pass on every class, returns the number of changes. """
+        self.semant = semant
+        self.changes = 0
+        for class_name in sorted(semant.classes):
+            self.klass = class_name
+            for feature in semant.classes[class_name].feature_list:
+                if feature.body is None:
+                    continue
+                self.feature = feature
+                if isinstance(feature, Method):
+                    self.locals = [formal.name for formal in feature.formal_list]
+                else:
+                    self.locals = []
+                feature.body = self.visit(feature.body)
+        return self.changes
+
+    def generic_visit(self, node):
+        for field in node._fields:
+            value = getattr(node, field)
+            if isinstance(value, Node):
+                setattr(node, field, self.visit(value))
+            elif isinstance(value, list):
+                value[:] = [
+                    self.visit(item) if isinstance(item, Node) else item
+                    for item in value
+                ]
+        return node
+
+    def visit_Let(self, node):
+        if node.init is not None:
+            node.init = self.visit(node.init)
+        self.locals.append(node.object)
+        node.body = self.visit(node.body)
+        self.locals.pop()
+        return node
+
+    def visit_CaseBranch(self, node):
+        self.locals.append(node.name)
+        node.body = self.visit(node.body)
+        self.locals.pop()
+        return node
+
+    def visit_Assign(self, node):
+        # The name is not an expression
+        node.body = self.visit(node.body)
+        return node
+
+
+def divide(a, b):
+    # Rounds towards zero
+    quotient = abs(a) // abs(b)
+    if (a < 0) != (b < 0):
+        quotient = -quotient
+    return wrap(quotient)
+
+
+class ConstantFolding(Transformer):
+    """ Computes the operations on literals. """
+    name = 'constant folding'
+
+    ARITHMETIC = {
+        Plus: lambda a, b: wrap(a + b),
+        Sub: lambda a, b: wrap(a - b),
+        Mult: lambda a, b: wrap(a * b),
+    }
+    COMPARISONS = {
+        Lt: lambda a, b: a < b,
+        Le: lambda a, b: a <= b,
+    }
+
+    def fold(self, node, like):
+        self.changes += 1
+        return located(node, like)
+
+    def visit_Plus(self, node):
+        node = self.generic_visit(node)
+        first, second = node.first, node.second
+        if type(first) is not Int or type(second) is not Int:
+            return node
+        a, b = wrap(first.content), wrap(second.content)
+
+        if type(node) in self.ARITHMETIC:
+            return self.fold(Int(self.ARITHMETIC[type(node)](a, b)), node)
+        if type(node) in self.COMPARISONS:
+            return self.fold(Bool(self.COMPARISONS[type(node)](a, b)), node)
+        if b == 0:
+            # Division by zero, at runtime
+            return node
+        return self.fold(Int(divide(a, b)), node)
+
+    visit_Sub = visit_Mult = visit_Div = visit_Lt = visit_Le = visit_Plus
+
+    def visit_Eq(self, node):
+        node = self.generic_visit(node)
+        first, second = node.first, node.second
+        if type(first) is type(second) and isinstance(first, LITERALS):
+            if type(first) is Int:
+                equal = wrap(first.content) == wrap(second.content)
+            else:
+                equal = first.content == second.content
+            return self.fold(Bool(equal), node)
+        return node
+
+    def visit_Neg(self, node):
+        node = self.generic_visit(node)
+        if type(node.body) is Int:
+            return self.fold(Int(wrap(-wrap(node.body.content))), node)
+        return node
+
+    def visit_Not(self, node):
+        node = self.generic_visit(node)
+        if type(node.body) is Bool:
+            return self.fold(Bool(not node.body.content), node)
+        return node
+
+    def visit_Isvoid(self, node):
+        node = self.generic_visit(node)
+        if isinstance(node.body, LITERALS):
+            return self.fold(Bool(False), node)
+        return node
+
+
+class DeadCode(Transformer):
+    """
+        Removes the branches of an If, and the body of a While, that never
+        run, the expressions of a Block with no effect whose value is not
+        used, and the variables that are never used.
+    """
+    name = 'dead code elimination'
+
+    def visit_If(self, node):
+        node = self.generic_visit(node)
+        if type(node.predicate) is Bool:
+            self.changes += 1
+            if node.predicate.content:
+                return node.then_body
+            return node.else_body
+        return node
+
+    def visit_While(self, node):
+        node = self.generic_visit(node)
+        if type(node.predicate) is Bool and not node.predicate.content:
+            if node.body is not node.predicate:
+                # The loop is still void
+                self.changes += 1
+                node.body = node.predicate
+        return node
+
+    def visit_Block(self, node):
+        node = self.generic_visit(node)
+        body = [
+            expression for expression in node.body[:-1]
+            if not is_pure(expression)
+        ] + node.body[-1:]
+        if len(body) != len(node.body):
+            self.changes += 1
+            node.body = body
+        if len(body) == 1:
+            return body[0]
+        return node
+
+    def visit_Let(self, node):
+        node = super(DeadCode, self).visit_Let(node)
+        if node.init is not None and not is_pure(node.init):
+            return node
+        if node.object in names(node.body):
+            return node
+        self.changes += 1
+        return node.body
+
+
+class CopyPropagation(Transformer):
+    """
+        Replaces a let variable, that is never assigned, by its value when
+        it is a literal or another variable. The unused variable is then
+        removed by DeadCode.
+    """
+    name = 'copy propagation'
+
+    DEFAULTS = {'Int': 0, 'Bool': False, 'String': ''}
+
+    def visit_Let(self, node):
+        node = super(CopyPropagation, self).visit_Let(node)
+        value = node.init
+        if value is None:
+            if node.type not in self.DEFAULTS:
+                return node
+            value = located({
+                'Int': Int, 'Bool': Bool, 'String': Str
+            }[node.type](self.DEFAULTS[node.type]), node)
+        elif isinstance(value, Object):
+            # An attribute can change in any call
+            if value.name != 'self' and value.name not in self.locals:
+                return node
+        elif not isinstance(value, LITERALS):
+            return node
+
+        variables = set([node.object])
+        if isinstance(value, Object):
+            variables.add(value.name)
+        if not self.__replaceable(node.body, node.object, variables):
+            return node
+
+        uses = [0]
+
+        def replace(tree):
+            if isinstance(tree, Object) and tree.name == node.object:
+                uses[0] += 1
+                return located(copy.copy(value), tree)
+            if isinstance(tree, Node):
+                for field in tree._fields:
+                    child = getattr(tree, field)
+                    if isinstance(tree, Assign) and field == 'name':
+                        continue
+                    if isinstance(child, Node):
+                        setattr(tree, field, replace(child))
+                    elif isinstance(child, list):
+                        child[:] = [replace(item) for item in child]
+            return tree
+
+        node.body = replace(node.body)
+        if uses[0]:
+            self.changes += 1
+        return node
+
+    def __replaceable(self, body, name, variables):
+        """
+            name can be replaced in body: no variable of variables is
+            assigned or declared again in it.
+        """
+        for tree in walk(body):
+            if isinstance(tree, Assign) and tree.name.name in variables:
+                return False
+            if isinstance(tree, Let) and tree.object in variables:
+                return False
+            if isinstance(tree, CaseBranch) and tree.name in variables:
+                return False
+        return True
+
+
+class Inlining(Transformer):
+    """
+        Replaces a dispatch to self by the body of the method, when the
+        method is small, calls no other method, and no subclass of the
+        class overrides it: the call has one target.
+
+        The arguments become let variables, evaluated in order, like the
+        arguments of the call.
+    """
+    name = 'inlining'
+
+    def run(self, semant):
+        self.__overridden = {}
+        return super(Inlining, self).run(semant)
+
+    def visit_Dispatch(self, node):
+        node = self.generic_visit(node)
+        if not (node.body == 'self' or (
+                isinstance(node.body, Object) and node.body.name == 'self')):
+            return node
+
+        method = self.semant.methods[self.klass].get(node.method)
+        if not self.__inlinable(method, node):
+            return node
+
+        body = copy.deepcopy(method.body)
+        for formal, argument in reversed(zip(method.formal_list, node.expr_list)):
+            body = located(Let(formal.name, formal.type, argument, body), node)
+        self.changes += 1
+        return body
+
+    def __inlinable(self, method, node):
+        if method is None or method.body is None or method is self.feature:
+            return False
+        if len(method.formal_list) != len(node.expr_list):
+            return False
+        if size(method.body) > INLINE_SIZE:
+            return False
+        for tree in walk(method.body):
+            if isinstance(tree, (Dispatch, StaticDispatch)):
+                return False
+        if self.__is_overridden(self.klass, method.name):
+            return False
+
+        # The names of the method must mean the same at the call: no
+        # variable of the caller hides an attribute, and no argument uses
+        # a name that a formal hides
+        formals = set(formal.name for formal in method.formal_list)
+        if (names(method.body) - formals) & set(self.locals):
+            return False
+        for argument in node.expr_list:
+            if names(argument) & formals:
+                return False
+        return True
+
+    def __is_overridden(self, class_name, method_name):
+        """ A subclass of class_name defines method_name. """
+        key = (class_name, method_name)
+        if key not in self.__overridden:
+            overridden = False
+            for child in self.semant.parents.get(class_name, ()):
+                features = self.semant.classes[child].feature_list
+                if any(isinstance(feature, Method) and feature.name == method_name
+                       for feature in features):
+                    overridden = True
+                elif self.__is_overridden(child, method_name):
+                    overridden = True
+            self.__overridden[key] = overridden
+        return self.__overridden[key]
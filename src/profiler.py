@@ -0,0 +1,196 @@
+"""
+    Measures the phases of a compilation: wall time, peak memory and
+    counts (tokens, nodes, classes, ...) of each phase.
+
+    Phases nest: the steps of Semant.build are inside the semantic
+    phase. The memory of a phase is measured with the first of (see
+    MEMORY):
+
+    - tracemalloc (Python 3): how much the peak of the memory allocated
+      grew during the phase.
+    - rss (Linux): how much the resident size grew during the phase. It
+      is approximate: the memory that an earlier phase freed is reused
+      without growing it, and the peak inside the phase is not seen.
+    - maxrss: how much the peak resident size of the process grew. It
+      is approximate too, and 0 for every phase that stays under the
+      peak of an earlier one.
+
+    With a cprofile_dir, each top level phase is profiled by cProfile
+    too, and its stats are written to <cprofile_dir>/<phase>.prof, for
+    pstats.
+"""
+import cProfile
+import json
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+
+from .syntactic.ast import walk, Dispatch, StaticDispatch
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+STATM = '/proc/self/statm'
+
+if tracemalloc is not None:
+    MEMORY = 'tracemalloc'
+elif os.path.exists(STATM):
+    MEMORY = 'rss'
+elif resource is not None:
+    MEMORY = 'maxrss'
+else:
+    MEMORY = None
+
+# Label of the memory column, and what it measures
+MEMORY_LABELS = {
+    'tracemalloc': (
+        'memory (KB)', 'growth of the peak allocated (tracemalloc)'
+    ),
+    'rss': (
+        'rss growth (KB)', 'growth of the resident size (approximate)'
+    ),
+    'maxrss': (
+        'maxrss growth (KB)',
+        'growth of the peak resident size of the process (approximate)'
+    ),
+    None: ('memory (KB)', 'not measured'),
+}
+
+
+def program_counts(ast):
+    """ The number of classes, nodes and dispatch sites of ast. """
+    nodes = sites = 0
+    for _class in ast:
+        for node in walk(_class):
+            nodes += 1
+            if isinstance(node, (Dispatch, StaticDispatch)):
+                sites += 1
+    return {'classes': len(ast), 'nodes': nodes, 'dispatch sites': sites}
+
+
+def memory():
+    """ The memory used so far, in bytes, as MEMORY measures it. """
+    if MEMORY == 'tracemalloc':
+        if not tracemalloc.is_tracing():
+            return None
+        return tracemalloc.get_traced_memory()[1]
+    if MEMORY == 'rss':
+        try:
+            with open(STATM) as statm:
+                pages = int(statm.read().split()[1])
+        except (IOError, ValueError, IndexError):
+            return None
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    if MEMORY is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Phase(object):
+    """ A phase measured: its time in seconds, memory in bytes, counts. """
+
+    def __init__(self, name, depth):
+        self.name = name
+        self.depth = depth
+        self.time = 0.0
+        self.memory = None
+        self.counts = {}
+
+    def as_dict(self):
+        return {
+            'name': self.name, 'depth': self.depth, 'time': self.time,
+            'memory': self.memory, 'counts': self.counts,
+        }
+
+
+class Profiler(object):
+    """ See the module. phases has a Phase for each phase, in order. """
+
+    def __init__(self, cprofile_dir=None):
+        self.cprofile_dir = cprofile_dir
+        self.phases = []
+        self.depth = 0
+        if tracemalloc is not None and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def phase(self, name):
+        """ Measures the block, yields its Phase, to add counts. """
+        record = Phase(name, self.depth)
+        self.phases.append(record)
+
+        profile = None
+        if self.cprofile_dir is not None and self.depth == 0:
+            profile = cProfile.Profile()
+        before = memory()
+
+        self.depth += 1
+        start = time.time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield record
+        finally:
+            if profile is not None:
+                profile.disable()
+            record.time = time.time() - start
+            self.depth -= 1
+            after = memory()
+            if before is not None and after is not None:
+                record.memory = max(0, after - before)
+            if profile is not None:
+                self.__dump(profile, record)
+
+    def __dump(self, profile, record):
+        if not os.path.isdir(self.cprofile_dir):
+            os.makedirs(self.cprofile_dir)
+        name = re.sub(r'[^\w.-]+', '_', record.name)
+        profile.dump_stats(os.path.join(self.cprofile_dir, name + '.prof'))
+
+    def report(self):
+        """ The phases, as lines of text. """
+        label, description = MEMORY_LABELS[MEMORY]
+        lines = ['%-30s %10s %18s  %s' % ('phase', 'time (ms)', label, 'counts')]
+        for record in self.phases:
+            memory = '-' if record.memory is None else '%.1f' % (
+                record.memory / 1024.0
+            )
+            counts = ', '.join(
+                '%s: %d' % (name, value)
+                for name, value in sorted(record.counts.items())
+            )
+            lines.append(('%-30s %10.2f %18s  %s' % (
+                '  ' * record.depth + record.name, record.time * 1000, memory,
+                counts
+            )).rstrip())
+        lines.append('memory: %s' % description)
+        return lines
+
+    def as_json(self):
+        return json.dumps({
+            'memory': MEMORY,
+            'approximate': MEMORY != 'tracemalloc',
+            'phases': [record.as_dict() for record in self.phases],
+        }, indent=2, sort_keys=True)
+
+
+class NullProfiler(object):
+    """ A Profiler that measures nothing, when no profile is asked. """
+
+    @contextmanager
+    def phase(self, name):
+        yield Phase(name, 0)
+
+
+NULL_PROFILER = NullProfiler()
@@ -37,12 +37,13 @@ def get_expression_type(expression, _class, scope):
         if expression.name == "self":
             return _class.name
 
-        if not scope.exists(expression.name):
+        _type = scope.lookup(expression.name)
+        if _type is None:
             raise SemantError(
                 "Variable %s is not in scope" % expression.name
             )
 
-        return scope.get(expression.name)
+        return _type
 
     elif isinstance(expression, Int):
         return "Int"
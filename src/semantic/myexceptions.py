@@ -1,5 +1,45 @@
+from collections import namedtuple
+
+
+class Diagnostic(namedtuple("Diagnostic", "error, message, line, column")):
+    """ A semantic error, as returned by Semant.build. """
+    __slots__ = ()
+
+    def __str__(self):
+        if self.line is None:
+            return '%s: %s' % (self.error, self.message)
+        return 'line %d, column %d: %s: %s' % (
+            self.line, self.column, self.error, self.message
+        )
+
+
 class SemantError(Exception):
-    pass
+    """
+        Base of the semantic errors.
+
+        line and column are the position of the node where the error
+        was found, when it is known.
+    """
+    line = None
+    column = None
+
+    def locate(self, node):
+        """ Keeps the position of node, if the error has none yet. """
+        if self.line is None:
+            self.line = getattr(node, 'line', None)
+            self.column = getattr(node, 'column', None)
+
+    def diagnostic(self):
+        return Diagnostic(
+            type(self).__name__, super(SemantError, self).__str__(),
+            self.line, self.column
+        )
+
+    def __str__(self):
+        msg = super(SemantError, self).__str__()
+        if self.line is None:
+            return msg
+        return 'line %d, column %d: %s' % (self.line, self.column, msg)
 
 
 class UndefinedMethodError(SemantError):
@@ -33,6 +73,22 @@ class ArgumentTypeError(SemantError):
         )
 
 
+class UndefinedClassError(SemantError):
+
+    def __init__(self, method, _class):
+        msg = 'Method %s was called on an object of class %s, that is undefined or in an inheritance cycle'
+        super(UndefinedClassError, self).__init__(msg % (method, _class))
+
+
+class UnknownReceiverTypeError(SemantError):
+
+    def __init__(self, method, _class):
+        msg = 'Unknown type of the object where method %s is called in class %s'
+        super(UnknownReceiverTypeError, self).__init__(
+            msg % (method, _class.name)
+        )
+
+
 class NumberOfArgumentError(SemantError):
 
     def __init__(self, method, _class):
@@ -1,46 +1,85 @@
+# Marks a name that was not bound before an add
+_UNBOUND = object()
+
+
 class Scope():
     """
-        List of dictionaries to save name->type.
-        This class represents a stack of environments.
-        Each dictionary represents an environment.
+        Stack of environments to save name->type.
+
+        All the visible names are kept in one dictionary, so a lookup
+        is a single dictionary access. Each add saves the binding it
+        hides in an undo log, and destroy undoes the adds made since the
+        matching new, which only remembers where the log was.
     """
 
     def __init__(self):
-        self.store = [dict()]
+        self.table = {}
+        # Undo log: the name and the value it had before each add
+        self.log_keys = []
+        self.log_values = []
+        # Size of the log when each environment was created
+        self.marks = []
+
+    def lookup(self, key, default=None):
+        """ Returns the type of key, or default if key is not in scope. """
+        return self.table.get(key, default)
 
     def get(self, key):
-        for item in self.store[::-1]:
-            if key in item:
-                return item[key]
-        raise KeyError(key)
+        return self.table[key]
 
     def add(self, key, value):
-        self.store[-1][key] = value
+        self.log_keys.append(key)
+        self.log_values.append(self.table.get(key, _UNBOUND))
+        self.table[key] = value
 
     def remove(self, key):
-        del self.store[-1][key]
+        """ Removes key from the innermost environment. """
+        start = self.marks[-1] if self.marks else 0
+
+        # The first add of key in this environment saved the outer value
+        for i in range(start, len(self.log_keys)):
+            if self.log_keys[i] == key:
+                break
+        else:
+            raise KeyError(key)
+
+        self.__restore(key, self.log_values[i])
+        for j in range(len(self.log_keys) - 1, i - 1, -1):
+            if self.log_keys[j] == key:
+                del self.log_keys[j]
+                del self.log_values[j]
 
     def new(self):
-        self.store.append(dict())
+        self.marks.append(len(self.log_keys))
 
     def destroy(self):
-        del self.store[-1]
+        start = self.marks.pop() if self.marks else 0
+
+        while len(self.log_keys) > start:
+            self.__restore(self.log_keys.pop(), self.log_values.pop())
+
+    def depth(self):
+        """ Number of environments created by new and not destroyed. """
+        return len(self.marks)
 
     def exists(self, key):
-        try:
-            self.get(key)
-            return True
-        except KeyError:
-            return False
+        return key in self.table
+
+    def __restore(self, key, value):
+        if value is _UNBOUND:
+            del self.table[key]
+        else:
+            self.table[key] = value
 
 
 if __name__ == '__main__':
     scope = Scope()
     scope.add('Main', ('Int', 'Int'))
-    print(scope.store)
+    print(scope.table)
     scope.remove('Main')
-    print(scope.store)
+    print(scope.table)
     scope.new()
-    print(scope.store)
+    scope.add('Main', 'Int')
+    print(scope.table)
     scope.destroy()
-    print(scope.store)
+    print(scope.table)
@@ -1,15 +1,16 @@
 from collections import defaultdict
-from copy import deepcopy
 
+from ..profiler import NULL_PROFILER
 from ..syntactic.ast import *
 
 from myexceptions import (
-    UndefinedMethodError, ReturnedTypeError,
+    SemantError, UndefinedMethodError, ReturnedTypeError,
     NumberOfArgumentError, RedefinedMethodError, RedefinedAttributeError,
     UndefinedParentError, ClassAlreadyDefinedError, InheritanceError,
     ArgumentTypeError, DeclaredTypeError, AttributeTypeError,
     TypeCheckError, ConditionStatementError, ArithmeticError, AssignError,
-    EqualTypeCheckError, EqualCheckError
+    EqualTypeCheckError, EqualCheckError, UndefinedClassError,
+    UnknownReceiverTypeError
 )
 from scope import Scope
 from checktype import (
@@ -17,57 +18,116 @@ from checktype import (
 )
 
 
-class Semant(object):
-    """ Analyzes semantically the code. """
-
-    def __init__(self, ast):
+def default_classes():
+    """ The classes Object, IO, Int, String and Bool. """
+    # Object there is no parent
+    objc = Class("Object", None, [
+        Method('abort', [], 'Object', None),
+        Method('type_name', [], 'String', None),
+        Method('copy', [], 'SELF_TYPE', None),
+    ])
+    # IO inherits from Object
+    ioc = Class("IO", "Object", [
+        Method('out_string', [Formal('arg', 'String')], 'SELF_TYPE', None),
+        Method('out_int', [Formal('arg', 'Int')], 'SELF_TYPE', None),
+        Method('in_string', [], 'String', None),
+        Method('in_int', [], 'Int', None),
+    ])
+    # Interge inherits from Object
+    intc = Class("Int", "Object", [
+        Attr('variable', 'Int', Int(content=0))
+    ])
+    # String inherits from Object
+    stringc = Class("String", "Object", [
+        Method('length', [], 'Int', None),
+        Method('concat', [Formal('arg', 'String')], 'String', None),
+        Method(
+            'substr', [Formal('arg1', 'Int'), Formal('arg2', 'Int')], 'String',
+            None
+        ),
+    ])
+    # Boolean inherits from Object
+    boolc = Class("Bool", "Object", [
+        Attr('variable', 'Bool', Bool(content=False))
+    ])
+
+    return (objc, ioc, intc, stringc, boolc)
+
+
+DEFAULT_CLASSES = default_classes()
+
+
+class Semant(NodeVisitor):
+    """
+        Analyzes semantically the code.
+
+        Expressions are checked by the visit_<node class name> methods.
+        profiler (a Profiler) measures the steps of build.
+    """
+
+    def __init__(self, ast, profiler=NULL_PROFILER):
+        super(Semant, self).__init__()
         self.ast = ast
+        self.profiler = profiler
         self.classes = {}
         self.parents = defaultdict(set)
+        # Class table, class name -> {feature name: feature}, including
+        # the inherited features. methods works as a vtable: an
+        # overridden method is replaced by the one of the child.
+        self.methods = {}
+        self.attributes = {}
         self.scope = Scope()
+        self.errors = []
+        # The class or feature where each error of self.errors was found
+        self.error_nodes = []
+        # Class name -> errors found in the features of the class
+        self.class_errors = {}
+
+    def build(self, check=None):
+        """
+            Checks the program and returns the list of Diagnostic found.
 
-    def build(self):
-        self.__create_default_classes()
-        self.__create_symbol_tables()
-        self.__check_undefined_classes()
-        self.__check_inheritance_cycles()
-        self.__check_inheritence_and_add_methods_in_children()
+            The analysis does not stop at the first error. A wrong class
+            is left out of the class table, a wrong feature is skipped,
+            and the analysis goes on, so all the errors come in one run.
 
-        for _class in self.classes.keys():
-            self.__check_scope_and_type(self.classes[_class])
+            check is the set of the names of the classes whose features
+            are checked, all of them by default. The class table is
+            always built for the whole program.
+        """
+        phase = self.profiler.phase
+        with phase('symbol tables'):
+            self.__create_default_classes()
+            self.__create_symbol_tables()
+        with phase('undefined classes'):
+            self.__check_undefined_classes()
+        with phase('inheritance cycles'):
+            self.__check_inheritance_cycles()
+        with phase('inherited features'):
+            self.__check_inheritence_and_add_methods_in_children()
+
+        with phase('scopes and types') as record:
+            for _class in self.classes.keys():
+                # Classes in an inheritance cycle are not in the class table
+                if _class in self.methods and (
+                        check is None or _class in check):
+                    start = len(self.errors)
+                    self.__check_scope_and_type(self.classes[_class])
+                    self.class_errors[_class] = self.errors[start:]
+            record.counts['classes checked'] = len(self.class_errors)
+
+        return sorted(self.errors, key=lambda error: (error.line, error.column))
+
+    def __error(self, error, node=None):
+        """ Records error, found in node, and goes on. """
+        if node is not None:
+            error.locate(node)
+        self.errors.append(error.diagnostic())
+        self.error_nodes.append(node)
 
     def __create_default_classes(self):
-        # Object there is no parent
-        objc = Class("Object", None, [
-            Method('abort', [], 'Object', None),
-            Method('type_name', [], 'String', None),
-            Method('copy', [], 'SELF_TYPE', None),
-        ])
-        # IO inherits from Object
-        ioc = Class("IO", "Object", [
-            Method('out_string', [('arg', 'String')], 'SELF_TYPE', None),
-            Method('out_int', [('arg', 'Int')], 'SELF_TYPE', None),
-            Method('in_string', [], 'String', None),
-            Method('in_int', [], 'Int', None),
-        ])
-        # Interge inherits from Object
-        intc = Class("Int", "Object", [
-            Attr('variable', 'Int', Int(content=0))
-        ])
-        # String inherits from Object
-        stringc = Class("String", "Object", [
-            Method('length', [], 'Int', None),
-            Method('concat', [('arg', 'String')], 'String', None),
-            Method(
-                'substr', [('arg1', 'Int'), ('arg2', 'Int')], 'String', None
-            ),
-        ])
-        # Boolean inherits from Object
-        boolc = Class("Bool", "Object", [
-            Attr('variable', 'Bool', Bool(content=False))
-        ])
-
-        self.ast += [objc, ioc, intc, stringc, boolc]
+        # Built once, the nodes are never changed
+        self.ast += DEFAULT_CLASSES
 
     def __create_symbol_tables(self):
         """
@@ -77,7 +137,9 @@ class Semant(object):
         """
         for _class in self.ast:
             if _class.name in self.classes:
-                raise ClassAlreadyDefinedError(_class.name)
+                # The first definition is kept
+                self.__error(ClassAlreadyDefinedError(_class.name), _class)
+                continue
 
             else:
                 self.classes[_class.name] = _class
@@ -88,13 +150,20 @@ class Semant(object):
     def __check_undefined_classes(self):
         """
             Check if every parent is defined in classes table. (self.classes)
+
+            The children of an undefined parent inherit from Object.
         """
         parents = self.parents.keys()
 
         for parent in parents:
             if parent not in self.classes:
-                class_name = self.parents[parent]
-                raise UndefinedParentError(class_name, parent)
+                class_name = self.parents.pop(parent)
+                for child in class_name:
+                    self.__error(
+                        UndefinedParentError(child, parent),
+                        self.classes[child]
+                    )
+                self.parents['Object'] |= class_name
 
     def __check_inheritance_cycles(self):
         """
@@ -116,7 +185,7 @@ class Semant(object):
         # couldn't get in that class. So, some class is missing.
         for key, value in visited.items():
             if not value:
-                raise InheritanceError(key)
+                self.__error(InheritanceError(key), self.classes[key])
 
     def __visit_tree(self, _class, visited):
         visited[_class] = True
@@ -129,103 +198,92 @@ class Semant(object):
         for child in self.parents[_class]:
             self.__visit_tree(child, visited)
 
-    def __check_inheritence_and_add_methods_in_children(self, _class='Object'):
+    def __check_inheritence_and_add_methods_in_children(
+        self, _class='Object', parent=None
+    ):
         """
             Check attributes and methods from inheritance and
             if it is ok, add them from parent to child.
+
+            Features are not copied to the child: the class table
+            (self.methods and self.attributes), built from Object to
+            the leaves, refers to the features of the parents.
         """
         cl = self.classes[_class]
 
-        if cl.parent:
-            _class_parent = self.classes[cl.parent]
-
-            attrs_of_parent = self.__get_attributes(_class_parent)
-            attrs_of_child = self.__get_attributes(cl)
+        methods_of_child = self.__get_methods(cl)
+        attrs_of_child = self.__get_attributes(cl)
 
+        if parent:
+            attrs_of_parent = self.attributes[parent]
             self.__check_same_attribute(
                 attrs_of_parent, attrs_of_child, _class
             )
 
-            methods_of_parent = self.__get_methods(_class_parent)
-            methods_of_child = self.__get_methods(cl)
-
-            method_signatures_of_parent = self.__get_signatures(
-                methods_of_parent
-            )
-            method_signatures_of_child = self.__get_signatures(
-                methods_of_child
-            )
+            methods_of_parent = self.methods[parent]
+            self.__check_same_signature(methods_of_child, methods_of_parent)
 
-            self.__check_same_signature(
-                methods_of_child,
-                method_signatures_of_parent,
-                method_signatures_of_child
-            )
-
-            self.__add_method_from_parent_to_child(
-                cl, methods_of_parent, methods_of_child
-            )
+            methods = dict(methods_of_parent)
+            methods.update(methods_of_child)
+            attributes = dict(attrs_of_parent)
+            attributes.update(attrs_of_child)
+        else:
+            methods = methods_of_child
+            attributes = attrs_of_child
 
-            self.__add_attr_from_parent_to_child(cl, attrs_of_parent)
+        self.methods[_class] = methods
+        self.attributes[_class] = attributes
 
         # Goes recursively to all children
         all_children = self.parents[_class]
         for child in all_children:
-            self.__check_inheritence_and_add_methods_in_children(child)
+            self.__check_inheritence_and_add_methods_in_children(
+                child, _class
+            )
 
     def __get_attributes(self, _class):
-        return [i for i in _class.feature_list if isAttribute(i)]
+        """ Returns the attributes declared in _class, by name. """
+        return dict(
+            (i.name, i) for i in _class.feature_list if isAttribute(i)
+        )
 
     def __check_same_attribute(self, parent, child, _class):
         """
             It's illegal to redefine attribute names in child class.
         """
-        for p_attr in parent:
-            for c_attr in child:
-                if p_attr.name == c_attr.name:
-                    raise RedefinedAttributeError(_class)
+        for name, attr in child.items():
+            if name in parent:
+                self.__error(RedefinedAttributeError(_class), attr)
 
     def __get_methods(self, _class):
-        return [i for i in _class.feature_list if isMethod(i)]
-
-    def __get_signatures(self, methods):
-        method_signatures = {}
-        for method in methods:
-            method_signatures[method.name] = {}
-            for formal in method.formal_list:
-                # formal is a tuple that has 2 values:
-                # The first one is the name of the argument;
-                # The second, is the type of the argument (Int, Bool,...)
-                method_signatures[method.name][formal[0]] = formal[1]
-            method_signatures[method.name]['return'] = method.return_type
-        return method_signatures
-
-    def __check_same_signature(self, child_methods, sig_parent, sig_child):
+        """ Returns the methods declared in _class, by name. """
+        return dict(
+            (i.name, i) for i in _class.feature_list if isMethod(i)
+        )
+
+    def __get_signature(self, method):
+        method_signature = {}
+        for formal in method.formal_list:
+            # formal has the name of the argument and
+            # the type of the argument (Int, Bool,...)
+            method_signature[formal.name] = formal.type
+        method_signature['return'] = method.return_type
+        return method_signature
+
+    def __check_same_signature(self, child_methods, parent_methods):
         """
             If a class "B" inherits a method "m" from an ancestor class "A",
             then "B" may override the inherited definition of "m" provided
             the number of arguments, the types of the formal parameters,
             and the return type are exactly the same in both definitions.
         """
-        for method in child_methods:
-            if method.name in sig_parent:
-                parent_signature = sig_parent[method.name]
-                child_signature = sig_child[method.name]
+        for name, method in child_methods.items():
+            if name in parent_methods:
+                parent_signature = self.__get_signature(parent_methods[name])
+                child_signature = self.__get_signature(method)
 
                 if parent_signature != child_signature:
-                    raise RedefinedMethodError(method.name)
-
-    def __add_method_from_parent_to_child(self, _cl, p_methods, c_methods):
-        for method in p_methods:
-            if method.name not in c_methods:
-                copied_method = deepcopy(method)
-                # Add at the beginning
-                _cl.feature_list.insert(0, copied_method)
-
-    def __add_attr_from_parent_to_child(self, _cl, attrs_of_parent):
-        for attr in attrs_of_parent:
-            # Add at the beginning
-            _cl.feature_list.insert(0, deepcopy(attr))
+                    self.__error(RedefinedMethodError(name), method)
 
     def __check_scope_and_type(self, _class):
         """
@@ -237,198 +295,240 @@ class Semant(object):
             With a new block, let, case,
 
             OBS: Every attribute is protected and every method is public.
+
+            Each class has its own environment, names of a class are not
+            seen by the others.
         """
+        self.scope.new()
+
+        # Inherited features were checked in the parent class,
+        # only the inherited attributes need to be in the scope.
+        own_attributes = self.__get_attributes(_class)
+        for name, attr in self.attributes[_class.name].items():
+            if name not in own_attributes:
+                self.scope.add(name, returned_type(attr, _class))
 
         for feature in _class.feature_list:
-            _type = returned_type(feature, _class)
+            depth = self.scope.depth()
+            try:
+                self.__check_feature(feature, _class)
+            except SemantError as e:
+                self.__error(e, feature)
+                # Leave the environments the feature was checking
+                while self.scope.depth() > depth:
+                    self.scope.destroy()
+                # An attribute with a wrong value is still bound, so that
+                # its uses are not reported as out of scope
+                if isAttribute(feature):
+                    _type = returned_type(feature, _class)
+                    if _type not in self.classes:
+                        _type = 'Object'
+                    self.scope.add(feature.name, _type)
+
+        self.scope.destroy()
+
+    def __check_feature(self, feature, _class):
+        _type = returned_type(feature, _class)
+
+        if isAttribute(feature):
+            value_type = get_expression_type(
+                feature.body, _class, self.scope
+            )
 
-            if isAttribute(feature):
-                value_type = get_expression_type(
-                    feature.body, _class, self.scope
-                )
+            if not value_type:
+                # If value_type is None, means that feature.body is
+                # a complex expression, need to be checked.
+                self.__check_children(feature.body, _class)
 
-                if not value_type:
-                    # If value_type is None, means that feature.body is
-                    # a complex expression, need to be checked.
-                    self.__check_children(feature.body, _class)
+            # Test if the attribute value type is the same as declared.
+            if feature.type != value_type:
+                raise AttributeTypeError(feature, value_type)
 
-                # Test if the attribute value type is the same as declared.
-                if feature.type != value_type:
-                    raise AttributeTypeError(feature, value_type)
+            self.scope.add(feature.name, _type)
 
-                self.scope.add(feature.name, _type)
+        elif isMethod(feature):
+            self.scope.add(feature.name, _type)
 
-            elif isMethod(feature):
-                self.scope.add(feature.name, _type)
+            # Add arguments to scope. name:type
+            for formal in feature.formal_list:
+                self.scope.add(formal.name, formal.type)
 
-                # Add arguments to scope. name:type
-                for formal in feature.formal_list:
-                    self.scope.add(formal[0], formal[1])
-
-                self.__check_children(feature.body, _class)
+            self.__check_children(feature.body, _class)
 
     def __check_children(self, expression, _class):
-        if isinstance(expression, Block):
-            self.scope.new()
+        """ Checks expression, returns its type if the visit finds it. """
+        try:
+            return self.visit(expression, _class)
+        except SemantError as e:
+            # The innermost expression is the one that keeps the position
+            e.locate(expression)
+            raise
+
+    def visit_Block(self, expression, _class):
+        self.scope.new()
+
+        for expr in expression.body:
+            self.__check_children(expr, _class)
+
+        self.scope.destroy()
+
+    def visit_Dispatch(self, expression, _class):
+        """ Checks a dispatch, returns its static type. """
+        _class_name = self.__check_children(expression.body, _class)
+
+        # Get the type of the receiver, a dispatch returned it
+        if expression.body == 'self':
+            _class_name = _class.name
+        elif _class_name is None:
+            _class_name = get_expression_type(
+                expression.body, _class, self.scope
+            )
 
-            for expr in expression.body:
-                self.__check_children(expr, _class)
+        # Classes in an inheritance cycle are not in the class table, and
+        # the type of some expressions (a dispatch, 1 + 2) is not known.
+        if _class_name is None:
+            raise UnknownReceiverTypeError(expression.method, _class)
+        if _class_name not in self.methods:
+            raise UndefinedClassError(expression.method, _class_name)
 
-            self.scope.destroy()
+        # Find the method in the class table
+        feature = self.methods[_class_name].get(expression.method)
 
-        elif isinstance(expression, Dispatch):
-            self.__check_children(expression.body, _class)
+        # If didn't match the method name...
+        if feature is None:
+            raise UndefinedMethodError(expression.method, _class_name)
 
-            # Get return type
-            if expression.body == 'self':
-                _class_name = _class.name
-            else:
-                try:
-                    _class_name = expression.body.return_type
-                except AttributeError:
-                    # If the expression is an Object and there is no
-                    # return_type variable, so, need get the type.
-                    _class_name = get_expression_type(
-                        expression.body, _class, self.scope
-                    )
+        if len(feature.formal_list) != len(expression.expr_list):
+            raise NumberOfArgumentError(feature.name, _class_name)
 
-            # Get the whole class' structure
-            _class_content = self.classes[_class_name]
+        formals = zip(
+            feature.formal_list, expression.expr_list,
+        )
 
-            called_method = False
+        # Test if the arguments types are not equals
+        for feat, called in formals:
+            expression_type = get_expression_type(
+                called, _class, self.scope
+            )
+            if feat.type != expression_type:
+                raise ArgumentTypeError(feature, _class_name)
+
+        # For default, the method returns the host class. SELF_TYPE
+        last_type = _class_name
+
+        # SELF_TYPE is the class of the receiver
+        feature_type = feature.return_type
+        if feature_type == 'SELF_TYPE':
+            feature_type = _class_name
+
+        # If exists a body, means that exists one or more
+        # expressions inside the method.
+        if feature.body:
+            try:
+                # If have a Block, must look the last expression,
+                # because it is the type that will be returned.
+                last_expression = feature.body.body[-1]
+            except AttributeError:
+                last_expression = feature.body
+
+            last_type = get_expression_type(
+                last_expression, _class, self.scope
+            )
 
-            # Parse the structure untill match the method name
-            for feature in _class_content.feature_list:
-                if isMethod(feature) and feature.name == expression.method:
-                    called_method = True
+        # If the returns types are not equals, raise an error
+        if feature_type != last_type:
+            raise ReturnedTypeError(
+                feature.name, _class_name, feature_type, last_type
+            )
 
-                    if len(feature.formal_list) != len(expression.expr_list):
-                        raise NumberOfArgumentError(feature.name, _class_name)
+        return feature_type
 
-                    formals = zip(
-                        feature.formal_list, expression.expr_list,
-                    )
+    def visit_Let(self, expression, _class):
+        self.scope.new()
+        self.scope.add(expression.object, expression.type)
 
-                    # Test if the arguments types are not equals
-                    for feat, called in formals:
-                        expression_type = get_expression_type(
-                            called, _class, self.scope
-                        )
-                        # feat[0] is the name and feat[1] the type
-                        if feat[1] != expression_type:
-                            raise ArgumentTypeError(feature, _class_name)
-
-                    # For default, the method returns the host class. SELF_TYPE
-                    last_type = _class_name
-
-                    feature_type = returned_type(feature, _class)
-
-                    # If exists a body, means that exists one or more
-                    # expressions inside the method.
-                    if feature.body:
-                        try:
-                            # If have a Block, must look the last expression,
-                            # because it is the type that will be returned.
-                            last_expression = feature.body.body[-1]
-                        except AttributeError:
-                            last_expression = feature.body
-
-                        last_type = get_expression_type(
-                            last_expression, _class, self.scope
-                        )
-
-                    # If the returns types are not equals, raise an error
-                    if feature_type != last_type:
-                        raise ReturnedTypeError(
-                            feature.name, _class_name, feature_type, last_type
-                        )
-
-            # If didn't match the method name...
-            if not called_method:
-                raise UndefinedMethodError(expression.method, _class_name)
-
-        elif isinstance(expression, Let):
-            self.scope.new()
-            self.scope.add(expression.object, expression.type)
-
-            # Test if the declared type is the same type as
-            # the given value
-            value_type = get_expression_type(
-                expression.init, _class, self.scope
-            )
-            if expression.type != value_type:
-                raise DeclaredTypeError(expression.type, value_type)
+        # Test if the declared type is the same type as
+        # the given value
+        value_type = get_expression_type(
+            expression.init, _class, self.scope
+        )
+        if expression.type != value_type:
+            raise DeclaredTypeError(expression.type, value_type)
 
-            self.__check_children(expression.body, _class)
+        self.__check_children(expression.body, _class)
 
-            self.scope.destroy()
+        self.scope.destroy()
 
-        elif isinstance(expression, While):
-            self.__check_children(expression.predicate, _class)
-            self.__check_children(expression.body, _class)
-            # If the methods above did not raise an error, means that
-            # the body's type is Int or an Object.
-            # If is an Object and the root type is not a Bool,
-            # must raise an error.
-            self.__raise_if_not_bool(expression, _class, 'While')
+    def visit_While(self, expression, _class):
+        self.__check_children(expression.predicate, _class)
+        self.__check_children(expression.body, _class)
+        # If the methods above did not raise an error, means that
+        # the body's type is Int or an Object.
+        # If is an Object and the root type is not a Bool,
+        # must raise an error.
+        self.__raise_if_not_bool(expression, _class, 'While')
 
-        elif isinstance(expression, Lt) or isinstance(expression, Le):
-            first_type, second_type = self.__get_params_types(
-                expression, _class
-            )
+    def visit_Lt(self, expression, _class):
+        first_type, second_type = self.__get_params_types(
+            expression, _class
+        )
 
-            if first_type != 'Int' or second_type != 'Int':
-                raise TypeCheckError(first_type, second_type, _class)
-
-        elif isinstance(expression, Eq):
-            """
-                The comparison = is a special case.
-                If either <expr1> or <expr2> has static type Int, Bool,
-                or String, then the other must have the same static type.
-            """
-            first_type, second_type = self.__get_params_types(
-                expression, _class
-            )
-            types = ['String', 'Int', 'Bool']
-            if first_type not in types or second_type not in types:
-                raise EqualTypeCheckError(first_type, second_type, _class)
+        if first_type != 'Int' or second_type != 'Int':
+            raise TypeCheckError(first_type, second_type, _class)
 
-            if first_type != second_type:
-                raise EqualCheckError(first_type, second_type, _class)
+    visit_Le = visit_Lt
 
-        elif any(isinstance(expression, X) for X in [Plus, Sub, Mult, Div]):
-            """
-                The static types of the two sub-expressions must be Int.
+    def visit_Eq(self, expression, _class):
+        """
+            The comparison = is a special case.
+            If either <expr1> or <expr2> has static type Int, Bool,
+            or String, then the other must have the same static type.
+        """
+        first_type, second_type = self.__get_params_types(
+            expression, _class
+        )
+        types = ['String', 'Int', 'Bool']
+        if first_type not in types or second_type not in types:
+            raise EqualTypeCheckError(first_type, second_type, _class)
 
-                Cool has only integer division.
-            """
-            first_type, second_type = self.__get_params_types(
-                expression, _class
-            )
+        if first_type != second_type:
+            raise EqualCheckError(first_type, second_type, _class)
 
-            if first_type != 'Int' or second_type != 'Int':
-                raise ArithmeticError(first_type, second_type, _class)
+    def visit_Plus(self, expression, _class):
+        """
+            The static types of the two sub-expressions must be Int.
 
-        elif isinstance(expression, Assign):
-            self.__check_children(expression.body, _class)
-            # If the method above did not raise an error, means that
-            # the body type is Int. Just need to test name type now.
-            name_type = get_expression_type(
-                expression.name, _class, self.scope
-            )
+            Cool has only integer division.
+        """
+        first_type, second_type = self.__get_params_types(
+            expression, _class
+        )
+
+        if first_type != 'Int' or second_type != 'Int':
+            raise ArithmeticError(first_type, second_type, _class)
+
+    visit_Sub = visit_Mult = visit_Div = visit_Plus
+
+    def visit_Assign(self, expression, _class):
+        self.__check_children(expression.body, _class)
+        # If the method above did not raise an error, means that
+        # the body type is Int. Just need to test name type now.
+        name_type = get_expression_type(
+            expression.name, _class, self.scope
+        )
 
-            if name_type != 'Int':
-                raise AssignError(name_type, 'Int', _class)
-
-        elif isinstance(expression, If):
-            self.__check_children(expression.predicate, _class)
-            self.__check_children(expression.then_body, _class)
-            self.__check_children(expression.else_body, _class)
-            # If the methods above did not raise an error, means that
-            # the body type is Int or an Object.
-            # If is an Object and the root type is not a Bool,
-            # must raise an error.
-            self.__raise_if_not_bool(expression, _class, 'If')
+        if name_type != 'Int':
+            raise AssignError(name_type, 'Int', _class)
+
+    def visit_If(self, expression, _class):
+        self.__check_children(expression.predicate, _class)
+        self.__check_children(expression.then_body, _class)
+        self.__check_children(expression.else_body, _class)
+        # If the methods above did not raise an error, means that
+        # the body type is Int or an Object.
+        # If is an Object and the root type is not a Bool,
+        # must raise an error.
+        self.__raise_if_not_bool(expression, _class, 'If')
 
     def __raise_if_not_bool(self, expression, _class, statement):
         if isinstance(expression.predicate, Object):
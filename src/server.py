@@ -0,0 +1,426 @@
+"""
+    Language server for Cool: the Language Server Protocol, over stdin
+    and stdout.
+
+    The server runs as long as the editor, so the lexer, the parser
+    tables and the basic classes are built once. Each open document has
+    a cache of its own (see IncrementalCompiler.check): after an edit,
+    only the classes that changed, and those that depend on them, are
+    parsed and checked again. The diagnostics are published after each
+    change, and a hover shows the type of a name.
+
+    The documents are kept as UTF-8, as the compiler reads them: the
+    columns of the compiler count bytes, those of the protocol count
+    UTF-16 code units, and are converted both ways.
+
+    Usage: python2 -m src.server
+"""
+import json
+import re
+import sys
+import time
+import traceback
+
+from .incremental import IncrementalCompiler, new_cache
+from .optimizer.hierarchy import CallSites, ClassHierarchy
+from .syntactic.ast import *
+
+# Kinds of textDocumentSync: the whole text is sent on each change
+FULL_SYNC = 1
+ERROR = 1
+
+PARSE_ERROR = -32700
+METHOD_NOT_FOUND = -32601
+INTERNAL_ERROR = -32603
+
+WORD = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
+
+def read_message(stream):
+    """ The next message of stream, or None at the end. """
+    length = None
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            break
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    if length is None:
+        return None
+    return json.loads(stream.read(length))
+
+
+def write_message(stream, message):
+    body = json.dumps(message)
+    stream.write('Content-Length: %d\r\n\r\n%s' % (len(body), body))
+    stream.flush()
+
+
+def position(line, column):
+    """
+        The LSP position (from 0) of a line and column of the lexer. The
+        lexer counts the columns of the first line from 1, and of the
+        other lines from 2.
+    """
+    line = line or 1
+    column = (column or 1) - (1 if line == 1 else 2)
+    return {'line': line - 1, 'character': max(column, 0)}
+
+
+def offset_position(text, offset):
+    """ The LSP position of offset in text. """
+    line = text.count('\n', 0, offset)
+    return {'line': line, 'character': offset - (text.rfind('\n', 0, offset) + 1)}
+
+
+def span(start, length):
+    end = dict(start, character=start['character'] + length)
+    return {'start': start, 'end': end}
+
+
+def utf16_column(line, column):
+    """ The UTF-16 column of the byte column of line, a UTF-8 string. """
+    prefix = line[:column]
+    try:
+        prefix.decode('ascii')
+        return len(prefix)
+    except UnicodeDecodeError:
+        return len(prefix.decode('utf-8', 'replace').encode('utf-16-le')) // 2
+
+
+def byte_column(line, character):
+    """ The byte column of the UTF-16 column of line, a UTF-8 string. """
+    try:
+        line.decode('ascii')
+        return character
+    except UnicodeDecodeError:
+        units = line.decode('utf-8', 'replace').encode('utf-16-le')
+        prefix = units[:character * 2].decode('utf-16-le', 'ignore')
+        return len(prefix.encode('utf-8'))
+
+
+def signature(method):
+    return '%s(%s) : %s' % (method.name, ', '.join(
+        '%s : %s' % (formal.name, formal.type) for formal in method.formal_list
+    ), method.return_type)
+
+
+class Types(CallSites):
+    """ The static type of each expression, and the class it is in. """
+
+    def __init__(self, hierarchy):
+        super(Types, self).__init__(hierarchy)
+        # id of a node -> (class, static type)
+        self.types = {}
+
+    def visit(self, node):
+        _type = super(Types, self).visit(node)
+        self.types[id(node)] = (self.klass, _type)
+        return _type
+
+
+class Document(object):
+    """ An open file, and what the last check found in it. """
+
+    def __init__(self, uri, text, version):
+        self.uri = uri
+        self.cache = new_cache()
+        self.update(text, version)
+
+    def update(self, text, version):
+        self.text = text
+        self.lines = text.split('\n')
+        self.version = version
+        self.result = None
+        self.__nodes = None
+        self.__types = None
+
+    def utf16(self, _range):
+        """ _range, with the columns in UTF-16 code units. """
+        converted = {}
+        for end, position in _range.items():
+            line = position['line']
+            if line < len(self.lines):
+                position = dict(position, character=utf16_column(
+                    self.lines[line], position['character']
+                ))
+            converted[end] = position
+        return converted
+
+    def nodes(self):
+        """ (line, column) -> the nodes at that position. """
+        if self.__nodes is None:
+            self.__nodes = {}
+            for _class in self.result.ast or ():
+                for node in walk(_class):
+                    if node.line is not None:
+                        self.__nodes.setdefault(
+                            (node.line, node.column), []
+                        ).append(node)
+        return self.__nodes
+
+    def types(self):
+        if self.__types is None:
+            self.__types = Types(ClassHierarchy(self.result.semant))
+            self.__types.analyze()
+        return self.__types
+
+
+class LanguageServer(object):
+    """
+        Answers the messages of an editor. The handlers are the on_<method>
+        methods, with the slashes of the method replaced by underscores.
+    """
+
+    def __init__(self, stdin, stdout):
+        self.stdin = stdin
+        self.stdout = stdout
+        self.compiler = IncrementalCompiler(echo=False)
+        self.documents = {}
+        self.running = True
+        # Method -> time of its last answer, in seconds
+        self.times = {}
+
+    def serve(self):
+        while self.running:
+            try:
+                message = read_message(self.stdin)
+            except ValueError:
+                self.__respond(None, error=(PARSE_ERROR, 'Invalid JSON'))
+                continue
+            if message is None:
+                break
+            self.handle(message)
+
+    def handle(self, message):
+        method = message.get('method', '')
+        handler = getattr(self, 'on_' + method.replace('/', '_'), None)
+        request = 'id' in message
+
+        start = time.time()
+        if handler is None:
+            if request:
+                self.__respond(message['id'], error=(
+                    METHOD_NOT_FOUND, 'Unknown method %s' % method
+                ))
+            return
+        try:
+            result = handler(message.get('params') or {})
+        except Exception as e:
+            log('Error while handling %s' % method)
+            if request:
+                self.__respond(message['id'], error=(INTERNAL_ERROR, str(e)))
+            return
+        if request:
+            self.__respond(message['id'], result)
+        self.times[method] = time.time() - start
+
+    def __respond(self, id, result=None, error=None):
+        message = {'jsonrpc': '2.0', 'id': id}
+        if error is None:
+            message['result'] = result
+        else:
+            message['error'] = {'code': error[0], 'message': error[1]}
+        write_message(self.stdout, message)
+
+    def notify(self, method, params):
+        write_message(self.stdout, {
+            'jsonrpc': '2.0', 'method': method, 'params': params
+        })
+
+    # Life cycle
+
+    def on_initialize(self, params):
+        return {
+            'capabilities': {
+                'textDocumentSync': FULL_SYNC,
+                'hoverProvider': True,
+            },
+            'serverInfo': {'name': 'cool'},
+        }
+
+    def on_shutdown(self, params):
+        return None
+
+    def on_exit(self, params):
+        self.running = False
+
+    # Documents
+
+    def on_textDocument_didOpen(self, params):
+        item = params['textDocument']
+        document = Document(
+            item['uri'], item['text'].encode('utf-8'), item.get('version')
+        )
+        self.documents[document.uri] = document
+        self.check(document)
+
+    def on_textDocument_didChange(self, params):
+        document = self.documents[params['textDocument']['uri']]
+        # The whole text, as FULL_SYNC asks
+        text = params['contentChanges'][-1]['text']
+        document.update(
+            text.encode('utf-8'), params['textDocument'].get('version')
+        )
+        self.check(document)
+
+    def on_textDocument_didClose(self, params):
+        uri = params['textDocument']['uri']
+        self.documents.pop(uri, None)
+        self.notify('textDocument/publishDiagnostics', {
+            'uri': uri, 'diagnostics': []
+        })
+
+    def check(self, document):
+        """
+            Checks document, and publishes its diagnostics. A crash of the
+            compiler is published as an internal error of the document.
+        """
+        try:
+            document.result = self.compiler.check(
+                document.text, document.cache
+            )
+            diagnostics = self.diagnostics(document)
+        except Exception as e:
+            log('Error while checking %s' % document.uri)
+            document.result = None
+            document.cache = new_cache()
+            diagnostics = [self.__diagnostic(
+                span({'line': 0, 'character': 0}, 0),
+                'InternalError: %s: %s' % (type(e).__name__, e)
+            )]
+        self.notify('textDocument/publishDiagnostics', {
+            'uri': document.uri, 'version': document.version,
+            'diagnostics': diagnostics,
+        })
+
+    def diagnostics(self, document):
+        result = document.result
+        text = document.text
+        found = []
+        for char, line, lexpos in result.lerror:
+            found.append(self.__diagnostic(
+                document.utf16(span(offset_position(text, lexpos), 1)),
+                'LexError: Illegal character %r' % char
+            ))
+        for _type, value, line, lexpos in result.serror:
+            if lexpos is None:
+                start = offset_position(text, len(text))
+                message = 'SyntaxError: Unexpected end of the file'
+            else:
+                start = offset_position(text, lexpos)
+                message = 'SyntaxError: Unexpected %s %r' % (_type, value)
+            found.append(self.__diagnostic(
+                document.utf16(span(start, 1)), message
+            ))
+        for error in result.errors:
+            found.append(self.__diagnostic(
+                document.utf16(span(position(error.line, error.column), 1)),
+                '%s: %s' % (error.error, error.message)
+            ))
+        return found
+
+    def __diagnostic(self, _range, message):
+        return {
+            'range': _range, 'severity': ERROR, 'source': 'cool',
+            'message': message,
+        }
+
+    # Queries
+
+    def on_textDocument_hover(self, params):
+        document = self.documents.get(params['textDocument']['uri'])
+        if document is None or document.result is None or \
+                document.result.semant is None:
+            return None
+
+        line = params['position']['line']
+        lines = document.lines
+        if line >= len(lines):
+            return None
+        character = byte_column(lines[line], params['position']['character'])
+        for match in WORD.finditer(lines[line]):
+            if match.start() <= character < match.end():
+                break
+        else:
+            return None
+
+        # The position of the word for the lexer
+        column = match.start() + (1 if line == 0 else 2)
+        text = self.describe(
+            document, document.nodes().get((line + 1, column), ()),
+            match.group()
+        )
+        if text is None:
+            return None
+        return {
+            'contents': {'kind': 'plaintext', 'value': text},
+            'range': document.utf16(span(
+                {'line': line, 'character': match.start()}, len(match.group())
+            )),
+        }
+
+    def describe(self, document, nodes, word):
+        """ What a hover on word shows, nodes are the nodes at word. """
+        semant = document.result.semant
+        types = document.types()
+        for node in nodes:
+            if isinstance(node, Object) and node.name == word:
+                klass, _type = types.types.get(id(node), (None, None))
+                if node.name == 'self':
+                    return 'self : SELF_TYPE (%s)' % klass
+                return '%s : %s' % (node.name, _type or 'Object')
+            if isinstance(node, (Dispatch, StaticDispatch)) and \
+                    node.method == word:
+                return self.__method(node, semant, types)
+            if isinstance(node, Method) and node.name == word:
+                return signature(node)
+            if isinstance(node, (Attr, Formal, CaseBranch)) and \
+                    node.name == word:
+                return '%s : %s' % (node.name, node.type)
+            if isinstance(node, Let) and node.object == word:
+                return '%s : %s' % (node.object, node.type)
+            if isinstance(node, Class) and node.name == word:
+                return self.__class(node)
+        if word in semant.classes:
+            return self.__class(semant.classes[word])
+        return None
+
+    def __method(self, node, semant, types):
+        if isinstance(node, StaticDispatch):
+            klass = node.type
+        elif node.body == 'self':
+            klass = types.types.get(id(node), (None, None))[0]
+        else:
+            klass = types.types.get(id(node.body), (None, None))[1]
+        method = semant.methods.get(klass or 'Object', {}).get(node.method)
+        if method is None:
+            return None
+        owner = types.hierarchy.owners.get(id(method), klass)
+        return '%s.%s' % (owner, signature(method))
+
+    def __class(self, _class):
+        if _class.parent is None:
+            return 'class %s' % _class.name
+        return 'class %s inherits %s' % (_class.name, _class.parent)
+
+
+def log(message):
+    """ Writes message and the exception being handled to stderr. """
+    sys.stderr.write('%s\n' % message)
+    traceback.print_exc(file=sys.stderr)
+
+
+def main():
+    # What the compiler prints must not mix with the messages
+    stdout = sys.stdout
+    sys.stdout = sys.stderr
+    LanguageServer(sys.stdin, stdout).serve()
+
+
+if __name__ == '__main__':
+    main()
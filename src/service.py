@@ -0,0 +1,290 @@
+"""
+    The compiler as a service: lex, parse, check or run a source, in a
+    pool of worker processes.
+
+    Each worker builds the lexer and the parser once, when it starts, and
+    compiles a small program to have everything loaded before its first
+    request. A request gets a worker of its own, so the service can be
+    called from many threads at once. A request that takes longer than
+    the timeout (a program that never ends) kills its worker, which is
+    replaced by a new one. A request that crashes the compiler is
+    answered with an internal error, and the worker goes on.
+"""
+import os
+import sys
+import threading
+import traceback
+from multiprocessing import Pipe, Process, cpu_count
+from Queue import Queue
+from StringIO import StringIO
+
+from .codegen import generate, VM, CompileError, CoolRuntimeError
+from .lexical import MyLex
+from .semantic import Semant
+from .syntactic.syntactic import parser
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Limits of a request
+MAX_SOURCE = 256 * 1024
+MAX_STDIN = 64 * 1024
+MAX_OUTPUT = 1024 * 1024
+TIMEOUT = 5.0
+# Requests that wait for a worker, the next ones are refused
+MAX_PENDING = 64
+# Memory of a worker, in bytes
+MEMORY_LIMIT = 1024 * 1024 * 1024
+
+KINDS = ('lex', 'parse', 'check', 'run')
+
+# The start of the answer to a request that crashed the compiler
+INTERNAL_ERROR = 'internal error'
+
+WARM_UP = '''class Main inherits IO {
+    main() : Object { out_string("warm") };
+};
+'''
+
+mylex = MyLex()
+
+
+class ServiceError(Exception):
+    """ A request that the service can not answer, status is its HTTP code. """
+
+    def __init__(self, status, message):
+        super(ServiceError, self).__init__(message)
+        self.status = status
+
+
+class OutputLimit(CoolRuntimeError):
+    pass
+
+
+class LimitedOutput(object):
+    """ The output of a run, at most MAX_OUTPUT bytes. """
+
+    def __init__(self, limit=MAX_OUTPUT):
+        self.buffer = StringIO()
+        self.size = 0
+        self.limit = limit
+
+    def write(self, text):
+        self.size += len(text)
+        if self.size > self.limit:
+            raise OutputLimit('The output is longer than %d bytes' % self.limit)
+        self.buffer.write(text)
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        return self.buffer.getvalue()
+
+
+def diagnostic(error):
+    return {
+        'error': error.error, 'message': error.message,
+        'line': error.line, 'column': error.column,
+    }
+
+
+def lex(code):
+    llex, lerror = mylex.tokenize(code)
+    return {
+        'tokens': [list(token) for token in llex],
+        'errors': [
+            {'char': char, 'line': line, 'position': lexpos}
+            for char, line, lexpos in lerror
+        ],
+    }
+
+
+def parse(code):
+    """ The result of parse, and the ast (None on errors). """
+    llex, lerror = mylex.tokenize(code)
+    if lerror:
+        return lex(code), None
+
+    ast, serror = parser.parse(code, echo=False)
+    return {
+        'classes': [_class.name for _class in ast or ()],
+        'errors': [
+            {'token': _type, 'value': value, 'line': line, 'position': lexpos}
+            for _type, value, line, lexpos in serror
+        ],
+    }, ast
+
+
+def check(code):
+    """ The result of check, and the Semant (None on errors). """
+    result, ast = parse(code)
+    if ast is None or result['errors']:
+        return result, None
+
+    s = Semant(ast)
+    errors = s.build()
+    result['errors'] = [diagnostic(error) for error in errors]
+    return result, (None if errors else s)
+
+
+def run(code, stdin=''):
+    """ Runs code in the virtual machine, if it compiles. """
+    result, s = check(code)
+    result['output'] = None
+    result['runtime_error'] = None
+    if s is None:
+        return result
+
+    stdout = LimitedOutput()
+    try:
+        VM(generate(s), StringIO(stdin), stdout).run()
+    except CompileError as e:
+        result['errors'].append({
+            'error': 'CompileError', 'message': str(e),
+            'line': None, 'column': None,
+        })
+    except CoolRuntimeError as e:
+        result['runtime_error'] = str(e)
+    result['output'] = stdout.getvalue()
+    return result
+
+
+def handle(kind, code, stdin=''):
+    """ The answer to a request, a dictionary. """
+    if kind == 'lex':
+        return lex(code)
+    if kind == 'parse':
+        return parse(code)[0]
+    if kind == 'check':
+        return check(code)[0]
+    return run(code, stdin)
+
+
+def serve(connection, parent):
+    """
+        The loop of a worker, answers the requests of connection until
+        the process parent ends.
+    """
+    if resource is not None:
+        try:
+            resource.setrlimit(
+                resource.RLIMIT_AS, (MEMORY_LIMIT, MEMORY_LIMIT)
+            )
+        except (ValueError, resource.error):
+            pass
+    run(WARM_UP)
+
+    while True:
+        # The other workers have copies of the pipe, its end is not seen
+        while not connection.poll(1):
+            if os.getppid() != parent:
+                return
+        try:
+            kind, code, stdin = connection.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        try:
+            answer = (True, handle(kind, code, stdin))
+        except MemoryError:
+            answer = (False, 'The request used too much memory')
+        except RuntimeError as e:
+            # Recursion too deep in the compiler
+            answer = (False, str(e))
+        except Exception as e:
+            traceback.print_exc(file=sys.stderr)
+            answer = (False, '%s: %s: %s' % (
+                INTERNAL_ERROR, type(e).__name__, e
+            ))
+        connection.send(answer)
+
+
+class Worker(object):
+    """ A process that answers requests, and the end of its pipe. """
+
+    def __init__(self):
+        self.connection, child = Pipe()
+        self.process = Process(target=serve, args=(child, os.getpid()))
+        self.process.daemon = True
+        self.process.start()
+        child.close()
+
+    def stop(self):
+        self.connection.close()
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+
+
+class WorkerPool(object):
+    """
+        workers processes (one per CPU by default) that answer the
+        requests, each one in at most timeout seconds.
+
+        The requests wait for a free worker in turn, at most max_pending
+        of them: the service refuses the next ones until it catches up.
+    """
+
+    def __init__(self, workers=None, timeout=TIMEOUT, max_pending=MAX_PENDING):
+        workers = workers or cpu_count()
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.idle = Queue()
+        self.workers = workers
+        for _ in range(workers):
+            self.idle.put(Worker())
+
+    def submit(self, kind, code, stdin=''):
+        """ The answer to a request, raises ServiceError. """
+        if kind not in KINDS:
+            raise ServiceError(404, 'Unknown request %s' % kind)
+        if len(code) > MAX_SOURCE:
+            raise ServiceError(
+                413, 'The source is longer than %d bytes' % MAX_SOURCE
+            )
+        if len(stdin) > MAX_STDIN:
+            raise ServiceError(
+                413, 'The input is longer than %d bytes' % MAX_STDIN
+            )
+
+        with self.lock:
+            if self.pending >= self.max_pending:
+                raise ServiceError(503, 'Too many requests are waiting')
+            self.pending += 1
+        try:
+            # Without a timeout, Queue.get waits in turn and does not poll
+            worker = self.idle.get()
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+        try:
+            worker.connection.send((kind, code, stdin))
+            if not worker.connection.poll(self.timeout):
+                worker = self.__replace(worker)
+                raise ServiceError(
+                    504, 'The request took longer than %g s' % self.timeout
+                )
+            ok, answer = worker.connection.recv()
+        except (EOFError, IOError):
+            # The worker died
+            worker = self.__replace(worker)
+            raise ServiceError(500, 'The worker stopped')
+        finally:
+            self.idle.put(worker)
+
+        if not ok:
+            raise ServiceError(500, answer)
+        return answer
+
+    def __replace(self, worker):
+        worker.stop()
+        return Worker()
+
+    def close(self):
+        for _ in range(self.workers):
+            self.idle.get().stop()
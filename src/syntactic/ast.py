@@ -1,33 +1,148 @@
-from collections import namedtuple
+from operator import attrgetter
+
+
+class Node(object):
+    """
+        Base of the abstract syntax tree nodes.
+
+        Nodes store their fields in __slots__ (no __dict__ per node) and
+        the position of the node in the source, line and column. They
+        can be built and read as the namedtuples they replace.
+    """
+    __slots__ = ('line', 'column')
+    _fields = ()
+    # What is pickled: the position and the fields
+    _state = attrgetter('line', 'column')
+    _names = ('line', 'column')
+
+    def __init__(self, *args, **kwargs):
+        self.line = kwargs.pop('line', None)
+        self.column = kwargs.pop('column', None)
+
+        if len(args) + len(kwargs) != len(self._fields):
+            raise TypeError('%s takes %d arguments' % (
+                type(self).__name__, len(self._fields)
+            ))
+
+        for name, value in zip(self._fields, args):
+            setattr(self, name, value)
+        for name, value in kwargs.items():
+            setattr(self, name, value)
+
+    @property
+    def position(self):
+        return self.line, self.column
+
+    def __iter__(self):
+        for name in self._fields:
+            yield getattr(self, name)
+
+    def __getitem__(self, index):
+        return getattr(self, self._fields[index])
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and tuple(self) == tuple(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __getstate__(self):
+        return self._state(self)
+
+    def __setstate__(self, state):
+        for name, value in zip(self._names, state):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        fields = ', '.join(
+            '%s=%r' % (name, getattr(self, name)) for name in self._fields
+        )
+        return '%s(%s)' % (type(self).__name__, fields)
+
+
+def node(typename, field_names):
+    """ Creates a Node class, the same way as namedtuple. """
+    fields = tuple(field_names.replace(',', ' ').split())
+    names = Node._names + fields
+    return type(typename, (Node,), {
+        '__slots__': fields, '_fields': fields,
+        '_state': attrgetter(*names), '_names': names,
+    })
+
+
+class NodeVisitor(object):
+    """
+        Base of the passes over the abstract syntax tree.
+
+        visit(node, *args) calls the method visit_<node class name> of the
+        pass, or generic_visit when there is none. The methods are looked up
+        once, when the pass is created, and kept in a table indexed by the
+        class of the node, so a visit costs the same for every kind of node.
+    """
+
+    def __init__(self):
+        self._visitors = {}
+        for node_class in Node.__subclasses__():
+            method = getattr(self, 'visit_' + node_class.__name__, None)
+            if method is not None:
+                self._visitors[node_class] = method
+
+    def visit(self, node, *args):
+        return self._visitors.get(type(node), self.generic_visit)(node, *args)
+
+    def generic_visit(self, node, *args):
+        """ Called for nodes without a visit_ method. Does nothing. """
+        pass
+
+
+def walk(tree):
+    """ Yields every node of tree (a node or a list of nodes), parents first. """
+    pending = [tree]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, Node):
+            yield value
+            pending.extend(value)
+        elif isinstance(value, list):
+            pending.extend(value)
+
 
 # Used to create abstract syntax tree
-Class = namedtuple("Class", "name, parent, feature_list")
-Attr = namedtuple("Attr", "name, type, body")
-Method = namedtuple(
+Class = node("Class", "name, parent, feature_list")
+Attr = node("Attr", "name, type, body")
+Method = node(
     "Method", "name, formal_list, return_type, body"
 )
-Object = namedtuple("Object", "name")
-Int = namedtuple("Int", "content")
-Bool = namedtuple("Bool", "content")
-Str = namedtuple("Str", "content")
-Block = namedtuple("Block", "body")
-Assign = namedtuple("Assign", "name, body")
-Dispatch = namedtuple("Dispatch", "body, method, expr_list")
-StaticDispatch = namedtuple(
+Formal = node("Formal", "name, type")
+Object = node("Object", "name")
+Int = node("Int", "content")
+Bool = node("Bool", "content")
+Str = node("Str", "content")
+Block = node("Block", "body")
+Assign = node("Assign", "name, body")
+Dispatch = node("Dispatch", "body, method, expr_list")
+StaticDispatch = node(
     "StaticDispatch", "body, type, method, expr_list"
 )
-Plus = namedtuple("Plus", "first, second")
-Sub = namedtuple("Sub", "first, second")
-Mult = namedtuple("Mult", "first, second")
-Div = namedtuple("Div", "first, second")
-Lt = namedtuple("Lt", "first, second")
-Le = namedtuple("Le", "first, second")
-Eq = namedtuple("Eq", "first, second")
-If = namedtuple("If", "predicate, then_body, else_body")
-While = namedtuple("While", "predicate, body")
-Case = namedtuple("Case", "expr, case_list")
-New = namedtuple("New", "type")
-Isvoid = namedtuple("Isvoid", "body")
-Neg = namedtuple("Neg", "body")
-Not = namedtuple("Not", "body")
-Let = namedtuple("Let", "object, type, init, body")
+Plus = node("Plus", "first, second")
+Sub = node("Sub", "first, second")
+Mult = node("Mult", "first, second")
+Div = node("Div", "first, second")
+Lt = node("Lt", "first, second")
+Le = node("Le", "first, second")
+Eq = node("Eq", "first, second")
+If = node("If", "predicate, then_body, else_body")
+While = node("While", "predicate, body")
+Case = node("Case", "expr, case_list")
+CaseBranch = node("CaseBranch", "name, type, body")
+New = node("New", "type")
+Isvoid = node("Isvoid", "body")
+Neg = node("Neg", "body")
+Not = node("Not", "body")
+Let = node("Let", "object, type, init, body")
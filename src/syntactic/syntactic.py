@@ -1,262 +1,382 @@
+import copy
+import sys
+from functools import partial
+
 import ply.yacc as yacc
 
-from ..lexical import MyLex
+from ..lexical import MyLex, read_source
 from ..lexical.tokrules import *
 
 from ast import *
 
+# Module where PLY writes the generated LALR tables. PLY stores its own
+# table version and a signature of the grammar in it, so the tables are
+# only generated again when the grammar (or PLY) changes.
+TABMODULE = 'parsetab'
+
+
+def located(node, p, n):
+    """
+        Sets the position of node to the position of the n-th symbol
+        of the production p, and returns the node.
+    """
+    node.line = p.lineno(n)
+    node.column = p.slice[n].column
+    return node
+
+
+def p_class_list_many(p):
+    '''class_list : class_list class SEMI'''
+    p[1].append(p[2])
+    p[0] = p[1]
+
+
+def p_class_list_single(p):
+    '''class_list : class SEMI'''
+    p[0] = [p[1]]
+
+
+def p_class(p):
+    '''class : CLASS TYPEID LBRACE feature_list RBRACE'''
+    p[0] = located(Class(p[2], "Object", p[4]), p, 2)
+
+
+def p_class_inherits(p):
+    '''class : CLASS TYPEID INHERITS TYPEID LBRACE feature_list RBRACE'''
+    p[0] = located(Class(p[2], p[4], p[6]), p, 2)
+
+
+def p_feature_list_many(p):
+    '''feature_list : feature_list feature SEMI'''
+    p[1].append(p[2])
+    p[0] = p[1]
+
+
+def p_feature_list_single(p):
+    '''feature_list : feature SEMI'''
+    p[0] = [p[1]]
+
+
+def p_feature_list_empty(p):
+    '''feature_list : '''
+    p[0] = []
+
+
+def p_feature_method(p):
+    '''feature : OBJECTID LPAREN formal_list RPAREN COLON TYPEID LBRACE expression RBRACE'''
+    p[0] = located(Method(p[1], p[3], p[6], p[8]), p, 1)
+
+
+def p_feature_method_no_formals(p):
+    '''feature : OBJECTID LPAREN RPAREN COLON TYPEID LBRACE expression RBRACE'''
+    p[0] = located(Method(p[1], [], p[5], p[7]), p, 1)
+
+
+def p_feature_attr_initialized(p):
+    '''feature : OBJECTID COLON TYPEID ASSIGN expression'''
+    p[0] = located(Attr(p[1], p[3], p[5]), p, 1)
+
+
+def p_feature_attr(p):
+    '''feature : OBJECTID COLON TYPEID'''
+    p[0] = located(Attr(p[1], p[3], None), p, 1)
+
+
+def p_formal_list_many(p):
+    '''formal_list : formal_list COMMA formal'''
+    p[1].append(p[3])
+    p[0] = p[1]
+
+
+def p_formal_list_single(p):
+    '''formal_list : formal'''
+    p[0] = [p[1]]
+
+
+def p_formal(p):
+    '''formal : OBJECTID COLON TYPEID'''
+    p[0] = located(Formal(p[1], p[3]), p, 1)
+
+
+def p_expression_object(p):
+    '''expression : OBJECTID'''
+    p[0] = located(Object(p[1]), p, 1)
+
+
+def p_expression_int(p):
+    '''expression : INT_CONST'''
+    p[0] = located(Int(p[1]), p, 1)
+
+
+def p_expression_bool(p):
+    '''expression : BOOL_CONST'''
+    p[0] = located(Bool(p[1]), p, 1)
+
+
+def p_expression_str(p):
+    '''expression : STR_CONST'''
+    p[0] = located(Str(p[1]), p, 1)
+
+
+def p_expression_block(p):
+    '''expression : LBRACE block_list RBRACE'''
+    p[0] = located(Block(p[2]), p, 1)
+
+
+def p_block_list_many(p):
+    '''block_list : block_list expression SEMI'''
+    p[1].append(p[2])
+    p[0] = p[1]
+
+
+def p_block_list_single(p):
+    '''block_list : expression SEMI'''
+    p[0] = [p[1]]
+
+
+def p_expression_assignment(p):
+    '''expression : OBJECTID ASSIGN expression'''
+    p[0] = located(Assign(located(Object(p[1]), p, 1), p[3]), p, 1)
+
+
+def p_expression_dispatch(p):
+    '''expression : expression DOT OBJECTID LPAREN expr_list RPAREN'''
+    p[0] = located(Dispatch(p[1], p[3], p[5]), p, 3)
+
+
+def p_expr_list_many(p):
+    '''expr_list : expr_list COMMA expression'''
+    p[1].append(p[3])
+    p[0] = p[1]
+
+
+def p_expr_list_single(p):
+    '''expr_list : expression'''
+    p[0] = [p[1]]
+
+
+def p_expr_list_empty(p):
+    '''expr_list : '''
+    p[0] = []
 
-def syntactic(string):
 
-    def p_class_list_many(p):
-        '''class_list : class_list class SEMI'''
-        p[0] = p[1] + [p[2]]
+def p_expression_static_dispatch(p):
+    '''expression : expression AT TYPEID DOT OBJECTID LPAREN expr_list RPAREN'''
+    p[0] = located(StaticDispatch(p[1], p[3], p[5], p[7]), p, 5)
 
-    def p_class_list_single(p):
-        '''class_list : class SEMI'''
-        p[0] = [p[1]]
 
-    def p_class(p):
-        '''class : CLASS TYPEID LBRACE feature_list RBRACE'''
-        p[0] = Class(p[2], "Object", p[4])
+def p_expression_self_dispatch(p):
+    '''expression : OBJECTID LPAREN expr_list RPAREN'''
+    p[0] = located(Dispatch("self", p[1], p[3]), p, 1)
 
-    def p_class_inherits(p):
-        '''class : CLASS TYPEID INHERITS TYPEID LBRACE feature_list RBRACE'''
-        p[0] = Class(p[2], p[4], p[6])
 
-    def p_feature_list_many(p):
-        '''feature_list : feature_list feature SEMI'''
-        p[0] = p[1] + [p[2]]
-
-    def p_feature_list_single(p):
-        '''feature_list : feature SEMI'''
-        p[0] = [p[1]]
-
-    def p_feature_list_empty(p):
-        '''feature_list : '''
-        p[0] = []
-
-    def p_feature_method(p):
-        '''feature : OBJECTID LPAREN formal_list RPAREN COLON TYPEID LBRACE expression RBRACE'''
-        p[0] = Method(p[1], p[3], p[6], p[8])
-
-    def p_feature_method_no_formals(p):
-        '''feature : OBJECTID LPAREN RPAREN COLON TYPEID LBRACE expression RBRACE'''
-        p[0] = Method(p[1], [], p[5], p[7])
-
-    def p_feature_attr_initialized(p):
-        '''feature : OBJECTID COLON TYPEID ASSIGN expression'''
-        p[0] = Attr(p[1], p[3], p[5])
-
-    def p_feature_attr(p):
-        '''feature : OBJECTID COLON TYPEID'''
-        p[0] = Attr(p[1], p[3], None)
-
-    def p_formal_list_many(p):
-        '''formal_list : formal_list COMMA formal'''
-        p[0] = p[1] + [p[3]]
-
-    def p_formal_list_single(p):
-        '''formal_list : formal'''
-        p[0] = [p[1]]
-
-    def p_formal(p):
-        '''formal : OBJECTID COLON TYPEID'''
-        p[0] = (p[1], p[3])
-
-    def p_expression_object(p):
-        '''expression : OBJECTID'''
-        p[0] = Object(p[1])
-
-    def p_expression_int(p):
-        '''expression : INT_CONST'''
-        p[0] = Int(p[1])
-
-    def p_expression_bool(p):
-        '''expression : BOOL_CONST'''
-        p[0] = Bool(p[1])
-
-    def p_expression_str(p):
-        '''expression : STR_CONST'''
-        p[0] = Str(p[1])
-
-    def p_expression_block(p):
-        '''expression : LBRACE block_list RBRACE'''
-        p[0] = Block(p[2])
-
-    def p_block_list_many(p):
-        '''block_list : block_list expression SEMI'''
-        p[0] = p[1] + [p[2]]
-
-    def p_block_list_single(p):
-        '''block_list : expression SEMI'''
-        p[0] = [p[1]]
-
-    def p_expression_assignment(p):
-        '''expression : OBJECTID ASSIGN expression'''
-        p[0] = Assign(Object(p[1]), p[3])
-
-    def p_expression_dispatch(p):
-        '''expression : expression DOT OBJECTID LPAREN expr_list RPAREN'''
-        p[0] = Dispatch(p[1], p[3], p[5])
-
-    def p_expr_list_many(p):
-        '''expr_list : expr_list COMMA expression'''
-        p[0] = p[1] + [p[3]]
-
-    def p_expr_list_single(p):
-        '''expr_list : expression'''
-        p[0] = [p[1]]
-
-    def p_expr_list_empty(p):
-        '''expr_list : '''
-        p[0] = []
-
-    def p_expression_static_dispatch(p):
-        '''expression : expression AT TYPEID DOT OBJECTID LPAREN expr_list RPAREN'''
-        p[0] = StaticDispatch(p[1], p[3], p[5], p[7])
-
-    def p_expression_self_dispatch(p):
-        '''expression : OBJECTID LPAREN expr_list RPAREN'''
-        p[0] = Dispatch("self", p[1], p[3])
-
-    def p_expression_basic_math(p):
-        '''
-        expression : expression PLUS expression
-                   | expression MINUS expression
-                   | expression MULT expression
-                   | expression DIV expression
-        '''
-        if p[2] == '+':
-            p[0] = Plus(p[1], p[3])
-        elif p[2] == '-':
-            p[0] = Sub(p[1], p[3])
-        elif p[2] == '*':
-            p[0] = Mult(p[1], p[3])
-        elif p[2] == '/':
-            p[0] = Div(p[1], p[3])
-
-    def p_expression_numerical_comparison(p):
-        '''
-        expression : expression LT expression
-                   | expression LE expression
-                   | expression EQ expression
-        '''
-        if p[2] == '<':
-            p[0] = Lt(p[1], p[3])
-        elif p[2] == '<=':
-            p[0] = Le(p[1], p[3])
-        elif p[2] == '=':
-            p[0] = Eq(p[1], p[3])
-
-    def p_expression_with_parenthesis(p):
-        '''expression : LPAREN expression RPAREN'''
-        p[0] = p[2]
-
-    def p_expression_if(p):
-        '''expression : IF expression THEN expression ELSE expression FI'''
-        p[0] = If(p[2], p[4], p[6])
-
-    def p_expression_while(p):
-        '''expression : WHILE expression LOOP expression POOL'''
-        p[0] = While(p[2], p[4])
-
-    def p_expression_let(p):
-        """expression : LET OBJECTID COLON TYPEID IN expression
-           expression : LET OBJECTID COLON TYPEID COMMA inner_lets"""
-        p[0] = Let(p[2], p[4], None, p[6])
-
-    def p_expression_let_initialized(p):
-        """expression : LET OBJECTID COLON TYPEID ASSIGN expression IN expression
-           expression : LET OBJECTID COLON TYPEID ASSIGN expression COMMA inner_lets"""
-        p[0] = Let(p[2], p[4], p[6], p[8])
-
-    def p_expression_let_with_error_in_first_decl(p):
-        """expression : LET error COMMA OBJECTID COLON TYPEID IN expression
-           expression : LET error COMMA OBJECTID COLON TYPEID COMMA inner_lets"""
-        p[0] = Let(p[4], p[6], None, p[8])
-
-    def p_expression_let_initialized_with_error_in_first_decl(p):
-        """expression : LET error COMMA OBJECTID COLON TYPEID ASSIGN expression IN expression
-           expression : LET error COMMA OBJECTID COLON TYPEID ASSIGN expression COMMA inner_lets"""
-        p[0] = Let(p[4], p[6], p[8], p[10])
-
-    def p_inner_lets_simple(p):
-        """inner_lets : OBJECTID COLON TYPEID IN expression
-           inner_lets : OBJECTID COLON TYPEID COMMA inner_lets """
-        p[0] = Let(p[1], p[3], None, p[5])
-
-    def p_inner_lets_initialized(p):
-        """inner_lets : OBJECTID COLON TYPEID ASSIGN expression IN expression
-           inner_lets : OBJECTID COLON TYPEID ASSIGN expression COMMA inner_lets"""
-        p[0] = Let(p[1], p[3], p[5], p[7])
-
-    def p_expression_case(p):
-        '''expression : CASE expression OF case_list ESAC'''
-        p[0] = Case(p[2], p[4])
-
-    def p_case_list_one(p):
-        '''case_list : case'''
-        p[0] = [p[1]]
-
-    def p_case_list_many(p):
-        '''case_list : case_list case'''
-        p[0] = p[1] + [p[2]]
-
-    def p_case_expr(p):
-        '''case : OBJECTID COLON TYPEID DARROW expression SEMI'''
-        p[0] = (p[1], p[3], p[5])
-
-    def p_expression_new(p):
-        '''expression : NEW TYPEID'''
-        p[0] = New(p[2])
-
-    def p_expression_isvoid(p):
-        '''expression : ISVOID expression'''
-        p[0] = Isvoid(p[2])
-
-    def p_expression_neg(p):
-        '''expression : NEG expression'''
-        p[0] = Neg(p[2])
-
-    def p_expression_not(p):
-        '''expression : NOT expression'''
-        p[0] = Not(p[2])
-
-    precedence = (
-        ('right', 'ASSIGN'),
-        ('left', 'NOT'),
-        ('nonassoc', 'LE', 'LT', 'EQ'),
-        ('left', 'PLUS', 'MINUS'),
-        ('left', 'MULT', 'DIV'),
-        ('left', 'ISVOID'),
-        ('left', 'NEG'),
-        ('left', 'AT'),
-        ('left', 'DOT'),
-    )
-
-    serror = []
-
-    # Error rule for syntax errors
-    def p_error(p):
+def p_expression_basic_math(p):
+    '''
+    expression : expression PLUS expression
+               | expression MINUS expression
+               | expression MULT expression
+               | expression DIV expression
+    '''
+    if p[2] == '+':
+        p[0] = located(Plus(p[1], p[3]), p, 2)
+    elif p[2] == '-':
+        p[0] = located(Sub(p[1], p[3]), p, 2)
+    elif p[2] == '*':
+        p[0] = located(Mult(p[1], p[3]), p, 2)
+    elif p[2] == '/':
+        p[0] = located(Div(p[1], p[3]), p, 2)
+
+
+def p_expression_numerical_comparison(p):
+    '''
+    expression : expression LT expression
+               | expression LE expression
+               | expression EQ expression
+    '''
+    if p[2] == '<':
+        p[0] = located(Lt(p[1], p[3]), p, 2)
+    elif p[2] == '<=':
+        p[0] = located(Le(p[1], p[3]), p, 2)
+    elif p[2] == '=':
+        p[0] = located(Eq(p[1], p[3]), p, 2)
+
+
+def p_expression_with_parenthesis(p):
+    '''expression : LPAREN expression RPAREN'''
+    p[0] = p[2]
+
+
+def p_expression_if(p):
+    '''expression : IF expression THEN expression ELSE expression FI'''
+    p[0] = located(If(p[2], p[4], p[6]), p, 1)
+
+
+def p_expression_while(p):
+    '''expression : WHILE expression LOOP expression POOL'''
+    p[0] = located(While(p[2], p[4]), p, 1)
+
+
+def p_expression_let(p):
+    """expression : LET OBJECTID COLON TYPEID IN expression
+       expression : LET OBJECTID COLON TYPEID COMMA inner_lets"""
+    p[0] = located(Let(p[2], p[4], None, p[6]), p, 2)
+
+
+def p_expression_let_initialized(p):
+    """expression : LET OBJECTID COLON TYPEID ASSIGN expression IN expression
+       expression : LET OBJECTID COLON TYPEID ASSIGN expression COMMA inner_lets"""
+    p[0] = located(Let(p[2], p[4], p[6], p[8]), p, 2)
+
+
+def p_expression_let_with_error_in_first_decl(p):
+    """expression : LET error COMMA OBJECTID COLON TYPEID IN expression
+       expression : LET error COMMA OBJECTID COLON TYPEID COMMA inner_lets"""
+    p[0] = located(Let(p[4], p[6], None, p[8]), p, 4)
+
+
+def p_expression_let_initialized_with_error_in_first_decl(p):
+    """expression : LET error COMMA OBJECTID COLON TYPEID ASSIGN expression IN expression
+       expression : LET error COMMA OBJECTID COLON TYPEID ASSIGN expression COMMA inner_lets"""
+    p[0] = located(Let(p[4], p[6], p[8], p[10]), p, 4)
+
+
+def p_inner_lets_simple(p):
+    """inner_lets : OBJECTID COLON TYPEID IN expression
+       inner_lets : OBJECTID COLON TYPEID COMMA inner_lets """
+    p[0] = located(Let(p[1], p[3], None, p[5]), p, 1)
+
+
+def p_inner_lets_initialized(p):
+    """inner_lets : OBJECTID COLON TYPEID ASSIGN expression IN expression
+       inner_lets : OBJECTID COLON TYPEID ASSIGN expression COMMA inner_lets"""
+    p[0] = located(Let(p[1], p[3], p[5], p[7]), p, 1)
+
+
+def p_expression_case(p):
+    '''expression : CASE expression OF case_list ESAC'''
+    p[0] = located(Case(p[2], p[4]), p, 1)
+
+
+def p_case_list_one(p):
+    '''case_list : case'''
+    p[0] = [p[1]]
+
+
+def p_case_list_many(p):
+    '''case_list : case_list case'''
+    p[1].append(p[2])
+    p[0] = p[1]
+
+
+def p_case_expr(p):
+    '''case : OBJECTID COLON TYPEID DARROW expression SEMI'''
+    p[0] = located(CaseBranch(p[1], p[3], p[5]), p, 1)
+
+
+def p_expression_new(p):
+    '''expression : NEW TYPEID'''
+    p[0] = located(New(p[2]), p, 1)
+
+
+def p_expression_isvoid(p):
+    '''expression : ISVOID expression'''
+    p[0] = located(Isvoid(p[2]), p, 1)
+
+
+def p_expression_neg(p):
+    '''expression : NEG expression'''
+    p[0] = located(Neg(p[2]), p, 1)
+
+
+def p_expression_not(p):
+    '''expression : NOT expression'''
+    p[0] = located(Not(p[2]), p, 1)
+
+
+precedence = (
+    ('right', 'ASSIGN'),
+    ('left', 'NOT'),
+    ('nonassoc', 'LE', 'LT', 'EQ'),
+    ('left', 'PLUS', 'MINUS'),
+    ('left', 'MULT', 'DIV'),
+    ('left', 'ISVOID'),
+    ('left', 'NEG'),
+    ('left', 'AT'),
+    ('left', 'DOT'),
+)
+
+
+def report_error(serror, p, echo=True):
+    """
+        Add a syntax error to serror, and prints it if echo is true.
+
+        p is None when the input ends before the program is complete.
+    """
+    if p is None:
+        er = ('$end', '', None, None)
+    else:
         er = (p.type, p.value[0], p.lineno, p.lexpos)
-        serror.append(er)
+    serror.append(er)
+    if echo:
         print('parser error: {}'.format(p))
 
-    # Build the parser
-    parser = yacc.yacc()
 
-    l = MyLex()
-    lexer = l.lexer
+# Error rule for syntax errors. PLY requires it to build the parser,
+# Parser.parse swaps it for one that keeps the errors of each call.
+def p_error(p):
+    report_error([], p)
 
-    result = parser.parse(string, lexer=lexer)
 
-    return result, serror
+class Parser(object):
+    """
+        LALR parser for Cool.
 
+        The tables are generated (or loaded from TABMODULE) once, when the
+        object is created. Every call to parse works on a shallow copy of
+        the PLY parser, with its own lexer (see MyLex.clone) and its own
+        error list, so the same Parser can be used by many calls.
+    """
+
+    def __init__(self, lexer=None):
+        if lexer is None:
+            lexer = MyLex()
+        self.lexer = lexer
+        self.parser = yacc.yacc(
+            module=sys.modules[__name__], tabmodule=TABMODULE, debug=False
+        )
+
+    def parse(self, string, echo=True, lerror=None):
+        """
+            Returns the AST of string and the list of syntax errors.
+
+            string can also be a file or a mmap, the tokens are read
+            from it as the parser needs them. If echo is false, the
+            errors are not printed. If lerror is given, the lexical
+            errors are added to it.
+        """
+        serror = []
+
+        parser = copy.copy(self.parser)
+        parser.errorfunc = partial(report_error, serror, echo=echo)
+
+        with read_source(string) as data:
+            lexer = self.lexer.clone()
+            if lerror is not None:
+                lexer.lerror = lerror
+            result = parser.parse(data, lexer=lexer)
+
+        return result, serror
 
-if __name__ == '__main__':
-    import sys
 
+# Built when the module is imported and shared by every call to syntactic.
+parser = Parser()
+
+
+def syntactic(string):
+    return parser.parse(string)
+
+
+if __name__ == '__main__':
     if len(sys.argv) > 1:
         with open(sys.argv[1]) as file:
             data = file.read()
@@ -0,0 +1,155 @@
+"""
+    Small programs that every backend must run as the interpreter does,
+    and a base of the tests of each backend.
+"""
+from src.interpreter.differential import agree, execute, run_interpreter
+
+ARITHMETIC = '''class Main inherits IO {
+    show(n : Int) : Object { { out_int(n); out_string(" "); } };
+    main() : Object {
+        let a : Int <- 17, b : Int <- ~5 in {
+            show(a + b); show(a - b); show(a * b); show(a / b);
+            show(~a / 4); show(2147483647 + 1);
+            if a < b then show(1) else show(0) fi;
+            if b <= ~5 then show(1) else show(0) fi;
+            if a = 17 then show(1) else show(0) fi;
+            if not (a = b) then show(1) else show(0) fi;
+        }
+    };
+};
+'''
+
+STRINGS = '''class Main inherits IO {
+    main() : Object {
+        let s : String <- "hello".concat(", world") in {
+            out_string(s); out_string("\\n");
+            out_int(s.length()); out_string("\\n");
+            out_string(s.substr(7, 5)); out_string("\\n");
+            out_string(if s = "hello, world" then "same" else "other" fi);
+            out_string("\\tx\\n");
+        }
+    };
+};
+'''
+
+OBJECTS = '''class A {
+    n : Int <- 1;
+    get() : Int { n };
+    set(m : Int) : SELF_TYPE { { n <- m; self; } };
+    name() : String { "A" };
+};
+
+class B inherits A {
+    name() : String { "B" };
+    both() : String { name().concat(self@A.name()) };
+};
+
+class Main inherits IO {
+    main() : Object {
+        let a : A <- new A, b : B <- new B, c : A <- b.copy() in {
+            out_int(a.set(5).get());
+            out_int(b.get());
+            out_int(c.set(7).get());
+            out_int(b.get());
+            out_string(b.both());
+            out_string(c.name());
+            out_string(c.type_name());
+            out_string(if isvoid a then "void" else "set" fi);
+        }
+    };
+};
+'''
+
+CONTROL = '''class Main inherits IO {
+    kind(x : Object) : String {
+        case x of
+            i : Int => "Int";
+            s : String => "String";
+            m : Main => "Main";
+            o : Object => "Object";
+        esac
+    };
+    main() : Object {
+        let i : Int <- 0, total : Int in {
+            while i < 10 loop { total <- total + i; i <- i + 1; } pool;
+            out_int(total);
+            out_string(kind(3)); out_string(kind("s"));
+            out_string(kind(self)); out_string(kind(true));
+        }
+    };
+};
+'''
+
+INPUT = '''class Main inherits IO {
+    main() : Object {
+        let name : String <- in_string(), n : Int <- in_int() in {
+            out_string(name.concat("!"));
+            out_int(n * 2);
+        }
+    };
+};
+'''
+
+RECURSION = '''class Main inherits IO {
+    fib(n : Int) : Int { if n < 2 then n else fib(n - 1) + fib(n - 2) fi };
+    sum(n : Int) : Int { if n = 0 then 0 else n + sum(n - 1) fi };
+    main() : Object { { out_int(fib(15)); out_int(sum(5000)); } };
+};
+'''
+
+# Name, source and input of programs that print something and end
+PROGRAMS = [
+    ('arithmetic', ARITHMETIC, ''),
+    ('strings', STRINGS, ''),
+    ('objects', OBJECTS, ''),
+    ('control', CONTROL, ''),
+    ('input', INPUT, 'cool\n21\n'),
+    ('recursion', RECURSION, ''),
+]
+
+# Name and source of programs that stop with a runtime error
+ERRORS = [
+    ('division by zero', '''class Main inherits IO {
+        main() : Object { { out_int(1); out_int(1 / 0); } };
+    };'''),
+    ('dispatch on void', '''class Main inherits IO {
+        a : Main;
+        main() : Object { { out_int(2); a.main(); } };
+    };'''),
+    ('substring out of range', '''class Main inherits IO {
+        main() : Object { out_string("abc".substr(2, 5)) };
+    };'''),
+    ('case on void', '''class Main inherits IO {
+        a : Main;
+        main() : Object { case a of m : Main => 1; esac };
+    };'''),
+    ('abort', '''class Main inherits IO {
+        main() : Object { { out_string("before"); abort(); 1; } };
+    };'''),
+]
+
+
+class BackendTests(object):
+    """
+        Tests of a backend, mixed in a TestCase: runner is the function that
+        runs a program with it (see BACKENDS), a staticmethod.
+    """
+    runner = None
+
+    def assert_agree(self, name, code, stdin=''):
+        expected = execute(run_interpreter, code, stdin)
+        outcome = execute(self.runner, code, stdin)
+        self.assertTrue(agree(expected, outcome), '%s: %r != %r' % (
+            name, outcome[:2], expected[:2]
+        ))
+        return expected
+
+    def test_programs(self):
+        for name, code, stdin in PROGRAMS:
+            expected = self.assert_agree(name, code, stdin)
+            self.assertIsNone(expected.error, name)
+
+    def test_runtime_errors(self):
+        for name, code in ERRORS:
+            expected = self.assert_agree(name, code)
+            self.assertIsNotNone(expected.error, name)
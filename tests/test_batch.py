@@ -0,0 +1,52 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.batch import compile_files, INTERNAL_ERROR
+
+MAIN = 'class Main { main() : Int { (new A).f() }; };\n'
+
+
+def deep(depth):
+    """ A class with an expression nested depth times, too deep for pickle. """
+    return 'class A { f() : Int { %s1%s }; };\n' % (
+        '1 + (' * depth, ')' * depth
+    )
+
+
+class MergeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, code):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as file:
+            file.write(code)
+        return path
+
+    def test_merge_in_pool(self):
+        paths = [self.write('a.cl', deep(10)), self.write('main.cl', MAIN)]
+        pooled = compile_files(paths, jobs=2, merge=True)
+        alone = compile_files(paths, jobs=1, merge=True)
+        self.assertEqual(
+            [(r.status, r.errors) for r in pooled],
+            [(r.status, r.errors) for r in alone]
+        )
+        self.assertNotIn(INTERNAL_ERROR, [r.status for r in pooled])
+
+    def test_result_too_deep_to_send_back(self):
+        paths = [self.write('a.cl', deep(3000)), self.write('main.cl', MAIN)]
+        results = compile_files(paths, jobs=2, merge=True)
+        self.assertEqual(results[0].status, INTERNAL_ERROR)
+        self.assertIn('RuntimeError', results[0].errors[-1])
+        # Main is checked alone, A is not defined
+        self.assertNotEqual(results[1].status, INTERNAL_ERROR)
+
+
+if __name__ == '__main__':
+    unittest.main()
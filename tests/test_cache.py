@@ -0,0 +1,121 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from src import cache
+from src.cache import ResultCache, CHECK, PARSE, TOKENS
+
+
+class MemoryTest(unittest.TestCase):
+
+    def test_hits_and_misses(self):
+        results = ResultCache()
+        self.assertIsNone(results.get(PARSE, 'code'))
+        results.put(PARSE, ('code',), [1, 2])
+        self.assertEqual(results.get(PARSE, 'code'), [1, 2])
+        # Each phase and each input has its own entries
+        self.assertIsNone(results.get(CHECK, 'code'))
+        self.assertIsNone(results.get(PARSE, 'code', 'stdin'))
+        stats = results.stats()
+        self.assertEqual(stats['hits'], {PARSE: 1})
+        self.assertEqual(stats['misses'], {PARSE: 2, CHECK: 1})
+
+    def test_each_hit_is_a_copy(self):
+        results = ResultCache()
+        results.put(PARSE, ('code',), [1])
+        results.get(PARSE, 'code').append(2)
+        self.assertEqual(results.get(PARSE, 'code'), [1])
+
+    def test_least_recently_used_is_dropped(self):
+        results = ResultCache(max_bytes=3500)
+        for name in 'abc':
+            results.put(TOKENS, (name,), name * 1000)
+        # Three entries fit, a was used after b
+        results.get(TOKENS, 'a')
+        results.put(TOKENS, ('d',), 'd' * 1000)
+        self.assertIsNotNone(results.get(TOKENS, 'a'))
+        self.assertIsNone(results.get(TOKENS, 'b'))
+        self.assertLessEqual(results.stats()['bytes'], 3500)
+        self.assertGreater(results.stats()['evictions'], 0)
+
+    def test_memoize(self):
+        results = ResultCache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return 'value'
+        for _ in range(3):
+            self.assertEqual(results.memoize(PARSE, ('x',), compute), 'value')
+        self.assertEqual(len(calls), 1)
+
+    def test_value_too_deep_is_not_kept(self):
+        value = []
+        for _ in range(100000):
+            value = [value]
+        results = ResultCache()
+        results.put(PARSE, ('deep',), value)
+        self.assertIsNone(results.get(PARSE, 'deep'))
+
+
+class DiskTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def files(self):
+        return [
+            os.path.join(root, name)
+            for root, _, names in os.walk(self.directory) for name in names
+        ]
+
+    def test_found_by_the_next_run(self):
+        ResultCache(directory=self.directory).put(PARSE, ('code',), 'ast')
+        results = ResultCache(directory=self.directory)
+        self.assertEqual(results.get(PARSE, 'code'), 'ast')
+        self.assertEqual(results.get(PARSE, 'code'), 'ast')
+        stats = results.stats()
+        self.assertEqual(
+            (stats['disk_hits'], stats['hits']), ({PARSE: 1}, {PARSE: 1})
+        )
+
+    def test_disk_is_trimmed(self):
+        results = ResultCache(directory=self.directory, max_disk_bytes=10000)
+        for i in range(20):
+            results.put(TOKENS, (str(i),), 'x' * 1000)
+        size = sum(os.path.getsize(path) for path in self.files())
+        self.assertLessEqual(size, 10000)
+
+    def test_truncated_file_is_a_miss(self):
+        ResultCache(directory=self.directory).put(PARSE, ('code',), [1] * 100)
+        path, = self.files()
+        with open(path, 'r+b') as file:
+            file.truncate(os.path.getsize(path) // 2)
+
+        results = ResultCache(directory=self.directory)
+        self.assertIsNone(results.get(PARSE, 'code'))
+        self.assertEqual(self.files(), [])
+        self.assertEqual(results.stats()['misses'], {PARSE: 1})
+        self.assertEqual(
+            results.memoize(PARSE, ('code',), lambda: [2]), [2]
+        )
+        self.assertEqual(
+            ResultCache(directory=self.directory).get(PARSE, 'code'), [2]
+        )
+
+    def test_key_follows_the_compiler_sources(self):
+        key = cache.cache_key(PARSE, 'code')
+        digest = cache.compiler_digest
+        cache.compiler_digest = lambda: 'other'
+        try:
+            self.assertNotEqual(cache.cache_key(PARSE, 'code'), key)
+        finally:
+            cache.compiler_digest = digest
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from src import native
+from src.interpreter.differential import analyze, execute, run_interpreter
+
+from benchmarks.generators import linked_lists
+from test_native import UBSAN
+
+# Lists that live, die, and get new labels while they are old
+PROGRAM = linked_lists(2000, 12)
+
+
+@unittest.skipIf(native.cc() is None, 'no C compiler')
+class CollectorTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.executable = os.path.join(cls.directory, 'program')
+        native.build(native.generate(analyze(PROGRAM)), cls.executable, UBSAN)
+        cls.expected = execute(run_interpreter, PROGRAM).output
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def run_with(self, nursery_size):
+        environ = dict(os.environ)
+        os.environ['COOL_NURSERY_SIZE'] = str(nursery_size)
+        try:
+            output = tempfile.TemporaryFile()
+            stats = native.execute(self.executable, '', output, gc_stats=True)
+            output.seek(0)
+            return output.read(), stats
+        finally:
+            os.environ.clear()
+            os.environ.update(environ)
+
+    def test_small_nursery(self):
+        output, stats = self.run_with(16 * 1024)
+        self.assertEqual(output, self.expected)
+        self.assertGreater(stats.minor, 10)
+        self.assertGreater(stats.major, 0)
+        self.assertGreater(stats.promoted, 0)
+        # The lists that died are not in the heap
+        self.assertLess(stats.heap, stats.allocated // 4)
+
+    def test_nursery_sizes(self):
+        minor = []
+        for size in (16 * 1024, 256 * 1024, 8 * 1024 * 1024):
+            output, stats = self.run_with(size)
+            self.assertEqual(output, self.expected)
+            minor.append(stats.minor)
+        self.assertEqual(sorted(minor, reverse=True), minor)
+
+
+if __name__ == '__main__':
+    unittest.main()
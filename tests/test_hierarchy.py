@@ -0,0 +1,97 @@
+import unittest
+from StringIO import StringIO
+
+from src import mips
+from src.interpreter.differential import analyze, execute, run_interpreter
+from src.optimizer import devirtualize, ClassHierarchy
+from src.syntactic.ast import walk, Dispatch
+
+PROGRAM = '''class Shape {
+    area() : Int { 0 };
+    name() : String { "shape" };
+};
+
+class Square inherits Shape {
+    side : Int <- 2;
+    area() : Int { side * side };
+};
+
+class Circle inherits Shape {
+    area() : Int { 3 };
+};
+
+class Main inherits IO {
+    shape : Shape <- new Square;
+    square : Square <- new Square;
+    main() : Object {
+        {
+            shape.area();
+            square.area();
+            shape.name();
+            out_int(shape.area());
+            square.copy().area();
+        }
+    };
+};
+'''
+
+
+def sites(semant):
+    """ The dispatches of Main.main, in order, and the Devirtualization. """
+    result = devirtualize(semant)
+    main = semant.methods['Main']['main']
+    found = [node for node in walk(main.body) if isinstance(node, Dispatch)]
+    found.sort(key=lambda node: (node.line, node.column))
+    return found, result
+
+
+class HierarchyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.semant = analyze(PROGRAM)
+
+    def test_subclasses_and_join(self):
+        hierarchy = ClassHierarchy(self.semant)
+        self.assertEqual(
+            hierarchy.subclasses('Shape'), ['Shape', 'Circle', 'Square']
+        )
+        self.assertEqual(hierarchy.join('Square', 'Circle'), 'Shape')
+        self.assertEqual(hierarchy.join('Main', 'Square'), 'Object')
+
+    def test_targets(self):
+        hierarchy = ClassHierarchy(self.semant)
+        self.assertEqual(
+            hierarchy.targets('Shape', 'area'),
+            set(['Shape', 'Square', 'Circle'])
+        )
+        self.assertEqual(hierarchy.targets('Shape', 'name'), set(['Shape']))
+
+    def test_devirtualize(self):
+        found, result = sites(self.semant)
+        targets = [result.targets.get(id(node)) for node in found]
+        self.assertEqual(targets, [
+            None,                         # shape.area(), overridden
+            ('Square', 'area'),
+            ('Shape', 'name'),
+            ('IO', 'out_int'),            # self
+            None,
+            ('Object', 'copy'),
+            ('Square', 'area'),           # copy returns SELF_TYPE
+        ])
+        self.assertEqual(result.sites, 7)
+
+    def test_direct_calls(self):
+        # A Square in a Shape attribute, and the same through its vtable
+        expected = execute(run_interpreter, PROGRAM)
+        for direct_calls in (True, False):
+            output = StringIO()
+            mips.run(
+                mips.generate(analyze(PROGRAM), direct_calls), StringIO(),
+                output, simulator=True
+            )
+            self.assertEqual(output.getvalue(), expected.output)
+        self.assertEqual(expected.output, '4')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import cPickle as pickle
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.incremental import IncrementalCompiler
+
+CODE = '''class A {
+    f() : Int { 1 };
+};
+
+class Main {
+    main() : Int { (new A).f() };
+};
+'''
+
+
+class CorruptCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'main.cl')
+        with open(self.path, 'w') as file:
+            file.write(CODE)
+        self.compiler = IncrementalCompiler(
+            os.path.join(self.directory, 'cache'), echo=False
+        )
+        self.expected = self.compile()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def compile(self):
+        result = self.compiler.compile(self.path)
+        return [c.name for c in result.ast], result.errors
+
+    def cache_file(self):
+        cache, = os.listdir(os.path.join(self.directory, 'cache'))
+        return os.path.join(self.directory, 'cache', cache)
+
+    def write_cache(self, data):
+        with open(self.cache_file(), 'wb') as file:
+            file.write(data)
+
+    def read_cache(self):
+        with open(self.cache_file(), 'rb') as file:
+            return pickle.load(file)
+
+    def test_cut_short(self):
+        with open(self.cache_file(), 'rb') as file:
+            data = file.read()
+        self.write_cache(data[:len(data) // 2])
+        self.assertEqual(self.compile(), self.expected)
+
+    def test_not_a_cache(self):
+        for value in ([1, 2], {'version': 'other'}, None):
+            self.write_cache(pickle.dumps(value, 2))
+            self.assertEqual(self.compile(), self.expected)
+        # A class that pickle can not find
+        self.write_cache('\x80\x02csrc.nowhere\nThing\nq\x00.')
+        self.assertEqual(self.compile(), self.expected)
+
+    def test_corrupt_entry(self):
+        cache = self.read_cache()
+        keys = list(cache['classes'])
+        cache['classes'][keys[0]] = ('garbage', (), 0)
+        cache['classes'][keys[1]] = (pickle.dumps([1], 2),)
+        self.write_cache(pickle.dumps(cache, 2))
+        self.assertEqual(self.compile(), self.expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import sys
+import threading
+import unittest
+
+from src.interpreter.differential import (
+    agree, compare, conclusive, execute, run_interpreter, Outcome
+)
+
+from programs import PROGRAMS, ERRORS
+
+
+def interpret(code):
+    return execute(run_interpreter, code)
+
+
+def interpret_with(code, stdin):
+    """ The output and the error of code, run with stdin. """
+    return execute(run_interpreter, code, stdin)[:2]
+
+
+def recursion(depth):
+    return (
+        'class Main inherits IO {\n'
+        '    sum(n : Int) : Int { if n = 0 then 0 else 1 + sum(n - 1) fi };\n'
+        '    main() : Object { out_int(sum(%d)) };\n'
+        '};\n' % depth
+    )
+
+
+class ReferenceTest(unittest.TestCase):
+    """ What the reference prints, as the Cool manual says. """
+
+    def test_programs(self):
+        outputs = dict(
+            (name, interpret_with(code, stdin))
+            for name, code, stdin in PROGRAMS
+        )
+        self.assertEqual(outputs, {
+            'arithmetic': ('12 22 -85 -3 -4 -2147483648 0 1 1 1 ', None),
+            'strings': ('hello, world\n12\nworld\nsame\tx\n', None),
+            'objects': ('5171BABBset', None),
+            'control': ('45IntStringMainObject', None),
+            'input': ('cool!42', None),
+            'recursion': ('61012502500', None),
+        })
+
+    def test_runtime_errors(self):
+        errors = dict((name, interpret(code).error) for name, code in ERRORS)
+        self.assertEqual(errors, {
+            'division by zero': 'line 2: Division by zero',
+            'dispatch on void': 'line 3: Dispatch to void',
+            'substring out of range': 'Index out of range in substr',
+            'case on void': 'line 3: Case on void',
+            'abort': 'abort',
+        })
+
+
+class HarnessTest(unittest.TestCase):
+
+    def test_compare(self):
+        name, code, stdin = PROGRAMS[0]
+        expected, outcomes = compare(code, stdin, ['vm'])
+        self.assertEqual(list(outcomes), ['vm'])
+        self.assertTrue(agree(expected, outcomes['vm']))
+
+    def test_agree(self):
+        expected = Outcome('1', None, 0.5)
+        self.assertTrue(agree(expected, Outcome('1', None, 2.0)))
+        self.assertFalse(agree(expected, Outcome('12', None, 0.5)))
+        self.assertFalse(agree(expected, Outcome('1', 'abort', 0.5)))
+
+
+class RecursionTest(unittest.TestCase):
+
+    def test_limits_are_restored(self):
+        limit = sys.getrecursionlimit()
+        size = threading.stack_size()
+        self.assertEqual(interpret(recursion(1000)).output, '1000')
+        self.assertEqual(sys.getrecursionlimit(), limit)
+        self.assertEqual(threading.stack_size(), size)
+
+    def test_concurrent_runs(self):
+        limit = sys.getrecursionlimit()
+        outcomes = []
+        threads = [
+            threading.Thread(
+                target=lambda: outcomes.append(interpret(recursion(5000)))
+            )
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([o.output for o in outcomes], ['5000'] * 3)
+        self.assertEqual(sys.getrecursionlimit(), limit)
+
+    def test_overflow_is_not_compared(self):
+        outcome = interpret(recursion(100000))
+        self.assertEqual(outcome.error, 'Stack overflow')
+        self.assertFalse(conclusive(outcome))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import mmap
+import tempfile
+import unittest
+
+from src.lexical import MyLex
+
+mylex = MyLex()
+
+
+def tokens(code):
+    """ (type, value, line, column) of the tokens of code, and the errors. """
+    llex, lerror = mylex.tokenize(code)
+    return [tuple(token) for token in llex], list(lerror)
+
+
+class CommentTest(unittest.TestCase):
+
+    def test_line_comment(self):
+        self.assertEqual(tokens('x -- (* not a block\ny'), ([
+            ('OBJECTID', 'x', 1, 1), ('OBJECTID', 'y', 2, 2)
+        ], []))
+
+    def test_comment_ends_at_first_close(self):
+        self.assertEqual(tokens('(* a *) x (* b *)'), ([
+            ('OBJECTID', 'x', 1, 9)
+        ], []))
+
+    def test_nested_comments(self):
+        self.assertEqual(tokens('(* a (* b (* c *) *) d *) x *)'), ([
+            ('OBJECTID', 'x', 1, 27), ('MULT', '*', 1, 29),
+            ('RPAREN', ')', 1, 30)
+        ], []))
+
+    def test_multi_line_comment(self):
+        code = 'x (* one\n (* two *)\n -- three *) y\n(*\n*)z'
+        self.assertEqual(tokens(code), ([
+            ('OBJECTID', 'x', 1, 1), ('OBJECTID', 'y', 3, 15),
+            ('OBJECTID', 'z', 5, 4)
+        ], []))
+
+    def test_unclosed_comment(self):
+        self.assertEqual(tokens('x\n(* a (* b *) c'), (
+            [('OBJECTID', 'x', 1, 1)], [('(*', 2, 2)]
+        ))
+
+    def test_comment_in_mmap(self):
+        with tempfile.TemporaryFile() as file:
+            file.write('(* a (* b *)\n *) x')
+            file.flush()
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.assertEqual(tokens(data), (
+                [('OBJECTID', 'x', 2, 6)], []
+            ))
+            data.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
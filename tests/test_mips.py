@@ -0,0 +1,36 @@
+import unittest
+from StringIO import StringIO
+
+from src.interpreter.differential import analyze
+from src.mips import generate, run, simulate
+
+from programs import BackendTests, OBJECTS
+
+
+def run_simulator(semant, stdin, stdout):
+    run(generate(semant), stdin, stdout, simulator=True)
+
+
+class MipsTest(BackendTests, unittest.TestCase):
+    # spim is not needed, and its output is the same
+    runner = staticmethod(run_simulator)
+
+    def test_assembly(self):
+        assembly = generate(analyze(
+            'class Main { main() : Int { 1 + 2 }; };'
+        ))
+        self.assertIn('main:', assembly)
+        self.assertIn('Main.main:', assembly)
+        output = StringIO()
+        simulate(assembly, StringIO(), output)
+        self.assertEqual(output.getvalue(), '')
+
+    def test_without_direct_calls(self):
+        output = StringIO()
+        run(generate(analyze(OBJECTS), direct_calls=False), StringIO(),
+            output, simulator=True)
+        self.assertEqual(output.getvalue(), '5171BABBset')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+from src.interpreter.differential import agree, execute, run_interpreter
+from src.native import cc, run
+from src.native.cc import FLAGS
+from src.native.native import generate
+
+from programs import BackendTests
+
+# Stops the program at the first undefined behaviour of the runtime
+UBSAN = FLAGS + ('-fsanitize=undefined', '-fno-sanitize-recover=undefined')
+
+ARITHMETIC = '''class Main inherits IO {
+    show(n : Int) : Object { { out_int(n); out_string("\\n"); } };
+    main() : Object {
+        let n : Int <- ~630 in {
+            show(n);
+            show(n * 3 - 1);
+            show(n / ~7);
+            show(~n);
+            show(2147483647 + 1);
+            show(~2147483647 - 2);
+        }
+    };
+};
+'''
+
+
+def run_native(semant, stdin, stdout):
+    run(generate(semant), stdin, stdout, UBSAN)
+
+
+@unittest.skipIf(cc() is None, 'no C compiler')
+class NativeTest(BackendTests, unittest.TestCase):
+    runner = staticmethod(run_native)
+
+    def test_negative_ints(self):
+        expected = execute(run_interpreter, ARITHMETIC)
+        outcome = execute(run_native, ARITHMETIC)
+        self.assertEqual(expected.error, None)
+        self.assertTrue(agree(expected, outcome), outcome)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+
+from src.interpreter.differential import analyze, run_vm
+from src.optimizer import (
+    optimize, PassManager, ConstantFolding, CopyPropagation, DeadCode,
+    Inlining
+)
+from src.syntactic.ast import *
+
+from programs import BackendTests, PROGRAMS
+
+
+def optimized(body, passes, methods=''):
+    """ The body of Main.main, after passes. """
+    s = analyze('class Main inherits IO { %s main() : Object { %s }; };' % (
+        methods, body
+    ))
+    PassManager(passes).run(s)
+    main, = [
+        feature for feature in s.classes['Main'].feature_list
+        if feature.name == 'main'
+    ]
+    return main.body
+
+
+def run_vm_o1(semant, stdin, stdout):
+    optimize(semant, 1)
+    run_vm(semant, stdin, stdout)
+
+
+def run_vm_o2(semant, stdin, stdout):
+    optimize(semant, 2)
+    run_vm(semant, stdin, stdout)
+
+
+class ConstantFoldingTest(unittest.TestCase):
+
+    def test_arithmetic(self):
+        body = optimized('1 + 2 * 3 - ~4', [ConstantFolding])
+        self.assertEqual((type(body), body.content), (Int, 11))
+
+    def test_wraps_at_32_bits(self):
+        body = optimized('2147483647 + 1', [ConstantFolding])
+        self.assertEqual(body.content, -2147483648)
+
+    def test_division_rounds_towards_zero(self):
+        body = optimized('~7 / 2', [ConstantFolding])
+        self.assertEqual(body.content, -3)
+
+    def test_division_by_zero_is_kept(self):
+        body = optimized('1 / 0', [ConstantFolding])
+        self.assertIsInstance(body, Div)
+
+    def test_comparisons(self):
+        body = optimized('not (1 < 2) = false', [ConstantFolding])
+        self.assertEqual((type(body), body.content), (Bool, True))
+
+
+class DeadCodeTest(unittest.TestCase):
+
+    def test_if(self):
+        body = optimized(
+            'if 1 < 2 then out_int(1) else out_int(2) fi',
+            [ConstantFolding, DeadCode]
+        )
+        self.assertIsInstance(body, Dispatch)
+        self.assertEqual(body.expr_list[0].content, 1)
+
+    def test_block(self):
+        body = optimized('{ 1; "a"; out_int(1); 2; }', [DeadCode])
+        self.assertEqual([type(e) for e in body.body], [Dispatch, Int])
+
+    def test_unused_let(self):
+        body = optimized('let x : Int <- 5 in out_int(1)', [DeadCode])
+        self.assertIsInstance(body, Dispatch)
+
+
+class CopyPropagationTest(unittest.TestCase):
+
+    def test_literal(self):
+        body = optimized(
+            'let x : Int <- 5 in out_int(x + x)',
+            [CopyPropagation, ConstantFolding, DeadCode]
+        )
+        self.assertIsInstance(body, Dispatch)
+        self.assertEqual(body.expr_list[0].content, 10)
+
+    def test_assigned_variable_is_kept(self):
+        body = optimized(
+            'let x : Int <- 5 in { x <- 6; out_int(x); }', [CopyPropagation]
+        )
+        self.assertIsInstance(body, Let)
+
+
+class InliningTest(unittest.TestCase):
+
+    def test_small_method(self):
+        body = optimized(
+            'out_int(twice(4))',
+            [Inlining, CopyPropagation, ConstantFolding, DeadCode],
+            'twice(n : Int) : Int { n * 2 };'
+        )
+        self.assertEqual(body.expr_list[0].content, 8)
+
+    def test_overridden_method_is_not_inlined(self):
+        s = analyze(
+            'class Main inherits IO {\n'
+            '    f() : Int { 1 };\n'
+            '    main() : Object { out_int(f()) };\n'
+            '};\n'
+            'class Child inherits Main { f() : Int { 2 }; };\n'
+        )
+        PassManager([Inlining]).run(s)
+        main = s.methods['Main']['main']
+        self.assertIsInstance(main.body.expr_list[0], Dispatch)
+
+
+class LevelsTest(unittest.TestCase):
+
+    def test_smaller(self):
+        for name, code, stdin in PROGRAMS:
+            manager = optimize(analyze(code), 2)
+            self.assertLessEqual(manager.size_after, manager.size_before)
+
+
+class O1Test(BackendTests, unittest.TestCase):
+    runner = staticmethod(run_vm_o1)
+
+
+class O2Test(BackendTests, unittest.TestCase):
+    runner = staticmethod(run_vm_o2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from src import profiler
+from src.profiler import Profiler, NULL_PROFILER, program_counts
+from src.syntactic.syntactic import parser
+
+from compiler import compile_file
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+
+class ProfilerTest(unittest.TestCase):
+
+    def test_phases(self):
+        p = Profiler()
+        with p.phase('outer') as outer:
+            with p.phase('inner') as inner:
+                inner.counts['items'] = 3
+                data = ['x' * 100 for _ in range(10000)]
+        del data
+        self.assertEqual(
+            [(r.name, r.depth) for r in p.phases],
+            [('outer', 0), ('inner', 1)]
+        )
+        self.assertGreaterEqual(outer.time, inner.time)
+        if profiler.MEMORY is not None:
+            self.assertGreaterEqual(inner.memory, 0)
+
+    def test_report(self):
+        p = Profiler()
+        with p.phase('lex') as record:
+            record.counts.update(tokens=10, errors=0)
+        lines = p.report()
+        label, description = profiler.MEMORY_LABELS[profiler.MEMORY]
+        self.assertIn(label, lines[0])
+        self.assertTrue(lines[1].startswith('lex'))
+        self.assertTrue(lines[1].endswith('errors: 0, tokens: 10'))
+        self.assertEqual(lines[-1], 'memory: %s' % description)
+
+        report = json.loads(p.as_json())
+        self.assertEqual(report['memory'], profiler.MEMORY)
+        self.assertEqual(
+            report['approximate'], profiler.MEMORY != 'tracemalloc'
+        )
+        self.assertEqual(report['phases'][0]['counts'], record.counts)
+
+    def test_cprofile(self):
+        directory = tempfile.mkdtemp()
+        try:
+            p = Profiler(os.path.join(directory, 'stats'))
+            with p.phase('check / all'):
+                with p.phase('inner'):
+                    sum(range(1000))
+            self.assertEqual(
+                os.listdir(os.path.join(directory, 'stats')),
+                ['check_all.prof']
+            )
+        finally:
+            shutil.rmtree(directory)
+
+    def test_compile_file(self):
+        p = Profiler()
+        s, errors = compile_file(
+            os.path.join(EXAMPLES, 'hello-world.cl'), profiler=p
+        )
+        top = [r.name for r in p.phases if r.depth == 0]
+        self.assertEqual(top, ['lex', 'parse', 'semantic'])
+        self.assertTrue([r for r in p.phases if r.depth == 1])
+        self.assertGreater(p.phases[0].counts['tokens'], 0)
+
+    def test_null_profiler(self):
+        with NULL_PROFILER.phase('lex') as record:
+            record.counts['tokens'] = 1
+
+    def test_program_counts(self):
+        ast, _ = parser.parse(
+            'class A { f() : Int { 1 }; };\n'
+            'class Main {\n'
+            '    main() : Int { (new A).f() + f2() };\n'
+            '    f2() : Int { 2 };\n'
+            '};\n',
+            echo=False
+        )
+        counts = program_counts(ast)
+        self.assertEqual(counts['classes'], 2)
+        self.assertEqual(counts['dispatch sites'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
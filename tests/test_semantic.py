@@ -0,0 +1,68 @@
+import unittest
+
+from src.semantic import Semant
+from src.syntactic.syntactic import parser
+
+
+def check(code):
+    """ The names of the errors that Semant.build finds in code. """
+    ast, serror = parser.parse(code, echo=False)
+    assert ast is not None, serror
+    return [error.error for error in Semant(ast).build()]
+
+
+class DispatchTest(unittest.TestCase):
+
+    def test_dispatch_on_class_in_inheritance_cycle(self):
+        errors = check(
+            'class A inherits B { f() : Int { 1 }; };\n'
+            'class B inherits A { };\n'
+            'class Main { main() : Int { (new A).f() }; };\n'
+        )
+        self.assertEqual(errors, [
+            'InheritanceError', 'InheritanceError', 'UndefinedClassError'
+        ])
+
+    def test_dispatch_on_undefined_class(self):
+        errors = check('class Main { main() : Object { (new Foo).bar() }; };')
+        self.assertEqual(errors, ['UndefinedClassError'])
+
+    def test_dispatch_on_receiver_of_unknown_type(self):
+        # The next feature is checked too
+        errors = check(
+            'class Main {\n'
+            '    main() : Int { (1 + 2).foo() };\n'
+            '    g() : Int { (new Foo).bar() };\n'
+            '};\n'
+        )
+        self.assertEqual(errors, [
+            'UnknownReceiverTypeError', 'UndefinedClassError'
+        ])
+
+    def test_dispatch_on_self_type(self):
+        # copy returns SELF_TYPE, the class of its receiver
+        errors = check(
+            'class A { f() : Int { 1 }; };\n'
+            'class Main {\n'
+            '    main() : Object { self.copy().copy() };\n'
+            '    g() : Object { (new A).copy().f() };\n'
+            '};\n'
+        )
+        self.assertEqual(errors, [])
+
+
+class AttributeTest(unittest.TestCase):
+
+    def test_wrong_attribute_is_still_in_scope(self):
+        errors = check(
+            'class Main {\n'
+            '    x : Int <- "one";\n'
+            '    main() : Int { x };\n'
+            '    f() : Object { x <- 2 };\n'
+            '};\n'
+        )
+        self.assertEqual(errors, ['AttributeTypeError'])
+
+
+if __name__ == '__main__':
+    unittest.main()
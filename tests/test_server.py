@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import sys
+import unittest
+from StringIO import StringIO
+
+from src.server import LanguageServer, byte_column, utf16_column
+
+URI = 'file:///main.cl'
+
+
+class Editor(object):
+    """ Sends messages to a LanguageServer, keeps its notifications. """
+
+    def __init__(self):
+        self.server = LanguageServer(StringIO(), StringIO())
+        self.notifications = []
+        self.server.notify = lambda method, params: \
+            self.notifications.append((method, params))
+
+    def open(self, text):
+        self.server.handle({
+            'method': 'textDocument/didOpen', 'params': {'textDocument': {
+                'uri': URI, 'text': text, 'version': 1
+            }}
+        })
+        return self.notifications[-1][1]['diagnostics']
+
+
+class ColumnTest(unittest.TestCase):
+
+    def test_columns(self):
+        line = u'  (* é𝄞 *) x'.encode('utf-8')
+        # é is 2 bytes and 1 unit, 𝄞 is 4 bytes and 2 units
+        self.assertEqual(utf16_column(line, 12), 9)
+        self.assertEqual(byte_column(line, 9), 12)
+        self.assertEqual(utf16_column('ascii', 3), 3)
+
+    def test_diagnostic_after_non_ascii(self):
+        diagnostics = Editor().open(
+            u'class Main { main() : Int { "𝄞" + true }; };\n'
+        )
+        self.assertEqual(len(diagnostics), 1)
+        # At +, the compiler counts the 4 bytes of 𝄞, UTF-16 2 units
+        start = diagnostics[0]['range']['start']
+        self.assertEqual(start, {'line': 0, 'character': 33})
+
+
+class CrashTest(unittest.TestCase):
+
+    def test_crash_is_published(self):
+        editor = Editor()
+
+        def crash(text, cache):
+            raise ValueError('broken')
+        editor.server.compiler.check = crash
+        stderr, sys.stderr = sys.stderr, StringIO()
+        try:
+            diagnostics = editor.open(u'class Main {};')
+            log = sys.stderr.getvalue()
+        finally:
+            sys.stderr = stderr
+        self.assertIn('ValueError: broken', log)
+        self.assertEqual(
+            [d['message'] for d in diagnostics],
+            ['InternalError: ValueError: broken']
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import sys
+import unittest
+from StringIO import StringIO
+
+from src import service
+
+
+class CrashTest(unittest.TestCase):
+
+    def setUp(self):
+        # The worker is forked with the broken lex, and a quiet stderr
+        def crash(code):
+            raise ValueError('broken')
+        self.lex, service.lex = service.lex, crash
+        self.stderr, sys.stderr = sys.stderr, StringIO()
+        try:
+            self.pool = service.WorkerPool(workers=1)
+        finally:
+            service.lex = self.lex
+            sys.stderr = self.stderr
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_worker_survives_a_crash(self):
+        with self.assertRaises(service.ServiceError) as raised:
+            self.pool.submit('lex', 'class Main {};')
+        self.assertEqual(raised.exception.status, 500)
+        self.assertEqual(
+            str(raised.exception), 'internal error: ValueError: broken'
+        )
+        answer = self.pool.submit('parse', 'class Main {};')
+        self.assertEqual(answer['classes'], ['Main'])
+
+
+if __name__ == '__main__':
+    unittest.main()
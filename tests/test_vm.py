@@ -0,0 +1,25 @@
+import unittest
+from StringIO import StringIO
+
+from src.codegen import generate, VM
+from src.interpreter.differential import analyze, run_vm
+
+from programs import BackendTests
+
+
+class VMTest(BackendTests, unittest.TestCase):
+    runner = staticmethod(run_vm)
+
+    def test_deep_recursion(self):
+        # The frames of the calls are not on the Python stack
+        code = '''class Main inherits IO {
+            sum(n : Int) : Int { if n = 0 then 0 else 1 + sum(n - 1) fi };
+            main() : Object { out_int(sum(100000)) };
+        };'''
+        stdout = StringIO()
+        VM(generate(analyze(code)), StringIO(), stdout).run()
+        self.assertEqual(stdout.getvalue(), '100000')
+
+
+if __name__ == '__main__':
+    unittest.main()